@@ -1,5 +1,8 @@
+import os
 import json
 
+DATA_DIR = "data"
+
 def create_major_companies_data():
     """Create properly formatted data for missing major companies"""
     
@@ -382,7 +385,7 @@ def add_companies_to_production(new_companies):
     """Add new companies to the production file"""
     
     # Load current production file
-    with open('/Users/georgemccain/Desktop/untitled folder 2/data/production_companies.json', 'r') as f:
+    with open(os.path.join(DATA_DIR, 'production_companies.json'), 'r') as f:
         current_companies = json.load(f)
     
     print(f"Current companies: {len(current_companies)}")
@@ -394,7 +397,7 @@ def add_companies_to_production(new_companies):
     print(f"Added: {len(new_companies)} new companies")
     
     # Save updated file
-    output_file = '/Users/georgemccain/Desktop/untitled folder 2/data/enhanced_production_companies.json'
+    output_file = os.path.join(DATA_DIR, 'enhanced_production_companies.json')
     
     with open(output_file, 'w') as f:
         json.dump(updated_companies, f, indent=2, ensure_ascii=False)
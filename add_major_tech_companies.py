@@ -1,5 +1,8 @@
+import os
 import json
 
+DATA_DIR = "data"
+
 def create_enterprise_software_companies():
     """Create data for major enterprise software companies"""
     
@@ -698,11 +701,17 @@ def create_gaming_ecommerce_companies():
     
     return companies
 
+def all_tech_companies():
+    """Every tech company added by this script, in category order"""
+    return (create_enterprise_software_companies() + create_hardware_semiconductor_companies() +
+            create_cybersecurity_companies() + create_social_media_companies() +
+            create_developer_tools_companies() + create_gaming_ecommerce_companies())
+
 def add_all_tech_companies():
     """Add all missing major tech companies to the final enhanced file"""
     
     # Load current final enhanced file
-    with open('/Users/georgemccain/Desktop/untitled folder 2/data/final_enhanced_companies.json', 'r') as f:
+    with open(os.path.join(DATA_DIR, 'final_enhanced_companies.json'), 'r') as f:
         current_companies = json.load(f)
     
     print(f"📊 Current companies: {len(current_companies)}")
@@ -744,7 +753,7 @@ def add_all_tech_companies():
     print(f"📊 Total companies after addition: {len(updated_companies)}")
     
     # Save updated file
-    output_file = '/Users/georgemccain/Desktop/untitled folder 2/data/complete_companies_dataset.json'
+    output_file = os.path.join(DATA_DIR, 'complete_companies_dataset.json')
     
     with open(output_file, 'w') as f:
         json.dump(updated_companies, f, indent=2, ensure_ascii=False)
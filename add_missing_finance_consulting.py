@@ -1,5 +1,8 @@
+import os
 import json
 
+DATA_DIR = "data"
+
 def create_missing_consulting_firms():
     """Create data for missing major consulting firms"""
     
@@ -336,11 +339,15 @@ def create_missing_investment_banks():
     
     return investment_banks
 
+def missing_firms():
+    """All consulting firms and investment banks added by this script"""
+    return create_missing_consulting_firms() + create_missing_investment_banks()
+
 def add_missing_firms_to_production():
     """Add missing consulting and investment banking firms to enhanced production file"""
     
     # Load current enhanced production file
-    with open('/Users/georgemccain/Desktop/untitled folder 2/data/enhanced_production_companies.json', 'r') as f:
+    with open(os.path.join(DATA_DIR, 'enhanced_production_companies.json'), 'r') as f:
         current_companies = json.load(f)
     
     print(f"📊 Current companies: {len(current_companies)}")
@@ -365,7 +372,7 @@ def add_missing_firms_to_production():
     print(f"📊 Total companies after addition: {len(updated_companies)}")
     
     # Save updated file
-    output_file = '/Users/georgemccain/Desktop/untitled folder 2/data/final_enhanced_companies.json'
+    output_file = os.path.join(DATA_DIR, 'final_enhanced_companies.json')
     
     with open(output_file, 'w') as f:
         json.dump(updated_companies, f, indent=2, ensure_ascii=False)
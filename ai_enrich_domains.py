@@ -6,6 +6,7 @@ import time
 from datetime import datetime
 from dotenv import load_dotenv
 from anthropic import Anthropic
+from rate_limiter import limiter
 
 load_dotenv()
 client = Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
@@ -59,7 +60,8 @@ Return ONLY a JSON array:
 ]"""
 
     try:
-        response = client.messages.create(
+        response = limiter.create_message(
+            client,
             model="claude-3-5-sonnet-20241022",
             max_tokens=4000,
             temperature=0.3,  # Lower temperature for consistency
@@ -163,9 +165,6 @@ def enrich_companies_with_ai(input_file, batch_size=10):
         
         print(f"📈 Progress: {processed}/{len(companies)} ({processed/len(companies)*100:.1f}%)")
         print(f"⏱️  Rate: {rate:.1f} companies/sec, ETA: {eta:.1f} minutes")
-        
-        # Rate limiting to avoid API limits
-        time.sleep(1)
     
     # Generate output filename
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+Single-pass audit engine for company datasets.
+
+Every check is a registered rule (see audit_rules.py):
+
+  - company rules look at one company, role rules at one role, and both
+    yield issue messages;
+  - aggregates collect a small per-shard state (name counts, description
+    hashes, distributions, MinHash signatures) that is merged across shards
+    and turned into dataset-wide issues at the end. An aggregate may define
+    seal(state), run in the worker before its shard state is sent back, to
+    turn what it collected into a compact form.
+
+The dataset is streamed once and cut into shards of companies. Shards are
+audited in a process pool, a few at a time, and their issue counts,
+samples and aggregate states are merged into one report, written as JSON
+and printed as text. One pass replaces the separate reloads and walks of
+production_audit, comprehensive_audit, validate_cleaned_companies,
+validate_standardized, final_validation, detailed_accuracy_check and
+detailed_issues_report.
+
+Usage:
+    python audit_engine.py [dataset.json|.jsonl] [--workers N] [--tags production,standardized]
+                           [--report data/audit_report.json] [--list]
+"""
+
+import os
+import sys
+import json
+import argparse
+from itertools import islice
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from stream_combine import iter_batch_file
+
+DATA_DIR = "data"
+SHARD_SIZE = 500
+SAMPLE_LIMIT = 10
+SEVERITIES = ("critical", "warning", "info")
+
+RULES = {}
+AGGREGATES = {}
+
+class Rule:
+    """A company- or role-level check; fn yields issue messages"""
+
+    def __init__(self, name, fn, scope, severity, tags, description):
+        self.name = name
+        self.fn = fn
+        self.scope = scope
+        self.severity = severity
+        self.tags = tags
+        self.description = description
+
+def rule(name, severity="warning", scope="company", tags=()):
+    """Register fn(company) (scope='company') or fn(company, role) (scope='role') as a rule"""
+    def register(fn):
+        RULES[name] = Rule(name, fn, scope, severity, set(tags), (fn.__doc__ or "").strip())
+        return fn
+    return register
+
+def aggregate(name, severity="warning", tags=()):
+    """Register a class with new() / add(state, company, index) / merge(a, b) / finish(state, report)
+    and optionally seal(state) -> state, called once per shard in the worker"""
+    def register(cls):
+        cls.name = name
+        cls.severity = severity
+        cls.tags = set(tags)
+        cls.description = (cls.__doc__ or "").strip()
+        AGGREGATES[name] = cls()
+        return cls
+    return register
+
+def load_rules():
+    # Rules register themselves on import; worker processes call this too
+    import audit_rules  # noqa: F401
+
+def selected(registry, tags=None, names=None):
+    return [item for item in registry.values()
+            if (not tags or item.tags & set(tags)) and (not names or item.name in names)]
+
+# ---------- Shard auditing ----------
+
+def new_result():
+    return {"companies": 0, "roles": 0, "counts": Counter(), "samples": {}, "states": {}}
+
+def record(result, rule_name, message, index=None, company=None, role=None):
+    result["counts"][rule_name] += 1
+    samples = result["samples"].setdefault(rule_name, [])
+    if len(samples) < SAMPLE_LIMIT:
+        samples.append({"index": index, "company": company, "role": role, "message": message})
+
+def audit_shard(companies, start, rule_names, aggregate_names):
+    """Run the named rules and aggregates over one shard; returns a mergeable result"""
+    load_rules()
+    company_rules = [RULES[name] for name in rule_names if RULES[name].scope == "company"]
+    role_rules = [RULES[name] for name in rule_names if RULES[name].scope == "role"]
+    aggregates = [AGGREGATES[name] for name in aggregate_names]
+
+    result = new_result()
+    result["states"] = {agg.name: agg.new() for agg in aggregates}
+
+    for offset, company in enumerate(companies):
+        index = start + offset
+        if not isinstance(company, dict):
+            record(result, "not_a_company", f"Entry {index} is {type(company).__name__}, not an object", index)
+            continue
+        result["companies"] += 1
+        name = company.get("company_name", f"Company {index}")
+
+        for check in company_rules:
+            for message in check.fn(company):
+                record(result, check.name, message, index, name)
+
+        roles = company.get("roles", [])
+        if isinstance(roles, list):
+            result["roles"] += len(roles)
+            for j, role in enumerate(roles):
+                if not isinstance(role, dict):
+                    continue  # reported by the field type rule
+                for check in role_rules:
+                    for message in check.fn(company, role):
+                        record(result, check.name, message, index, name, j)
+
+        for agg in aggregates:
+            agg.add(result["states"][agg.name], company, index)
+
+    for agg in aggregates:
+        if hasattr(agg, "seal"):
+            result["states"][agg.name] = agg.seal(result["states"][agg.name])
+    return result
+
+def merge_results(total, part):
+    total["companies"] += part["companies"]
+    total["roles"] += part["roles"]
+    total["counts"].update(part["counts"])
+    for rule_name, samples in part["samples"].items():
+        kept = total["samples"].setdefault(rule_name, [])
+        kept.extend(samples[:SAMPLE_LIMIT - len(kept)])
+    for name, state in part["states"].items():
+        if name in total["states"]:
+            total["states"][name] = AGGREGATES[name].merge(total["states"][name], state)
+        else:
+            total["states"][name] = state
+    return total
+
+def iter_shards(companies, shard_size):
+    """Yield (start_index, list_of_companies) chunks of a company stream"""
+    iterator = iter(companies)
+    start = 0
+    while True:
+        shard = list(islice(iterator, shard_size))
+        if not shard:
+            return
+        yield start, shard
+        start += len(shard)
+
+def run_shards(companies, rule_names, aggregate_names, workers=1, shard_size=SHARD_SIZE):
+    total = new_result()
+    shards = iter_shards(companies, shard_size)
+
+    if workers <= 1:
+        for start, shard in shards:
+            merge_results(total, audit_shard(shard, start, rule_names, aggregate_names))
+        return total
+
+    with ProcessPoolExecutor(workers) as pool:
+        # Keep a bounded number of shards in flight so the stream is never fully loaded
+        window = deque(pool.submit(audit_shard, shard, start, rule_names, aggregate_names)
+                       for start, shard in islice(shards, workers * 2))
+        while window:
+            part = window.popleft().result()
+            for start, shard in islice(shards, 1):
+                window.append(pool.submit(audit_shard, shard, start, rule_names, aggregate_names))
+            merge_results(total, part)
+    return total
+
+# ---------- Report ----------
+
+def quality_assessment(companies, counts_by_severity):
+    """Score and readiness status, on the scale production_audit used"""
+    total_issues = sum(counts_by_severity.values())
+    critical = counts_by_severity.get("critical", 0)
+    warnings = counts_by_severity.get("warning", 0)
+
+    total_data_points = max(companies, 1) * 10  # Approximate data points per company
+    quality_score = max(0, 100 - (total_issues / total_data_points * 100))
+    severity_penalty = critical * 2 + warnings * 0.5
+    final_score = max(0, quality_score - severity_penalty)
+
+    if final_score >= 98 and critical == 0:
+        status = "PRODUCTION_READY"
+    elif final_score >= 95 and critical <= 2:
+        status = "PRODUCTION_READY"
+    elif final_score >= 90 and critical <= 5:
+        status = "PRODUCTION_READY_WITH_MONITORING"
+    elif final_score >= 80:
+        status = "NEEDS_CLEANUP"
+    else:
+        status = "NOT_READY"
+
+    return {
+        "base_score": round(quality_score, 1),
+        "severity_penalty": round(severity_penalty, 1),
+        "final_score": round(final_score, 1),
+        "status": status,
+    }
+
+def run_audit(source, workers=1, tags=None, names=None, shard_size=SHARD_SIZE):
+    """Audit a dataset path or an iterable of companies in one pass; returns the report dict"""
+    load_rules()
+    rules = selected(RULES, tags, names)
+    aggregates = selected(AGGREGATES, tags, names)
+    companies = iter_batch_file(source) if isinstance(source, str) else source
+
+    total = run_shards(companies, [r.name for r in rules], [a.name for a in aggregates], workers, shard_size)
+
+    report = {
+        "source": source if isinstance(source, str) else None,
+        "audited_at": datetime.now().isoformat(),
+        "companies": total["companies"],
+        "roles": total["roles"],
+        "rules": {},
+        "stats": {},
+    }
+    for check in rules:
+        report["rules"][check.name] = {
+            "severity": check.severity,
+            "description": check.description,
+            "count": total["counts"].get(check.name, 0),
+            "samples": total["samples"].get(check.name, []),
+        }
+    if total["counts"].get("not_a_company"):
+        report["rules"]["not_a_company"] = {
+            "severity": "critical", "description": "Entries that are not company objects",
+            "count": total["counts"]["not_a_company"], "samples": total["samples"]["not_a_company"],
+        }
+
+    for agg in aggregates:
+        issues = []
+        count = 0
+        for message in agg.finish(total["states"][agg.name], report):
+            count += 1
+            if len(issues) < SAMPLE_LIMIT:
+                issues.append({"message": message})
+        if count or agg.severity != "stats":
+            report["rules"][agg.name] = {"severity": agg.severity, "description": agg.description,
+                                         "count": count, "samples": issues}
+
+    by_severity = Counter()
+    for entry in report["rules"].values():
+        if entry["severity"] in SEVERITIES:
+            by_severity[entry["severity"]] += entry["count"]
+    report["issues_by_severity"] = {severity: by_severity.get(severity, 0) for severity in SEVERITIES}
+    report["assessment"] = quality_assessment(report["companies"], by_severity)
+    return report
+
+def write_report(report, path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+def format_report(report, samples=3):
+    """Human-readable text version of a report"""
+    lines = ["=" * 60, "DATASET AUDIT", "=" * 60]
+    if report["source"]:
+        lines.append(f"Source: {report['source']}")
+    lines.append(f"Companies: {report['companies']:,}   Roles: {report['roles']:,}")
+
+    icons = {"critical": "🔴", "warning": "🟡", "info": "ℹ️ "}
+    lines.append("\n📊 ISSUE SUMMARY:")
+    for severity in SEVERITIES:
+        lines.append(f"  {icons[severity]} {severity.title()}: {report['issues_by_severity'][severity]:,}")
+
+    for severity in SEVERITIES:
+        entries = [(name, entry) for name, entry in report["rules"].items()
+                   if entry["severity"] == severity and entry["count"]]
+        if not entries:
+            continue
+        lines.append(f"\n{icons[severity]} {severity.upper()} ISSUES:")
+        for name, entry in sorted(entries, key=lambda item: item[1]["count"], reverse=True):
+            lines.append(f"  {name} ({entry['count']:,}): {entry['description']}")
+            for sample in entry["samples"][:samples]:
+                lines.append(f"    • {sample['message']}")
+            if entry["count"] > samples:
+                lines.append(f"    ... and {entry['count'] - samples:,} more")
+
+    assessment = report["assessment"]
+    lines.append("\n📈 QUALITY METRICS:")
+    lines.append(f"  Base Quality Score: {assessment['base_score']:.1f}/100")
+    lines.append(f"  Severity Penalty: -{assessment['severity_penalty']:.1f}")
+    lines.append(f"  Final Quality Score: {assessment['final_score']:.1f}/100")
+    lines.append(f"\n🎯 PRODUCTION READINESS: {assessment['status']}")
+
+    for name, stats in report["stats"].items():
+        lines.append(f"\n📋 {name.replace('_', ' ').upper()}:")
+        for key, value in stats.items():
+            if isinstance(value, dict):
+                top = sorted(value.items(), key=lambda item: item[1], reverse=True)[:10]
+                lines.append(f"  {key} ({len(value)}): " + ", ".join(f"{k or '(empty)'}: {v}" for k, v in top))
+            else:
+                lines.append(f"  {key}: {value}")
+    return "\n".join(lines)
+
+def is_ready(report):
+    return report["assessment"]["status"] in ("PRODUCTION_READY", "PRODUCTION_READY_WITH_MONITORING")
+
+def main():
+    parser = argparse.ArgumentParser(description="Audit a company dataset in one pass")
+    parser.add_argument("path", nargs="?", default=os.path.join(DATA_DIR, "production_companies.json"))
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--tags", help="only rules with one of these comma-separated tags")
+    parser.add_argument("--rules", help="only these comma-separated rule names")
+    parser.add_argument("--report", default=os.path.join(DATA_DIR, "audit_report.json"), help="JSON report path")
+    parser.add_argument("--list", action="store_true", help="list the registered rules")
+    args = parser.parse_args()
+
+    load_rules()
+    if args.list:
+        for item in list(RULES.values()) + list(AGGREGATES.values()):
+            print(f"  {item.name:<28} {item.severity:<8} {','.join(sorted(item.tags)):<32} {item.description}")
+        return
+
+    tags = args.tags.split(",") if args.tags else None
+    names = set(args.rules.split(",")) if args.rules else None
+    report = run_audit(args.path, workers=args.workers, tags=tags, names=names)
+    write_report(report, args.report)
+    print(format_report(report))
+    print(f"\n📄 Report: {args.report}")
+    sys.exit(0 if is_ready(report) else 1)
+
+if __name__ == "__main__":
+    # Run through the importable module so audit_rules registers into the same registry
+    import audit_engine
+    audit_engine.main()
@@ -0,0 +1,458 @@
+#!/usr/bin/env python3
+"""
+Checks for audit_engine.py, gathered from the individual audit scripts.
+
+Overlapping checks from those scripts are merged into one rule each; where
+they disagreed on a threshold, the production audit's value is used. Tags
+say which dataset stage a rule is meant for:
+
+    structure     - shape and required fields, valid at every stage
+    accuracy      - content plausibility (placeholders, salaries, industries)
+    logic         - cross-field business logic
+    standardized  - values the standardize step should have normalized
+    duplicates    - dataset-wide duplicate detection
+    production    - everything a production file should pass
+"""
+
+import re
+import hashlib
+from collections import Counter
+
+import numpy as np
+
+from audit_engine import rule, aggregate
+from near_duplicates import find_similar_pairs, name_signatures, description_signatures, description_similarity
+
+def text(value):
+    return value if isinstance(value, str) else ""
+
+def has_word(title, words):
+    """Whole-word match, so 'intern' does not hit 'International' nor 'cto' 'Sector'"""
+    return re.search(r"\b(?:%s)s?\b" % "|".join(words), title) is not None
+
+def salary_pair(role):
+    """(min, max) as ints, or None when the range is missing or malformed"""
+    salary_range = role.get("salary_range")
+    if not isinstance(salary_range, list) or len(salary_range) != 2:
+        return None
+    try:
+        return int(salary_range[0]), int(salary_range[1])
+    except (ValueError, TypeError):
+        return None
+
+PLACEHOLDER_TEXT = (
+    "lorem ipsum", "placeholder", "sample company", "test company", "example corp", "dummy",
+    "fake company", "[company name]", "todo", "tbd", "company description", "add description",
+    "insert description",
+)
+PLACEHOLDER_TITLES = ("todo", "tbd", "placeholder", "role title", "job title")
+KNOWN_INDUSTRY_WORDS = {
+    "agriculture", "automotive", "banking", "finance", "technology", "healthcare",
+    "energy", "manufacturing", "media", "entertainment", "real estate",
+    "policy", "international affairs", "legal", "retail", "transportation",
+    "biotechnology", "pharmaceuticals", "consulting", "strategy", "investment",
+}
+KNOWN_COMPANIES = {
+    "tesla": {"industries": ["automotive", "electric"], "stage": "public"},
+    "goldman sachs": {"industries": ["finance", "banking"], "stage": "public"},
+    "microsoft": {"industries": ["technology", "software"], "stage": "public"},
+    "apple": {"industries": ["technology"], "stage": "public"},
+    "google": {"industries": ["technology"], "stage": "public"},
+    "amazon": {"industries": ["technology", "retail"], "stage": "public"},
+    "mckinsey": {"industries": ["consulting"], "stage": "private"},
+    "blackrock": {"industries": ["finance", "investment"], "stage": "public"},
+}
+STANDARD_STAGES = {"Public", "Private", "Startup", "Non-Profit", "Government", "Established", "Growth"}
+STANDARD_SIZES = {"Small (1-49)", "Medium (50-199)", "Large (200-999)", "Very Large (1,000-4,999)",
+                  "Enterprise (5,000+)", "Unknown"}
+REMOTE_LOCATIONS = {"Remote", "Remote/Not Specified", "Multiple Locations"}
+# Estimated word-bigram Jaccard of two descriptions; matches SequenceMatcher > 0.7 on
+# 99% of such pairs in the batch files, with some extra looser matches
+SIMILAR_DESCRIPTION = 0.4
+
+# ---------- Company rules ----------
+
+@rule("missing_field", severity="critical", tags=("structure", "production"))
+def missing_field(company):
+    """Required company fields are missing or empty"""
+    for field in ("company_name", "about", "industry", "sub_industry", "company_stage", "size"):
+        if field not in company or not str(company[field]).strip():
+            yield f"MISSING FIELD: '{company.get('company_name')}' missing '{field}'"
+
+@rule("field_type", severity="critical", tags=("structure", "production"))
+def field_type(company):
+    """List fields that are not lists, roles that are not objects"""
+    name = company.get("company_name")
+    for field in ("culture_tags", "tech_stack", "roles"):
+        if field in company and not isinstance(company[field], list):
+            yield f"TYPE ERROR: '{name}' {field} should be list"
+    roles = company.get("roles")
+    if isinstance(roles, list):
+        for j, role in enumerate(roles):
+            if not isinstance(role, dict):
+                yield f"TYPE ERROR: '{name}' Role {j} should be dictionary"
+
+@rule("invalid_name", severity="critical", tags=("structure", "production"))
+def invalid_name(company):
+    """Company name shorter than two characters"""
+    name = text(company.get("company_name"))
+    if len(name.strip()) < 2:
+        yield f"INVALID NAME: company name too short: '{name}'"
+
+@rule("short_description", severity="info", tags=("accuracy", "production"))
+def short_description(company):
+    """About text shorter than 10 characters"""
+    if len(text(company.get("about")).strip()) < 10:
+        yield f"INSUFFICIENT DESCRIPTION: '{company.get('company_name')}' has very short description"
+
+@rule("placeholder_text", severity="warning", tags=("accuracy", "production"))
+def placeholder_text(company):
+    """Placeholder or template text in the description"""
+    about = text(company.get("about")).lower()
+    if any(indicator in about for indicator in PLACEHOLDER_TEXT):
+        yield f"PLACEHOLDER DATA: '{company.get('company_name')}' contains placeholder text"
+
+@rule("known_company_mismatch", severity="warning", tags=("accuracy", "production"))
+def known_company_mismatch(company):
+    """Well-known companies with an unexpected industry or stage"""
+    name = text(company.get("company_name")).lower()
+    industry = text(company.get("industry")).lower()
+    stage = text(company.get("company_stage")).lower()
+    for known_name, expected in KNOWN_COMPANIES.items():
+        if known_name not in name:
+            continue
+        if not any(expected_industry in industry for expected_industry in expected["industries"]):
+            yield (f"INDUSTRY MISMATCH: '{company.get('company_name')}' - "
+                   f"Expected {expected['industries']}, got '{industry}'")
+        if expected["stage"] not in stage:
+            yield f"STAGE MISMATCH: '{company.get('company_name')}' - Expected '{expected['stage']}', got '{stage}'"
+
+@rule("unknown_industry", severity="info", tags=("accuracy",))
+def unknown_industry(company):
+    """Industry name contains no recognised industry word"""
+    industry = text(company.get("industry"))
+    if industry and not set(industry.lower().split()) & KNOWN_INDUSTRY_WORDS:
+        yield f"UNKNOWN INDUSTRY: '{company.get('company_name')}' - '{industry}'"
+
+@rule("industry_equals_sub_industry", severity="info", tags=("accuracy",))
+def industry_equals_sub_industry(company):
+    """Industry and sub-industry are identical"""
+    industry = company.get("industry")
+    if industry and industry == company.get("sub_industry"):
+        yield f"INDUSTRY: '{company.get('company_name')}' industry and sub_industry are identical"
+
+@rule("industry_mismatch", severity="warning", tags=("logic", "production"))
+def industry_mismatch(company):
+    """Sub-industry or stage that contradicts the industry"""
+    name = company.get("company_name")
+    industry = company.get("industry", "")
+    sub_industry = company.get("sub_industry", "")
+    if industry == "Technology" and sub_industry == "Farming":
+        yield f"INDUSTRY MISMATCH: '{name}' - Technology company with Farming sub-industry"
+    if industry == "Healthcare" and sub_industry == "Software Development":
+        yield f"INDUSTRY MISMATCH: '{name}' - Healthcare company with Software Development sub-industry"
+    if company.get("company_stage") == "Non-Profit" and industry in ("Finance", "Banking"):
+        yield f"STAGE MISMATCH: '{name}' - Non-profit in Finance/Banking industry"
+
+@rule("stage_size_mismatch", severity="warning", tags=("logic", "production"))
+def stage_size_mismatch(company):
+    """Startups with enterprise headcount, public companies with small headcount"""
+    name = company.get("company_name")
+    stage = company.get("company_stage", "")
+    size = text(company.get("size"))
+    if stage == "Startup" and "Enterprise" in size:
+        yield f"LOGIC ERROR: '{name}' - Startup with Enterprise size"
+    if stage == "Public" and "Small" in size:
+        yield f"LOGIC WARNING: '{name}' - Public company with Small size (unusual)"
+
+@rule("role_count_vs_size", severity="warning", tags=("logic", "production"))
+def role_count_vs_size(company):
+    """Role counts that do not fit the company size"""
+    name = company.get("company_name")
+    size = text(company.get("size"))
+    roles = company.get("roles")
+    role_count = len(roles) if isinstance(roles, list) else 0
+    if "Small" in size and role_count > 8:
+        yield f"ROLE COUNT WARNING: '{name}' - Small company with {role_count} roles (many)"
+    if "Enterprise" in size and role_count < 2:
+        yield f"ROLE COUNT WARNING: '{name}' - Enterprise company with only {role_count} roles (few)"
+
+@rule("no_roles", severity="warning", tags=("structure", "production"))
+def no_roles(company):
+    """Companies without any roles"""
+    if isinstance(company.get("roles", []), list) and not company.get("roles"):
+        yield f"NO ROLES: '{company.get('company_name')}' has no job roles defined"
+
+@rule("tech_company_without_tech_roles", severity="warning", tags=("logic", "production"))
+def tech_company_without_tech_roles(company):
+    """Technology companies with more than two roles and no engineering role"""
+    roles = company.get("roles")
+    if company.get("industry") != "Technology" or not isinstance(roles, list) or len(roles) <= 2:
+        return
+    tech_words = ("engineer", "developer", "programmer", "architect")
+    if not any(isinstance(role, dict) and any(word in text(role.get("title")).lower() for word in tech_words)
+               for role in roles):
+        yield f"INDUSTRY MISMATCH: '{company.get('company_name')}' - Technology company with no tech roles"
+
+@rule("culture_tags", severity="info", tags=("accuracy", "production"))
+def culture_tags(company):
+    """Missing, duplicated or excessive culture tags"""
+    name = company.get("company_name")
+    tags = company.get("culture_tags", [])
+    if not isinstance(tags, list):
+        return
+    hashable = [tag for tag in tags if isinstance(tag, str)]
+    if not tags:
+        yield f"TAGS: '{name}' has no culture tags"
+    elif len(hashable) > len(set(hashable)):
+        yield f"DUPLICATE TAGS: '{name}' has duplicate culture tags"
+    if len(tags) > 8:
+        yield f"TOO MANY TAGS: '{name}' has excessive culture tags ({len(tags)})"
+
+@rule("tech_stack_mismatch", severity="info", tags=("logic",))
+def tech_stack_mismatch(company):
+    """Agriculture companies with an extensive web tech stack"""
+    tech_stack = company.get("tech_stack", [])
+    if company.get("industry") == "Agriculture" and isinstance(tech_stack, list) \
+            and "React" in tech_stack and len(tech_stack) > 5:
+        yield f"TECH MISMATCH: '{company.get('company_name')}' - Agriculture company with extensive web tech stack"
+
+@rule("nonstandard_stage", severity="info", tags=("standardized",))
+def nonstandard_stage(company):
+    """Company stage outside the standardized set"""
+    stage = company.get("company_stage", "")
+    if stage not in STANDARD_STAGES:
+        yield f"'{company.get('company_name')}': Invalid company stage '{stage}'"
+
+@rule("nonstandard_size", severity="info", tags=("standardized",))
+def nonstandard_size(company):
+    """Company size outside the standardized buckets"""
+    size = company.get("size", "")
+    if size not in STANDARD_SIZES:
+        yield f"'{company.get('company_name')}': Invalid company size '{size}'"
+
+# ---------- Role rules ----------
+
+@rule("missing_role_field", severity="critical", scope="role", tags=("structure", "production"))
+def missing_role_field(company, role):
+    """Required role fields are missing or empty"""
+    for field in ("title", "description", "required_skills", "location", "salary_range"):
+        if field not in role or not str(role[field]).strip() or role[field] == []:
+            yield f"MISSING ROLE FIELD: '{company.get('company_name')}' role '{role.get('title')}' missing '{field}'"
+
+@rule("skills_format", severity="critical", scope="role", tags=("structure", "production"))
+def skills_format(company, role):
+    """required_skills that is not a list"""
+    if "required_skills" in role and not isinstance(role["required_skills"], list):
+        yield f"SKILLS FORMAT: '{company.get('company_name')}' role '{role.get('title')}' required_skills should be list"
+
+@rule("salary_format", severity="critical", scope="role", tags=("structure", "production"))
+def salary_format(company, role):
+    """salary_range that is not two numbers"""
+    if "salary_range" in role and salary_pair(role) is None:
+        yield f"SALARY FORMAT: '{company.get('company_name')}' role '{role.get('title')}' invalid salary_range {role['salary_range']!r}"
+
+@rule("salary_range_order", severity="warning", scope="role", tags=("accuracy", "production"))
+def salary_range_order(company, role):
+    """Minimum salary not below the maximum, or negative salaries"""
+    pair = salary_pair(role)
+    if pair is None:
+        return
+    min_sal, max_sal = pair
+    if min_sal >= max_sal:
+        yield f"SALARY RANGE: '{company.get('company_name')}' role '{role.get('title')}' min >= max: {list(pair)}"
+    if min_sal < 0 or max_sal < 0:
+        yield f"SALARY RANGE: '{company.get('company_name')}' role '{role.get('title')}' negative salary: {list(pair)}"
+
+@rule("salary_bounds", severity="warning", scope="role", tags=("accuracy", "production"))
+def salary_bounds(company, role):
+    """Salaries below $15,000 or above $1,000,000"""
+    pair = salary_pair(role)
+    if pair is None:
+        return
+    min_sal, max_sal = pair
+    if 0 <= min_sal < 15000:
+        yield f"LOW SALARY: '{company.get('company_name')}' {role.get('title')} - ${min_sal:,}"
+    if max_sal > 1000000:
+        yield f"HIGH SALARY: '{company.get('company_name')}' {role.get('title')} - ${max_sal:,}"
+
+@rule("intern_salary", severity="critical", scope="role", tags=("accuracy", "production"))
+def intern_salary(company, role):
+    """Intern roles starting above $80,000"""
+    pair = salary_pair(role)
+    if pair and has_word(text(role.get("title")).lower(), ("intern", "internship")) and pair[0] > 80000:
+        yield f"SALARY ERROR: '{company.get('company_name')}' - Intern with high salary: ${pair[0]:,} ({role.get('title')})"
+
+@rule("salary_vs_title", severity="warning", scope="role", tags=("accuracy", "production"))
+def salary_vs_title(company, role):
+    """Executive, director, senior and entry salaries out of line with the title"""
+    pair = salary_pair(role)
+    if pair is None:
+        return
+    min_sal, max_sal = pair
+    name = company.get("company_name")
+    title = text(role.get("title")).lower()
+    if has_word(title, ("ceo", "president", "chief")) and max_sal < 150000:
+        yield f"SALARY WARNING: '{name}' - Executive with low salary: ${max_sal:,} ({role.get('title')})"
+    elif has_word(title, ("cto", "cfo", "director")) and max_sal < 100000:
+        yield f"SALARY WARNING: '{name}' - Senior role with low salary: ${max_sal:,} ({role.get('title')})"
+    if has_word(title, ("senior",)) and max_sal < 70000:
+        yield f"SALARY WARNING: '{name}' - Senior role with low salary: ${max_sal:,} ({role.get('title')})"
+    if has_word(title, ("entry",)) and min_sal > 100000:
+        yield f"SALARY WARNING: '{name}' - Entry role with high salary: ${min_sal:,} ({role.get('title')})"
+
+@rule("placeholder_role", severity="warning", scope="role", tags=("accuracy", "production"))
+def placeholder_role(company, role):
+    """Placeholder role titles"""
+    if any(placeholder in text(role.get("title")).lower() for placeholder in PLACEHOLDER_TITLES):
+        yield f"PLACEHOLDER ROLE: '{company.get('company_name')}' has placeholder title '{role.get('title')}'"
+
+@rule("malformed_location", severity="info", scope="role", tags=("accuracy",))
+def malformed_location(company, role):
+    """Locations that look like prose rather than 'City, Region'"""
+    location = text(role.get("location"))
+    if location and location not in REMOTE_LOCATIONS and "," not in location and len(location.split()) > 3:
+        yield f"INVALID LOCATION: '{company.get('company_name')}' {role.get('title')} - '{location}'"
+
+# ---------- Dataset-wide aggregates ----------
+
+@aggregate("duplicate_names", severity="critical", tags=("duplicates", "production"))
+class DuplicateNames:
+    """Company names that appear more than once"""
+
+    def new(self):
+        return Counter()
+
+    def add(self, state, company, index):
+        state[company.get("company_name", "")] += 1
+
+    def merge(self, a, b):
+        a.update(b)
+        return a
+
+    def finish(self, state, report):
+        for name, count in state.most_common():
+            if count < 2:
+                break
+            yield f"EXACT DUPLICATE: '{name}' appears {count} times"
+
+@aggregate("duplicate_descriptions", severity="warning", tags=("duplicates", "production"))
+class DuplicateDescriptions:
+    """Companies sharing an identical (longer than 50 characters) description"""
+
+    def new(self):
+        return {}
+
+    def add(self, state, company, index):
+        about = text(company.get("about")).lower()
+        if len(about) > 50:
+            key = hashlib.blake2b(about.encode("utf-8"), digest_size=8).digest()
+            state.setdefault(key, []).append(company.get("company_name"))
+
+    def merge(self, a, b):
+        for key, names in b.items():
+            a.setdefault(key, []).extend(names)
+        return a
+
+    def finish(self, state, report):
+        for names in state.values():
+            for other in names[1:]:
+                yield f"DUPLICATE DESCRIPTION: '{names[0]}' and '{other}' have identical descriptions"
+
+@aggregate("similar_names", severity="warning", tags=("duplicates", "production"))
+class SimilarNames:
+    """Likely duplicates: similar names, weighted by shared industry, stage and description"""
+
+    def new(self):
+        return {"companies": [], "about": []}
+
+    def add(self, state, company, index):
+        state["companies"].append((text(company.get("company_name")), company.get("industry", ""),
+                                   company.get("company_stage", "")))
+        state["about"].append(text(company.get("about")).lower())
+
+    def seal(self, state):
+        # Shards send back MinHash signatures instead of the descriptions themselves
+        names = [name for name, _, _ in state["companies"]]
+        return {
+            "companies": state["companies"],
+            "signatures": name_signatures(names),
+            "about": description_signatures(state["about"]),
+        }
+
+    def merge(self, a, b):
+        a["companies"].extend(b["companies"])
+        a["signatures"] = np.concatenate((a["signatures"], b["signatures"]))
+        a["about"] = np.concatenate((a["about"], b["about"]))
+        return a
+
+    def finish(self, state, report):
+        companies = [{"company_name": name, "industry": industry, "company_stage": stage}
+                     for name, industry, stage in state["companies"]]
+        scored = []
+        pairs = find_similar_pairs(companies, min_similarity=0.8, score_descriptions=False,
+                                   signatures=state["signatures"])
+        for pair in pairs:
+            if pair["name1"].strip().lower() == pair["name2"].strip().lower():
+                continue  # exact repeats are reported by duplicate_names
+            confidence = pair["similarity"]
+            if pair["same_industry"]:
+                confidence += 0.1
+            if pair["same_stage"]:
+                confidence += 0.05
+            if description_similarity(state["about"], pair["index1"], pair["index2"]) > SIMILAR_DESCRIPTION:
+                confidence += 0.15
+            if confidence > 0.85:
+                scored.append((confidence, pair["name1"], pair["name2"]))
+        for confidence, name1, name2 in sorted(scored, reverse=True):
+            yield f"HIGH SIMILARITY: '{name1}' <-> '{name2}' (confidence: {confidence:.2f})"
+
+@aggregate("distributions", severity="stats", tags=("structure", "standardized", "production"))
+class Distributions:
+    """Value distributions and completeness; adds report['stats'], no issues"""
+
+    def new(self):
+        return {"industry": Counter(), "sub_industry": Counter(), "company_stage": Counter(), "size": Counter(),
+                "location": Counter(), "complete_companies": 0, "complete_roles": 0, "roles": 0}
+
+    def add(self, state, company, index):
+        for field in ("industry", "sub_industry", "company_stage", "size"):
+            state[field][str(company.get(field, ""))] += 1
+        if all([text(company.get("company_name")).strip(), text(company.get("about")).strip(),
+                text(company.get("industry")).strip(), company.get("culture_tags"), company.get("roles")]):
+            state["complete_companies"] += 1
+        roles = company.get("roles")
+        for role in roles if isinstance(roles, list) else []:
+            if not isinstance(role, dict):
+                continue
+            state["roles"] += 1
+            if role.get("location"):
+                state["location"][str(role["location"])] += 1
+            if all([text(role.get("title")).strip(), text(role.get("description")).strip(),
+                    text(role.get("location")).strip(), role.get("required_skills"), role.get("salary_range")]):
+                state["complete_roles"] += 1
+
+    def merge(self, a, b):
+        for key, value in b.items():
+            if isinstance(value, Counter):
+                a[key].update(value)
+            else:
+                a[key] += value
+        return a
+
+    def finish(self, state, report):
+        companies = max(report["companies"], 1)
+        roles = max(state["roles"], 1)
+        report["stats"]["distributions"] = {
+            "industry": dict(state["industry"]),
+            "sub_industry": dict(state["sub_industry"]),
+            "company_stage": dict(state["company_stage"]),
+            "size": dict(state["size"]),
+            "location": dict(state["location"].most_common(50)),
+        }
+        report["stats"]["completeness"] = {
+            "complete_companies": f"{state['complete_companies']}/{report['companies']} "
+                                  f"({state['complete_companies'] / companies * 100:.1f}%)",
+            "complete_roles": f"{state['complete_roles']}/{state['roles']} ({state['complete_roles'] / roles * 100:.1f}%)",
+        }
+        return iter(())
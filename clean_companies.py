@@ -1,39 +1,30 @@
 import json
-import re
 from collections import defaultdict
+from jsonl_io import iter_jsonl, is_jsonl
+from legacy_json import iter_legacy_companies
 
 def parse_malformed_json(file_path):
     """Parse the malformed JSON file and extract company records"""
-    with open(file_path, 'r') as f:
-        content = f.read()
+    # Single streaming pass over the `[...],\n[...],` legacy format
+    errors = []
+    companies = list(iter_legacy_companies(file_path, errors))
     
-    companies = []
-    
-    # Split content by array boundaries and parse each array
-    array_pattern = r'\[({[^}]*}(?:,\s*{[^}]*})*)\]'
-    arrays = re.findall(array_pattern, content, re.DOTALL)
-    
-    for array_content in arrays:
-        try:
-            # Wrap in array brackets and parse
-            json_string = '[' + array_content + ']'
-            parsed_companies = json.loads(json_string)
-            companies.extend(parsed_companies)
-        except json.JSONDecodeError:
-            # Try parsing individual objects
-            object_pattern = r'{[^{}]*(?:{[^{}]*}[^{}]*)*}'
-            objects = re.findall(object_pattern, array_content, re.DOTALL)
-            
-            for obj_str in objects:
-                try:
-                    company = json.loads(obj_str)
-                    companies.append(company)
-                except json.JSONDecodeError:
-                    continue
+    for error in errors[:10]:
+        print(f"Could not parse object at byte {error['offset']}: {error['error']}")
+    if len(errors) > 10:
+        print(f"... and {len(errors) - 10} more unparseable objects")
     
     print(f"Extracted {len(companies)} company records")
     return companies
 
+def load_raw_companies(file_path):
+    """Load the raw generation log: streamed JSONL, or the legacy malformed format"""
+    if is_jsonl(file_path):
+        companies = list(iter_jsonl(file_path))
+        print(f"Extracted {len(companies)} company records")
+        return companies
+    return parse_malformed_json(file_path)
+
 def deduplicate_companies(companies):
     """Remove duplicates, keeping the most complete record"""
     company_groups = defaultdict(list)
@@ -126,7 +117,7 @@ def main():
     output_file = '/Users/georgemccain/Desktop/untitled folder 2/data/cleaned_companies.json'
     
     print("Step 1: Parsing malformed JSON...")
-    companies = parse_malformed_json(input_file)
+    companies = load_raw_companies(input_file)
     
     print("\nStep 2: Removing duplicates...")
     deduplicated = deduplicate_companies(companies)
@@ -1,73 +1,82 @@
+import os
 import json
 import re
-from collections import defaultdict
+import glob
+from jsonl_io import iter_jsonl, is_jsonl
+from legacy_json import iter_legacy_companies
+
+DATA_DIR = "data"
 
 def parse_malformed_json(file_path):
     """Parse the malformed JSON file and extract company records"""
-    with open(file_path, 'r') as f:
-        content = f.read()
-    
-    companies = []
-    
-    # Use regex to find all complete company objects
-    company_pattern = r'\{"company_name":\s*"[^"]*"[^}]*\}'
-    matches = re.finditer(company_pattern, content, re.DOTALL)
-    
-    for match in matches:
-        company_str = match.group()
-        
-        # Find the complete object by counting braces
-        start_pos = match.start()
-        brace_count = 0
-        end_pos = start_pos
-        
-        for i, char in enumerate(content[start_pos:], start_pos):
-            if char == '{':
-                brace_count += 1
-            elif char == '}':
-                brace_count -= 1
-                if brace_count == 0:
-                    end_pos = i + 1
-                    break
-        
-        try:
-            company_json = content[start_pos:end_pos]
-            company = json.loads(company_json)
-            companies.append(company)
-        except json.JSONDecodeError:
-            continue
-    
-    print(f"Extracted {len(companies)} company records")
-    return companies
+    # Single streaming pass over the `[...],\n[...],` legacy format
+    errors = []
+    yield from iter_legacy_companies(file_path, errors)
+    
+    for error in errors[:10]:
+        print(f"Could not parse object at byte {error['offset']}: {error['error']}")
+    if len(errors) > 10:
+        print(f"... and {len(errors) - 10} more unparseable objects")
+
+def batch_number(path):
+    match = re.search(r"_batch(\d+)\.jsonl", path)
+    return int(match.group(1)) if match else 0
+
+def raw_log_paths(data_dir=DATA_DIR):
+    """Every raw generation log main.py writes (enriched_companies_batchN.jsonl[.gz|.zst]),
+    in batch order; the legacy malformed JSON file if there are none"""
+    paths = []
+    for pattern in ("enriched_companies.jsonl*", "enriched_companies_batch*.jsonl*"):
+        paths += [path for path in glob.glob(os.path.join(data_dir, pattern)) if is_jsonl(path)]
+    paths = sorted(set(paths), key=lambda path: (batch_number(path), path))
+    return paths or [os.path.join(data_dir, "enriched_companies.json")]
+
+def load_raw_companies(*file_paths):
+    """Stream companies from raw generation logs: JSONL, or the legacy malformed format"""
+    for file_path in file_paths:
+        if is_jsonl(file_path):
+            yield from iter_jsonl(file_path)
+        else:
+            yield from parse_malformed_json(file_path)
+
+def completeness(company):
+    """How complete a record is; the most complete copy of a company is kept"""
+    return (
+        len([k for k, v in company.items() if v and v != [] and v != ""]),  # Non-empty fields
+        len(str(company.get('about', ''))),                                # Description length
+        len(company.get('roles', [])),                                     # Number of roles
+        len(company.get('tech_stack', []))                                 # Tech stack size
+    )
 
 def deduplicate_companies(companies):
-    """Remove duplicates, keeping the most complete record"""
-    company_groups = defaultdict(list)
+    """Remove duplicates, keeping the most complete record
+
+    Companies are consumed one at a time; only the best copy of each name is held.
+    """
+    best = {}
+    copies = {}
+    records = 0
     
-    # Group companies by name
     for company in companies:
+        records += 1
+        if not isinstance(company, dict):
+            continue
         name = company.get('company_name', '').strip()
-        if name:
-            company_groups[name].append(company)
+        if not name:
+            continue
+        copies[name] = copies.get(name, 0) + 1
+        # Ties keep the earliest copy
+        if name not in best or completeness(company) > best[name][0]:
+            best[name] = (completeness(company), company)
     
-    deduplicated = []
+    deduplicated = [company for _, company in best.values()]
     duplicates_removed = 0
+    for name, count in copies.items():
+        if count > 1:
+            duplicates_removed += count - 1
+            print(f"Deduplicated '{name}': kept 1 of {count} records")
     
-    for name, group in company_groups.items():
-        if len(group) == 1:
-            deduplicated.append(group[0])
-        else:
-            # Find the most complete record
-            best_company = max(group, key=lambda c: (
-                len([k for k, v in c.items() if v and v != [] and v != ""]),  # Non-empty fields
-                len(str(c.get('about', ''))),                                # Description length
-                len(c.get('roles', [])),                                     # Number of roles
-                len(c.get('tech_stack', []))                                 # Tech stack size
-            ))
-            deduplicated.append(best_company)
-            duplicates_removed += len(group) - 1
-            print(f"Deduplicated '{name}': kept 1 of {len(group)} records")
-    
+    print(f"Extracted {records} company records")
     print(f"After deduplication: {len(deduplicated)} companies")
     print(f"Duplicates removed: {duplicates_removed}")
     return deduplicated
@@ -164,23 +173,8 @@ def validate_companies(companies):
     
     return issues
 
-def main():
-    input_file = '/Users/georgemccain/Desktop/untitled folder 2/data/enriched_companies.json'
-    output_file = '/Users/georgemccain/Desktop/untitled folder 2/data/cleaned_companies.json'
-    
-    print("Step 1: Parsing malformed JSON...")
-    companies = parse_malformed_json(input_file)
-    
-    if not companies:
-        print("No companies found! Trying alternative parsing...")
-        # Alternative: use regex to extract company data
-        with open(input_file, 'r') as f:
-            content = f.read()
-        
-        company_names = re.findall(r'"company_name":\s*"([^"]+)"', content)
-        print(f"Found {len(company_names)} company name references")
-        return
-    
+def clean_raw_companies(companies):
+    """Deduplicate, fix and validate raw companies; returns the cleaned list"""
     print("\nStep 2: Removing duplicates...")
     deduplicated = deduplicate_companies(companies)
     
@@ -198,14 +192,40 @@ def main():
     else:
         print("No validation issues found")
     
+    return cleaned
+
+def main():
+    input_files = raw_log_paths()
+    output_file = os.path.join(DATA_DIR, 'cleaned_companies.json')
+    
+    print(f"Step 1: Streaming {len(input_files)} raw generation log(s)...")
+    records = {"read": 0}
+    def counted(companies):
+        for company in companies:
+            records["read"] += 1
+            yield company
+    
+    cleaned = clean_raw_companies(counted(load_raw_companies(*input_files)))
+    
+    if not records["read"]:
+        print("No companies found! Trying alternative parsing...")
+        # Alternative: use regex to extract company data
+        for input_file in input_files:
+            with open(input_file, 'r') as f:
+                content = f.read()
+            
+            company_names = re.findall(r'"company_name":\s*"([^"]+)"', content)
+            print(f"Found {len(company_names)} company name references in {input_file}")
+        return
+    
     print("\nStep 5: Writing cleaned data...")
     with open(output_file, 'w') as f:
         json.dump(cleaned, f, indent=2, ensure_ascii=False)
     
     print(f"\nCleaning complete!")
-    print(f"Original: {len(companies)} companies")
+    print(f"Original: {records['read']} companies")
     print(f"Cleaned: {len(cleaned)} companies") 
-    print(f"Removed: {len(companies) - len(cleaned)} duplicates")
+    print(f"Removed: {records['read'] - len(cleaned)} duplicates")
     print(f"Output saved to: {output_file}")
     
     # Validate the output JSON
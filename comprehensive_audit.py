@@ -1,7 +1,6 @@
 import json
-import re
 import collections
-from difflib import SequenceMatcher
+from near_duplicates import clean_name, find_similar_pairs
 
 def load_and_examine_file():
     """Load and examine the standardized companies file"""
@@ -39,25 +38,22 @@ def check_duplicates_and_similar(companies):
     
     # Check for similar company names (potential duplicates)
     similar_pairs = []
-    company_names = [(i, company.get('company_name', '')) for i, company in enumerate(companies)]
+    # Blocked recall at 0.75 is 0.97; up to EXHAUSTIVE_NAMES companies every pair is scored
+    candidates = find_similar_pairs(companies, min_similarity=0.75, include_substrings=True, score_descriptions=False)
     
-    for i, (idx1, name1) in enumerate(company_names):
-        for idx2, name2 in company_names[i+1:]:
-            if name1 and name2:
-                # Calculate similarity
-                similarity = SequenceMatcher(None, name1.lower(), name2.lower()).ratio()
-                
-                # Check for substring relationships or high similarity
-                name1_clean = re.sub(r'\s+(inc\.?|corp\.?|corporation|company|llc|ltd\.?|co\.?)$', '', name1.lower().strip())
-                name2_clean = re.sub(r'\s+(inc\.?|corp\.?|corporation|company|llc|ltd\.?|co\.?)$', '', name2.lower().strip())
-                
-                if (similarity > 0.85 or 
-                    name1_clean in name2_clean or 
-                    name2_clean in name1_clean or
-                    abs(len(name1_clean) - len(name2_clean)) <= 3 and similarity > 0.75):
-                    
-                    similar_pairs.append((name1, name2, similarity))
-                    issues.append(f"SIMILAR: '{name1}' <-> '{name2}' (similarity: {similarity:.2f})")
+    for pair in candidates:
+        name1, name2, similarity = pair['name1'], pair['name2'], pair['similarity']
+        
+        # Check for substring relationships or high similarity
+        name1_clean = clean_name(name1)
+        name2_clean = clean_name(name2)
+        
+        if (similarity > 0.85 or 
+            pair['substring'] or
+            abs(len(name1_clean) - len(name2_clean)) <= 3 and similarity > 0.75):
+            
+            similar_pairs.append((name1, name2, similarity))
+            issues.append(f"SIMILAR: '{name1}' <-> '{name2}' (similarity: {similarity:.2f})")
     
     print(f"Similar company names: {len(similar_pairs)}")
     for name1, name2, sim in similar_pairs[:10]:  # Show first 10
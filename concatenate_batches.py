@@ -1,12 +1,15 @@
 #!/usr/bin/env python3
 
 import os
+import sys
 import json
 import glob
 from datetime import datetime
 
-def concatenate_batch_files():
-    """Concatenate all batch files into one master file"""
+from stream_combine import combine_batches
+
+def concatenate_batch_files(jsonl=False, workers=1):
+    """Concatenate all batch files into one master file, streaming one company at a time"""
     
     print("🔍 Looking for batch files...")
     
@@ -15,65 +18,41 @@ def concatenate_batch_files():
     
     if not batch_files:
         print("❌ No batch files found!")
-        return
+        return None, None
     
     print(f"📁 Found {len(batch_files)} batch files")
     
-    all_companies = []
-    total_roles = 0
+    # Create master file; the enrichment scripts look for companies_master_*.json
+    extension = "jsonl" if jsonl else "json"
+    master_filename = f"companies_master_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
     
-    for i, batch_file in enumerate(batch_files, 1):
-        print(f"📂 Processing {batch_file} ({i}/{len(batch_files)})")
+    print(f"\n💾 Writing master file: {master_filename}")
         
-        try:
-            with open(batch_file, 'r') as f:
-                batch_companies = json.load(f)
-            
-            # Add batch info to each company
-            for company in batch_companies:
-                company['batch_file'] = batch_file
-                company['batch_number'] = i
+    stats = combine_batches(
+        batch_files, master_filename, dedupe=False, tag_batch=True, workers=workers,
+        on_file=lambda number, path: print(f"📂 Processing {path} ({number}/{len(batch_files)})")
+    )
             
-            all_companies.extend(batch_companies)
+    for error in stats["errors"]:
+        print(f"   ❌ Error processing {error['file']} at byte {error['offset']}: {error['error']}")
             
-            batch_roles = sum(len(company['roles']) for company in batch_companies)
-            total_roles += batch_roles
-            
-            print(f"   ✅ Added {len(batch_companies)} companies, {batch_roles} roles")
-            
-        except Exception as e:
-            print(f"   ❌ Error processing {batch_file}: {e}")
-            continue
-    
-    if not all_companies:
+    if not stats["written"]:
         print("❌ No companies found in batch files!")
-        return
-    
-    # Create master file
-    master_filename = f"companies_master_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-    
-    print(f"\n💾 Saving master file: {master_filename}")
-    
-    with open(master_filename, 'w') as f:
-        json.dump(all_companies, f, indent=2)
+        os.remove(master_filename)
+        return None, None
     
     # Create summary file
     summary = {
         "master_file": master_filename,
-        "total_companies": len(all_companies),
-        "total_roles": total_roles,
+        "total_companies": stats["written"],
+        "total_roles": stats["roles"],
         "batch_files_processed": len(batch_files),
         "concatenated_at": datetime.now().isoformat(),
-        "industries": list(set(company['industry'] for company in all_companies)),
-        "company_stages": list(set(company.get('company_stage', 'Unknown') for company in all_companies)),
-        "size_distribution": {}
+        "industries": stats["industries"],
+        "company_stages": stats["company_stages"],
+        "size_distribution": stats["size_distribution"]
     }
     
-    # Calculate size distribution
-    sizes = [company.get('size', 'Unknown') for company in all_companies]
-    for size in set(sizes):
-        summary['size_distribution'][size] = sizes.count(size)
-    
     summary_filename = f"companies_summary_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
     
     with open(summary_filename, 'w') as f:
@@ -84,8 +63,8 @@ def concatenate_batch_files():
     
     print(f"\n🎉 Concatenation complete!")
     print(f"📊 Master file: {master_filename} ({master_size:.1f} MB)")
-    print(f"📈 Total companies: {len(all_companies):,}")
-    print(f"🎯 Total roles: {total_roles:,}")
+    print(f"📈 Total companies: {stats['written']:,}")
+    print(f"🎯 Total roles: {stats['roles']:,}")
     print(f"🏭 Industries: {len(summary['industries'])}")
     print(f"📄 Summary: {summary_filename}")
     
@@ -111,7 +90,9 @@ def clean_batch_files():
         print(f"✅ Cleaned up {len(batch_files)} batch files")
 
 if __name__ == "__main__":
-    master_file, summary_file = concatenate_batch_files()
+    # python concatenate_batches.py [--jsonl] [--workers N]
+    workers = int(sys.argv[sys.argv.index("--workers") + 1]) if "--workers" in sys.argv else 1
+    master_file, summary_file = concatenate_batch_files(jsonl="--jsonl" in sys.argv, workers=workers)
     
     if master_file:
         # clean_batch_files()  # Uncomment to enable cleanup prompt
@@ -1,13 +1,17 @@
+import os
 import json
 import csv
 import pandas as pd
 
-def convert_companies_to_csv():
+DATA_DIR = "data"
+
+def convert_companies_to_csv(companies=None, output_dir=DATA_DIR):
     """Convert the complete companies JSON dataset to CSV format"""
     
-    # Load the complete dataset
-    with open('/Users/georgemccain/Desktop/untitled folder 2/data/complete_companies_dataset.json', 'r') as f:
-        companies = json.load(f)
+    # Load the complete dataset unless the caller already has it in memory
+    if companies is None:
+        with open(os.path.join(DATA_DIR, 'complete_companies_dataset.json'), 'r') as f:
+            companies = json.load(f)
     
     print(f"📊 Loading {len(companies)} companies from JSON...")
     
@@ -53,7 +57,7 @@ def convert_companies_to_csv():
             roles_data.append(role_row)
     
     # Save companies CSV
-    companies_csv_path = '/Users/georgemccain/Desktop/untitled folder 2/data/companies.csv'
+    companies_csv_path = os.path.join(output_dir, 'companies.csv')
     companies_df = pd.DataFrame(companies_data)
     companies_df.to_csv(companies_csv_path, index=False, encoding='utf-8')
     
@@ -61,7 +65,7 @@ def convert_companies_to_csv():
     print(f"   📊 {len(companies_data)} companies")
     
     # Save roles CSV
-    roles_csv_path = '/Users/georgemccain/Desktop/untitled folder 2/data/roles.csv'
+    roles_csv_path = os.path.join(output_dir, 'roles.csv')
     roles_df = pd.DataFrame(roles_data)
     roles_df.to_csv(roles_csv_path, index=False, encoding='utf-8')
     
@@ -69,7 +73,7 @@ def convert_companies_to_csv():
     print(f"   📊 {len(roles_data)} roles")
     
     # Create a flattened single CSV (one row per role with company info)
-    flattened_csv_path = '/Users/georgemccain/Desktop/untitled folder 2/data/complete_dataset_flattened.csv'
+    flattened_csv_path = os.path.join(output_dir, 'complete_dataset_flattened.csv')
     roles_df.to_csv(flattened_csv_path, index=False, encoding='utf-8')
     
     print(f"✅ Flattened CSV saved: {flattened_csv_path}")
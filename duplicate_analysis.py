@@ -1,5 +1,5 @@
 import json
-from difflib import SequenceMatcher
+from near_duplicates import find_similar_pairs
 
 def analyze_potential_duplicates():
     """Analyze the most concerning potential duplicate companies"""
@@ -12,33 +12,23 @@ def analyze_potential_duplicates():
     
     # Find high-confidence potential duplicates
     high_confidence_duplicates = []
-    company_names = [(i, company.get('company_name', '')) for i, company in enumerate(companies)]
     
-    for i, (idx1, name1) in enumerate(company_names):
-        for idx2, name2 in company_names[i+1:]:
-            if name1 and name2:
-                similarity = SequenceMatcher(None, name1.lower(), name2.lower()).ratio()
-                
-                # High confidence duplicate criteria
-                if similarity > 0.8 or (similarity > 0.6 and abs(len(name1) - len(name2)) <= 10):
-                    company1 = companies[idx1]
-                    company2 = companies[idx2]
-                    
-                    # Additional checks for same company
-                    same_industry = company1.get('industry') == company2.get('industry')
-                    same_about = SequenceMatcher(None, 
-                                               company1.get('about', '').lower(),
-                                               company2.get('about', '').lower()).ratio() > 0.7
-                    
-                    high_confidence_duplicates.append({
-                        'name1': name1,
-                        'name2': name2,
-                        'similarity': similarity,
-                        'same_industry': same_industry,
-                        'same_about': same_about,
-                        'company1': company1,
-                        'company2': company2
-                    })
+    # At 0.6 blocking would find only ~53% of qualifying pairs (most merely share a word
+    # like "Capital"), so datasets of up to EXHAUSTIVE_NAMES companies are scored pair by pair
+    for pair in find_similar_pairs(companies, min_similarity=0.6):
+        name1, name2, similarity = pair['name1'], pair['name2'], pair['similarity']
+        
+        # High confidence duplicate criteria
+        if similarity > 0.8 or abs(len(name1) - len(name2)) <= 10:
+            high_confidence_duplicates.append({
+                'name1': name1,
+                'name2': name2,
+                'similarity': similarity,
+                'same_industry': pair['same_industry'],
+                'same_about': pair['desc_similarity'] > 0.7,
+                'company1': companies[pair['index1']],
+                'company2': companies[pair['index2']]
+            })
     
     print(f"High-confidence potential duplicates: {len(high_confidence_duplicates)}")
     print()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Batched dense embeddings with an on-disk cache.
+
+Texts are sent to the embedding provider many at a time (up to its input
+limit) and every vector is cached in SQLite, keyed by a hash of the model,
+dimension count and text. Re-runs, or runs where only metadata changed, are
+served entirely from the cache.
+"""
+
+import os
+import sqlite3
+import hashlib
+import threading
+from array import array
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+EMBEDDING_DIMENSIONS = 1024  # Match Pinecone index dimension
+EMBEDDING_CACHE_PATH = os.path.join("cache", "embeddings.db")
+
+# OpenAI accepts up to 2048 inputs per request; keep the payload well under its token cap
+MAX_BATCH_INPUTS = 2048
+MAX_BATCH_CHARS = 600_000
+
+def openai_embed(texts, model, dimensions):
+    """Default provider: one OpenAI embeddings request for a list of texts"""
+    import openai
+    if not getattr(openai_embed, "client", None):
+        openai_embed.client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    response = openai_embed.client.embeddings.create(input=texts, model=model, dimensions=dimensions)
+    # The API returns results tagged with their input position
+    return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+class BatchEmbedder:
+    """Embeds texts in large batches and caches the vectors on disk"""
+
+    def __init__(self, model=EMBEDDING_MODEL, dimensions=EMBEDDING_DIMENSIONS,
+                 cache_path=EMBEDDING_CACHE_PATH, embed_fn=None,
+                 max_batch_inputs=MAX_BATCH_INPUTS, max_batch_chars=MAX_BATCH_CHARS):
+        self.model = model
+        self.dimensions = dimensions
+        self.embed_fn = embed_fn or openai_embed
+        self.max_batch_inputs = max_batch_inputs
+        self.max_batch_chars = max_batch_chars
+
+        if cache_path != ":memory:":
+            os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(cache_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB)")
+        self.conn.commit()
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.requests = 0
+        # Keys embedded by prefetch(); their next lookup is not counted again
+        self.prefetched = set()
+
+    def cache_key(self, text):
+        return hashlib.sha256(f"{self.model}\n{self.dimensions}\n{text}".encode()).hexdigest()
+
+    def _load(self, keys):
+        found = {}
+        keys = list(keys)
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self.conn.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk
+            ).fetchall()
+            for key, blob in rows:
+                found[key] = array("f", blob).tolist()
+        return found
+
+    def _store(self, items):
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+            [(key, vector.tobytes()) for key, vector in items]
+        )
+        self.conn.commit()
+
+    def _batches(self, texts):
+        batch, chars = [], 0
+        for text in texts:
+            if batch and (len(batch) >= self.max_batch_inputs or chars + len(text) > self.max_batch_chars):
+                yield batch
+                batch, chars = [], 0
+            batch.append(text)
+            chars += len(text)
+        if batch:
+            yield batch
+
+    def embed_many(self, texts):
+        """Return one vector per text, only sending cache misses to the provider"""
+        keys = [self.cache_key(text) for text in texts]
+        with self.lock:
+            vectors = self._load(set(keys))
+
+            # Deduplicate misses so identical texts are embedded once
+            missing = {}
+            for key, text in zip(keys, texts):
+                if key in vectors or key in missing:
+                    continue
+                missing[key] = text
+            prefetched = self.prefetched.intersection(keys)
+            self.prefetched -= prefetched
+            self.hits += len(texts) - len(missing) - sum(key in prefetched for key in keys)
+            self.misses += len(missing)
+
+            miss_keys = list(missing)
+            offset = 0
+            for batch in self._batches([missing[key] for key in miss_keys]):
+                embedded = self.embed_fn(batch, self.model, self.dimensions)
+                if len(embedded) != len(batch):
+                    raise ValueError(f"Embedding provider returned {len(embedded)} vectors for {len(batch)} texts")
+                self.requests += 1
+                batch_keys = miss_keys[offset:offset + len(batch)]
+                offset += len(batch)
+                packed = [array("f", vector) for vector in embedded]
+                self._store(zip(batch_keys, packed))
+                # Return the stored float32 values so fresh and cached results match
+                vectors.update((key, vector.tolist()) for key, vector in zip(batch_keys, packed))
+
+        return [vectors[key] for key in keys]
+
+    def embed(self, text):
+        return self.embed_many([text])[0]
+
+    def prefetch(self, texts):
+        """Embed and cache texts ahead of the embed_many() calls that will use them"""
+        self.embed_many(texts)
+        with self.lock:
+            self.prefetched.update(self.cache_key(text) for text in texts)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "requests": self.requests,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
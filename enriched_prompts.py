@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Prompt pieces for sub-industry company generation with prompt caching.
+
+The instructions and JSON schema are identical for every sub-industry, so
+they go into a system prompt marked with `cache_control`; the API caches
+that prefix and later requests read it at the cached-token rate. Only the
+industry, sub-industry, count and exclusions travel in the user message.
+The API only caches prefixes above a model-specific minimum (1024 tokens
+for Sonnet); below it the request is served normally and the usage log
+shows no cache reads. A field reference and one example company, both
+restating the schema rather than adding rules, keep the prefix above that
+minimum with either schema; system_blocks() leaves out the breakpoint for
+any prefix that still falls short.
+
+The compact schema asks for short keys (and drops industry/sub_industry,
+which we already know) to cut output tokens; expand_companies() restores
+the usual field names locally. Expansion is idempotent, so responses that
+already use full names pass through unchanged.
+"""
+
+import json
+
+ROLE_EXAMPLES = """Examples of industry-appropriate roles:
+- Investment Banks: Investment Banking Analyst, Equity Research Associate, Trader, Managing Director, Vice President M&A
+- Manufacturing: Production Manager, Quality Engineer, Plant Supervisor, Supply Chain Analyst, Manufacturing Engineer
+- Healthcare: Registered Nurse, Physician, Medical Technician, Clinical Research Coordinator, Healthcare Administrator
+- Retail: Store Manager, Buyer, Visual Merchandiser, Inventory Planner, District Manager"""
+
+INSTRUCTIONS = f"""You are a recruitment expert with access to web search data. You generate real companies for a requested sub-industry.
+
+For EACH company, create EXACTLY 5-8 job roles that actually exist at that specific type of company based on real job postings and company structures.
+
+IMPORTANT: Generate 5-8 roles per company to keep responses manageable. Include entry-level, mid-level, senior, and executive positions.
+
+Research and use REAL job titles from actual companies in this industry. DO NOT use generic templates.
+
+{ROLE_EXAMPLES}
+
+Use realistic:
+- Job titles that exist at these companies
+- Department structures
+- Salary ranges for the industry/location
+- Required skills specific to the role
+- Company stages and sizes"""
+
+FULL_SCHEMA = """JSON format:
+[
+  {
+    "company_name": "Real Company Name",
+    "about": "What this company actually does",
+    "industry": "<the requested industry>",
+    "sub_industry": "<the requested sub-industry>",
+    "company_stage": "Public/Private/Startup",
+    "size": "Actual employee count range",
+    "culture_tags": ["Based on real company culture"],
+    "tech_stack": ["Tools actually used in this industry"],
+    "roles": [
+      {
+        "title": "Real job title from job postings",
+        "department": "Actual department name",
+        "description": "Real job responsibilities",
+        "required_skills": ["Skills from real job postings"],
+        "nice_to_have_skills": ["Additional relevant skills"],
+        "location": "Real office locations",
+        "salary_range": [market_rate_min, market_rate_max],
+        "visa_sponsorship": true/false,
+        "min_experience_years": 0-15,
+        "seniority_level": "Entry/Mid/Senior/Director/VP/C-Suite"
+      }
+    ]
+  }
+]
+
+Return ONLY valid JSON with realistic data."""
+
+# Short key -> full field name
+COMPACT_COMPANY_KEYS = {
+    "n": "company_name",
+    "a": "about",
+    "st": "company_stage",
+    "sz": "size",
+    "ct": "culture_tags",
+    "ts": "tech_stack",
+    "r": "roles",
+}
+
+COMPACT_ROLE_KEYS = {
+    "t": "title",
+    "d": "department",
+    "ds": "description",
+    "rs": "required_skills",
+    "ns": "nice_to_have_skills",
+    "l": "location",
+    "s": "salary_range",
+    "v": "visa_sponsorship",
+    "x": "min_experience_years",
+    "sl": "seniority_level",
+}
+
+COMPACT_SCHEMA = """Compact JSON format: a minified array (no indentation, no extra whitespace) using these short keys:
+n = company name, a = what the company actually does, st = stage (Public/Private/Startup),
+sz = employee count range, ct = culture tags (list), ts = tech stack (list), r = roles (list).
+Each role: t = title, d = department, ds = responsibilities, rs = required skills (list),
+ns = nice-to-have skills (list), l = office location, s = [salary_min, salary_max],
+v = visa sponsorship (true/false), x = minimum years of experience (0-15),
+sl = seniority (Entry/Mid/Senior/Director/VP/C-Suite).
+
+Example: [{"n":"...","a":"...","st":"Private","sz":"1000-5000","ct":["..."],"ts":["..."],"r":[{"t":"...","d":"...","ds":"...","rs":["..."],"ns":["..."],"l":"City, ST","s":[90000,130000],"v":true,"x":3,"sl":"Mid"}]}]
+
+Return ONLY valid JSON with realistic data."""
+
+# What every field holds, in the words of the schema and instructions above
+FIELD_REFERENCE = (
+    ("company_name", "the real company's name."),
+    ("about", "what this company actually does."),
+    ("industry / sub_industry", "the requested industry and sub-industry."),
+    ("company_stage", "Public, Private or Startup."),
+    ("size", "the company's actual employee count range."),
+    ("culture_tags", "a list of tags based on the real company culture."),
+    ("tech_stack", "a list of tools actually used in this industry."),
+    ("roles", "the 5-8 job roles that actually exist at this company, covering entry-level, mid-level, "
+              "senior and executive positions."),
+    ("title", "a real job title from job postings at companies like this one."),
+    ("department", "the actual department name the role belongs to."),
+    ("description", "the real job responsibilities."),
+    ("required_skills", "a list of skills from real job postings for the role."),
+    ("nice_to_have_skills", "a list of additional relevant skills."),
+    ("location", "a real office location of the company."),
+    ("salary_range", "[minimum, maximum] market rate for the industry and location."),
+    ("visa_sponsorship", "true or false."),
+    ("min_experience_years", "a whole number of years from 0 to 15."),
+    ("seniority_level", "Entry, Mid, Senior, Director, VP or C-Suite."),
+)
+
+def field_reference(compact=False):
+    # The compact schema leaves out industry / sub_industry
+    fields = [(field, text) for field, text in FIELD_REFERENCE if not (compact and field.startswith("industry"))]
+    return "Field reference:\n" + "\n".join(f"- {field}: {text}" for field, text in fields)
+
+# One company in the output format; rendered with full or short keys
+EXAMPLE_COMPANY = {
+    "company_name": "Moderna",
+    "about": "Biotechnology company developing mRNA medicines and vaccines for infectious diseases, oncology and rare diseases",
+    "industry": "Healthcare",
+    "sub_industry": "Biotechnology",
+    "company_stage": "Public",
+    "size": "5000-10000",
+    "culture_tags": ["Science-driven", "Fast-paced", "Mission-focused"],
+    "tech_stack": ["Python", "AWS", "Benchling", "Tableau"],
+    "roles": [
+        {"title": "Research Associate, mRNA Platform", "department": "Research",
+         "description": "Runs in-vitro assays and formulation screens for mRNA candidates",
+         "required_skills": ["Cell culture", "qPCR", "ELISA"], "nice_to_have_skills": ["Lipid nanoparticle formulation"],
+         "location": "Cambridge, MA", "salary_range": [70000, 95000], "visa_sponsorship": True,
+         "min_experience_years": 1, "seniority_level": "Entry"},
+        {"title": "Clinical Data Manager", "department": "Clinical Development",
+         "description": "Builds and cleans clinical trial databases and resolves data queries with trial sites",
+         "required_skills": ["EDC systems", "CDISC", "SQL"], "nice_to_have_skills": ["Medidata Rave"],
+         "location": "Cambridge, MA", "salary_range": [100000, 135000], "visa_sponsorship": True,
+         "min_experience_years": 3, "seniority_level": "Mid"},
+        {"title": "Senior Scientist, Process Development", "department": "Technical Development",
+         "description": "Scales purification processes from bench to GMP manufacturing",
+         "required_skills": ["Chromatography", "Tangential flow filtration", "Design of experiments"],
+         "nice_to_have_skills": ["JMP"], "location": "Norwood, MA", "salary_range": [120000, 160000],
+         "visa_sponsorship": True, "min_experience_years": 6, "seniority_level": "Senior"},
+        {"title": "Director, Clinical Operations", "department": "Clinical Development",
+         "description": "Leads global execution of Phase 3 vaccine trials and their CRO partners",
+         "required_skills": ["ICH-GCP", "Vendor management", "Trial budgeting"], "nice_to_have_skills": ["PMP"],
+         "location": "Cambridge, MA", "salary_range": [190000, 250000], "visa_sponsorship": False,
+         "min_experience_years": 12, "seniority_level": "Director"},
+        {"title": "Chief Medical Officer", "department": "Executive Leadership",
+         "description": "Sets clinical development strategy and leads regulatory interactions across the pipeline",
+         "required_skills": ["Drug development", "Regulatory strategy", "Executive leadership"],
+         "nice_to_have_skills": ["Vaccine approvals"], "location": "Cambridge, MA", "salary_range": [500000, 900000],
+         "visa_sponsorship": False, "min_experience_years": 15, "seniority_level": "C-Suite"},
+    ],
+}
+
+def example_block(compact=False):
+    """EXAMPLE_COMPANY as a response in the chosen schema would contain it"""
+    if not compact:
+        return "Example of one company in the format below:\n" + json.dumps([EXAMPLE_COMPANY], indent=2)
+    company_keys = {full: short for short, full in COMPACT_COMPANY_KEYS.items()}
+    role_keys = {full: short for short, full in COMPACT_ROLE_KEYS.items()}
+    company = {company_keys[key]: value for key, value in EXAMPLE_COMPANY.items() if key in company_keys}
+    company["r"] = [{role_keys[key]: value for key, value in role.items()} for role in EXAMPLE_COMPANY["roles"]]
+    return "Example of one company in the format below:\n" + json.dumps([company], separators=(",", ":"))
+
+# Smallest prefix Sonnet will cache, and a conservative chars-per-token
+# ratio for English prose (JSON and lists tokenize denser than this)
+CACHE_MIN_TOKENS = 1024
+CHARS_PER_TOKEN = 4
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN
+
+def system_blocks(compact=False):
+    """System prompt blocks; the whole static prefix is one cache breakpoint"""
+    schema = COMPACT_SCHEMA if compact else FULL_SCHEMA
+    block = {"type": "text", "text": f"{INSTRUCTIONS}\n\n{field_reference(compact)}\n\n{example_block(compact)}\n\n{schema}"}
+    if estimate_tokens(block["text"]) >= CACHE_MIN_TOKENS:
+        block["cache_control"] = {"type": "ephemeral"}
+    return [block]
+
+def build_user_prompt(industry, subindustry, web_data, count, exclude=()):
+    """The per-request part of the prompt"""
+    prompt = f"""Generate {count} real companies in "{subindustry}" ({industry}).
+
+Web search context: {web_data}"""
+    if exclude:
+        prompt += f"\n\nThese companies are already covered, do NOT include them: {', '.join(exclude)}"
+    return prompt
+
+def _expand(record, keys):
+    return {keys.get(key, key): value for key, value in record.items()}
+
+def expand_company(company, industry, subindustry):
+    """Full field names for a compact company (no-op for full-schema companies)"""
+    if not isinstance(company, dict):
+        return company
+    expanded = _expand(company, COMPACT_COMPANY_KEYS)
+    expanded.setdefault("industry", industry)
+    expanded.setdefault("sub_industry", subindustry)
+    roles = expanded.get("roles")
+    if isinstance(roles, list):
+        expanded["roles"] = [_expand(role, COMPACT_ROLE_KEYS) if isinstance(role, dict) else role for role in roles]
+    return expanded
+
+def expand_companies(companies, industry, subindustry):
+    return [expand_company(company, industry, subindustry) for company in companies]
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Columnar export of companies and roles to Parquet or Arrow IPC.
+
+The companion of convert_to_csv.py for analysis at scale. List fields
+(culture_tags, tech_stack, required_skills, nice_to_have_skills) stay
+list<string> columns instead of comma-joined text, and salaries,
+experience and visa sponsorship get numeric / boolean types. Companies are
+consumed as a stream and written one row group at a time, so a million
+roles never sit in memory as Python dicts, and every Parquet row group
+carries min/max statistics that readers use to skip data when filtering
+(pyarrow.dataset, DuckDB, Polars, Spark).
+
+The format follows the output extension: .parquet, or .arrow / .feather
+for Arrow IPC. pyarrow is an optional dependency needed only here.
+
+Usage:
+    python export_columnar.py [input.json|input.jsonl] [output_dir] [--arrow]
+"""
+
+import os
+import re
+import sys
+
+from jsonl_io import iter_jsonl, is_jsonl
+from legacy_json import iter_legacy_companies
+
+DATA_DIR = "data"
+ROW_GROUP_SIZE = 50_000
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("Columnar export needs the 'pyarrow' package (pip install pyarrow)")
+    return pyarrow
+
+def company_schema(pa):
+    return pa.schema([
+        ("company_name", pa.string()),
+        ("about", pa.string()),
+        ("industry", pa.string()),
+        ("sub_industry", pa.string()),
+        ("company_stage", pa.string()),
+        ("size", pa.string()),
+        ("culture_tags", pa.list_(pa.string())),
+        ("tech_stack", pa.list_(pa.string())),
+        ("total_roles", pa.int32()),
+    ])
+
+def role_schema(pa):
+    return pa.schema([
+        ("company_name", pa.string()),
+        ("industry", pa.string()),
+        ("sub_industry", pa.string()),
+        ("company_stage", pa.string()),
+        ("company_size", pa.string()),
+        ("role_title", pa.string()),
+        ("department", pa.string()),
+        ("seniority_level", pa.string()),
+        ("role_description", pa.string()),
+        ("required_skills", pa.list_(pa.string())),
+        ("nice_to_have_skills", pa.list_(pa.string())),
+        ("location", pa.string()),
+        ("salary_min", pa.int64()),
+        ("salary_max", pa.int64()),
+        ("visa_sponsorship", pa.bool_()),
+        ("min_experience_years", pa.int32()),
+    ])
+
+# ---------- Value coercion (generated data is not always well typed) ----------
+
+def text(value):
+    if value is None:
+        return None
+    return value if isinstance(value, str) else str(value)
+
+def string_list(value):
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [part.strip() for part in value.split(",") if part.strip()]
+    if isinstance(value, (list, tuple)):
+        return [str(item) for item in value if item is not None]
+    return [str(value)]
+
+def integer(value):
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str):
+        match = re.search(r"\d[\d,]*", value)
+        if match:
+            return int(match.group().replace(",", ""))
+    return None
+
+def boolean(value):
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        lowered = value.strip().lower()
+        if lowered in ("true", "yes", "y", "1"):
+            return True
+        if lowered in ("false", "no", "n", "0"):
+            return False
+    if isinstance(value, (int, float)):
+        return bool(value)
+    return None
+
+def company_row(company):
+    return {
+        "company_name": text(company.get("company_name")),
+        "about": text(company.get("about")),
+        "industry": text(company.get("industry")),
+        "sub_industry": text(company.get("sub_industry")),
+        "company_stage": text(company.get("company_stage")),
+        "size": text(company.get("size")),
+        "culture_tags": string_list(company.get("culture_tags")),
+        "tech_stack": string_list(company.get("tech_stack")),
+        "total_roles": len(company.get("roles") or []),
+    }
+
+def role_rows(company):
+    for role in company.get("roles") or []:
+        if not isinstance(role, dict):
+            continue
+        salary = role.get("salary_range")
+        salary = salary if isinstance(salary, (list, tuple)) else []
+        yield {
+            "company_name": text(company.get("company_name")),
+            "industry": text(company.get("industry")),
+            "sub_industry": text(company.get("sub_industry")),
+            "company_stage": text(company.get("company_stage")),
+            "company_size": text(company.get("size")),
+            "role_title": text(role.get("title")),
+            "department": text(role.get("department")),
+            "seniority_level": text(role.get("seniority_level")),
+            "role_description": text(role.get("description")),
+            "required_skills": string_list(role.get("required_skills")),
+            "nice_to_have_skills": string_list(role.get("nice_to_have_skills")),
+            "location": text(role.get("location")),
+            "salary_min": integer(salary[0]) if len(salary) > 0 else None,
+            "salary_max": integer(salary[1]) if len(salary) > 1 else None,
+            "visa_sponsorship": boolean(role.get("visa_sponsorship")),
+            "min_experience_years": integer(role.get("min_experience_years")),
+        }
+
+# ---------- Writers ----------
+
+class ColumnarWriter:
+    """Buffers rows and writes them as one Parquet row group / Arrow record batch at a time"""
+
+    def __init__(self, path, schema, row_group_size=ROW_GROUP_SIZE):
+        self.pa = _pyarrow()
+        self.path = path
+        self.schema = schema
+        self.row_group_size = row_group_size
+        self.rows = []
+        self.count = 0
+        self.parquet = path.endswith(".parquet")
+        if self.parquet:
+            self.writer = self.pa.parquet.ParquetWriter(path, schema, compression="zstd")
+        else:
+            self.sink = self.pa.OSFile(path, "wb")
+            self.writer = self.pa.ipc.new_file(self.sink, schema)
+
+    def write(self, row):
+        self.rows.append(row)
+        if len(self.rows) >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        if not self.rows:
+            return
+        table = self.pa.Table.from_pylist(self.rows, schema=self.schema)
+        if self.parquet:
+            self.writer.write_table(table, row_group_size=self.row_group_size)
+        else:
+            for batch in table.to_batches():
+                self.writer.write_batch(batch)
+        self.count += len(self.rows)
+        self.rows = []
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+        if not self.parquet:
+            self.sink.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def iter_companies(input_path):
+    """Stream companies from a JSON array, legacy concatenated-array or JSONL file"""
+    if is_jsonl(input_path):
+        return iter_jsonl(input_path)
+    return iter_legacy_companies(input_path)
+
+def export_columnar(companies, output_dir=DATA_DIR, fmt="parquet", row_group_size=ROW_GROUP_SIZE):
+    """Write companies.{fmt} and roles.{fmt} from any iterable of companies; returns the paths"""
+    pa = _pyarrow()
+    os.makedirs(output_dir, exist_ok=True)
+    companies_path = os.path.join(output_dir, f"companies.{fmt}")
+    roles_path = os.path.join(output_dir, f"roles.{fmt}")
+
+    with ColumnarWriter(companies_path, company_schema(pa), row_group_size) as company_writer, \
+         ColumnarWriter(roles_path, role_schema(pa), row_group_size) as role_writer:
+        for company in companies:
+            if not isinstance(company, dict):
+                continue
+            company_writer.write(company_row(company))
+            for row in role_rows(company):
+                role_writer.write(row)
+
+    print(f"✅ Companies {fmt}: {companies_path} ({company_writer.count:,} rows)")
+    print(f"✅ Roles {fmt}: {roles_path} ({role_writer.count:,} rows)")
+    return companies_path, roles_path
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    input_path = args[0] if args else os.path.join(DATA_DIR, "complete_companies_dataset.json")
+    output_dir = args[1] if len(args) > 1 else DATA_DIR
+    fmt = "arrow" if "--arrow" in sys.argv else "parquet"
+
+    print(f"📦 Exporting {input_path} to {fmt}")
+    export_columnar(iter_companies(input_path), output_dir, fmt)
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,13 @@
+import os
 import json
 import re
-from difflib import SequenceMatcher
+import collections
+from near_duplicates import find_similar_pairs
 
-def load_companies():
+DATA_DIR = "data"
+
+def load_companies(file_path=os.path.join(DATA_DIR, 'standardized_companies.json')):
     """Load the standardized companies file"""
-    file_path = '/Users/georgemccain/Desktop/untitled folder 2/data/standardized_companies.json'
-    
     with open(file_path, 'r') as f:
         companies = json.load(f)
     
@@ -197,37 +199,40 @@ def remove_obvious_similar_companies(companies):
     print("\n=== FINAL DUPLICATE CHECK ===")
     
     # Check for very high similarity companies
-    companies_to_remove = []
+    companies_to_remove = set()
     
-    for i, company1 in enumerate(companies):
+    # Very strict criteria for automatic removal: extremely similar and same industry
+    matches = collections.defaultdict(list)
+    for pair in find_similar_pairs(companies, min_similarity=0.95, score_descriptions=False):
+        if pair['same_industry']:
+            matches[pair['index1']].append(pair['index2'])
+    
+    # Walk the matches in index order so removals match the pairwise scan
+    for i in sorted(matches):
         if i in companies_to_remove:
             continue
             
+        company1 = companies[i]
         name1 = company1.get('company_name', '')
         
-        for j, company2 in enumerate(companies[i+1:], i+1):
+        for j in matches[i]:
             if j in companies_to_remove:
                 continue
                 
+            company2 = companies[j]
             name2 = company2.get('company_name', '')
             
-            # Very strict criteria for automatic removal
-            similarity = SequenceMatcher(None, name1.lower(), name2.lower()).ratio()
-            same_industry = company1.get('industry') == company2.get('industry')
+            # Keep the one with more roles
+            roles1 = len(company1.get('roles', []))
+            roles2 = len(company2.get('roles', []))
             
-            # Only remove if extremely similar and same industry
-            if similarity > 0.95 and same_industry:
-                # Keep the one with more roles
-                roles1 = len(company1.get('roles', []))
-                roles2 = len(company2.get('roles', []))
-                
-                if roles1 >= roles2:
-                    companies_to_remove.append(j)
-                    print(f"Removing very similar: '{name2}' (keeping '{name1}' - more complete)")
-                else:
-                    companies_to_remove.append(i)
-                    print(f"Removing very similar: '{name1}' (keeping '{name2}' - more complete)")
-                    break
+            if roles1 >= roles2:
+                companies_to_remove.add(j)
+                print(f"Removing very similar: '{name2}' (keeping '{name1}' - more complete)")
+            else:
+                companies_to_remove.add(i)
+                print(f"Removing very similar: '{name1}' (keeping '{name2}' - more complete)")
+                break
     
     # Remove in reverse order
     for index in sorted(set(companies_to_remove), reverse=True):
@@ -287,6 +292,15 @@ def validate_final_quality(companies):
     
     return len(issues) == 0, quality_score
 
+def apply_production_fixes(companies):
+    """Run every final cleaning fix in order"""
+    companies = merge_duplicate_companies(companies)
+    companies = expand_industry_classifications(companies)
+    companies = fix_location_formatting(companies)
+    companies = adjust_salary_ranges(companies)
+    companies = remove_obvious_similar_companies(companies)
+    return companies
+
 def main():
     """Run the complete final cleaning process"""
     print("🧹 FINAL PRODUCTION CLEANING PROCESS")
@@ -297,17 +311,13 @@ def main():
     original_count = len(companies)
     
     # Apply all fixes
-    companies = merge_duplicate_companies(companies)
-    companies = expand_industry_classifications(companies)
-    companies = fix_location_formatting(companies)
-    companies = adjust_salary_ranges(companies)
-    companies = remove_obvious_similar_companies(companies)
+    companies = apply_production_fixes(companies)
     
     # Final validation
     is_clean, quality_score = validate_final_quality(companies)
     
     # Save final version
-    output_file = '/Users/georgemccain/Desktop/untitled folder 2/data/production_companies.json'
+    output_file = os.path.join(DATA_DIR, 'production_companies.json')
     
     with open(output_file, 'w') as f:
         json.dump(companies, f, indent=2, ensure_ascii=False)
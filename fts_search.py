@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Local full-text search over the generated roles (SQLite FTS5 + BM25).
+
+role_search is an FTS5 table with one row per role (rowid = roles.rowid)
+holding the role title, the role description and the company's `about`.
+Triggers on roles and companies keep it in sync, so rows written by
+SqliteBatchWriter or merge_batch_dbs are searchable immediately; migrate()
+creates it and fills it from existing rows. After a VACUUM (which may
+renumber rowids) run `python fts_search.py rebuild`.
+
+search() returns roles ranked by BM25 (title weighted above description,
+description above company about) with the same metadata that
+main.upsert_to_pinecone attaches, and accepts Pinecone-style metadata
+filters, so results can be compared one to one with the hybrid index.
+
+Usage:
+    python fts_search.py [db] "query" [--industry X] [--seniority X] [--limit N]
+    python fts_search.py rebuild [db]
+"""
+
+import os
+import re
+import sys
+import json
+import sqlite3
+import time
+
+DEFAULT_DB = os.path.join("data", "companies_merged.db")
+# bm25() weights for (title, description, about)
+COLUMN_WEIGHTS = (10.0, 2.0, 1.0)
+
+TRIGGERS = """
+CREATE TRIGGER IF NOT EXISTS role_search_insert AFTER INSERT ON roles BEGIN
+  INSERT INTO role_search (rowid, title, description, about)
+  VALUES (new.rowid, new.title, new.description,
+          (SELECT about FROM companies WHERE id = new.company_id));
+END;
+CREATE TRIGGER IF NOT EXISTS role_search_delete AFTER DELETE ON roles BEGIN
+  DELETE FROM role_search WHERE rowid = old.rowid;
+END;
+CREATE TRIGGER IF NOT EXISTS role_search_update AFTER UPDATE OF title, description, company_id ON roles BEGIN
+  DELETE FROM role_search WHERE rowid = old.rowid;
+  INSERT INTO role_search (rowid, title, description, about)
+  VALUES (new.rowid, new.title, new.description,
+          (SELECT about FROM companies WHERE id = new.company_id));
+END;
+CREATE TRIGGER IF NOT EXISTS role_search_company_insert AFTER INSERT ON companies BEGIN
+  UPDATE role_search SET about = new.about
+  WHERE rowid IN (SELECT rowid FROM roles WHERE company_id = new.id);
+END;
+CREATE TRIGGER IF NOT EXISTS role_search_company_update AFTER UPDATE OF about ON companies BEGIN
+  UPDATE role_search SET about = new.about
+  WHERE rowid IN (SELECT rowid FROM roles WHERE company_id = new.id);
+END;
+CREATE TRIGGER IF NOT EXISTS role_search_company_delete AFTER DELETE ON companies BEGIN
+  UPDATE role_search SET about = NULL
+  WHERE rowid IN (SELECT rowid FROM roles WHERE company_id = old.id);
+END;
+"""
+
+def create_tables(conn):
+    """Create role_search and its triggers; returns True if the table is new"""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'role_search'"
+    ).fetchone()
+    conn.executescript(f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS role_search USING fts5(
+      title, description, about,
+      tokenize = 'porter unicode61 remove_diacritics 2'
+    );
+    CREATE INDEX IF NOT EXISTS idx_roles_company_id ON roles(company_id);
+    {TRIGGERS}
+    """)
+    return not exists
+
+def rebuild(conn):
+    """Refill role_search from roles + companies"""
+    with conn:
+        conn.execute("DELETE FROM role_search")
+        conn.execute("""
+        INSERT INTO role_search (rowid, title, description, about)
+        SELECT r.rowid, r.title, r.description, c.about
+        FROM roles r LEFT JOIN companies c ON c.id = r.company_id
+        """)
+    conn.execute("INSERT INTO role_search (role_search) VALUES ('optimize')")
+    conn.commit()
+
+def migrate(conn):
+    if create_tables(conn):
+        rebuild(conn)
+
+# ---------- Metadata (mirrors main.upsert_to_pinecone) ----------
+
+def joined(value):
+    try:
+        items = json.loads(value) if isinstance(value, str) else value
+    except ValueError:
+        return value
+    return ", ".join(str(item) for item in items) if isinstance(items, list) else (items or "")
+
+# metadata key -> SQL expression over roles r / companies c
+METADATA_COLUMNS = {
+    "company_id": "r.company_id",
+    "company": "r.company_name",
+    "title": "r.title",
+    "department": "r.department",
+    "seniority_level": "r.seniority_level",
+    "industry": "r.industry",
+    "sub_industry": "r.sub_industry",
+    "location": "r.location",
+    "description": "r.description",
+    "required_skills": "r.required_skills",
+    "nice_to_have_skills": "r.nice_to_have_skills",
+    "tech_stack": "c.tech_stack",
+    "culture_tags": "c.culture_tags",
+    "about_company": "c.about",
+    "company_stage": "c.company_stage",
+    "company_size": "c.size",
+    "salary_min": "r.salary_min",
+    "salary_max": "r.salary_max",
+    "visa_sponsorship": "r.visa_sponsorship",
+    "min_experience_years": "r.min_experience_years",
+    "source": "r.source",
+    "fetched_at": "r.fetched_at",
+}
+LIST_FIELDS = ("required_skills", "nice_to_have_skills", "tech_stack", "culture_tags")
+
+def role_metadata(row):
+    """sqlite row (METADATA_COLUMNS order) -> the metadata dict stored in Pinecone"""
+    metadata = dict(zip(METADATA_COLUMNS, row))
+    for field in LIST_FIELDS:
+        metadata[field] = joined(metadata[field])
+    metadata["skills"] = ", ".join(part for part in (metadata["required_skills"], metadata["nice_to_have_skills"]) if part)
+    metadata["visa_sponsorship"] = bool(metadata["visa_sponsorship"]) if metadata["visa_sponsorship"] is not None else None
+    return metadata
+
+FILTER_OPERATORS = {"$eq": "=", "$ne": "!=", "$gt": ">", "$gte": ">=", "$lt": "<", "$lte": "<="}
+
+def filter_sql(filters):
+    """Pinecone-style metadata filter -> (SQL condition, params)
+
+    Supports {"field": value}, {"field": {"$op": value}} with $eq $ne $gt
+    $gte $lt $lte $in $nin, and top-level "$and" / "$or" lists.
+    """
+    conditions, params = [], []
+    for field, condition in (filters or {}).items():
+        if field in ("$and", "$or"):
+            parts = [filter_sql(part) for part in condition]
+            joiner = " AND " if field == "$and" else " OR "
+            conditions.append("(" + joiner.join(sql for sql, _ in parts) + ")")
+            params += [p for _, part_params in parts for p in part_params]
+            continue
+        if field not in METADATA_COLUMNS:
+            raise ValueError(f"Unknown filter field: {field}")
+        column = METADATA_COLUMNS[field]
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        for operator, value in condition.items():
+            if operator in ("$in", "$nin"):
+                values = list(value)
+                placeholders = ", ".join("?" * len(values)) or "NULL"
+                conditions.append(f"{column} {'IN' if operator == '$in' else 'NOT IN'} ({placeholders})")
+                params += values
+            elif operator in FILTER_OPERATORS:
+                conditions.append(f"{column} {FILTER_OPERATORS[operator]} ?")
+                params.append(value)
+            else:
+                raise ValueError(f"Unsupported filter operator: {operator}")
+    return " AND ".join(conditions) or "1", params
+
+def match_query(text):
+    """Free text -> FTS5 query: every word quoted (no syntax errors), OR-ed for BM25 ranking"""
+    words = re.findall(r"\w+", text.lower())
+    return " OR ".join(f'"{word}"' for word in words)
+
+def search(conn, query, filters=None, limit=20, raw=False):
+    """BM25-ranked roles for `query`; each hit is {"id", "score", "metadata"}
+
+    Lower bm25() is better, so score is its negation (higher = better, like
+    Pinecone). With raw=True the query is passed to FTS5 unchanged
+    (phrases, NEAR, column filters such as title:engineer).
+    """
+    match = query if raw else match_query(query)
+    if not match:
+        return []
+    condition, params = filter_sql(filters)
+    weights = ", ".join(str(weight) for weight in COLUMN_WEIGHTS)
+    rows = conn.execute(f"""
+    SELECT r.id, -bm25(role_search, {weights}) AS score, {', '.join(METADATA_COLUMNS.values())}
+    FROM role_search s
+    JOIN roles r ON r.rowid = s.rowid
+    LEFT JOIN companies c ON c.id = r.company_id
+    WHERE role_search MATCH ? AND {condition}
+    ORDER BY bm25(role_search, {weights})
+    LIMIT ?
+    """, [match] + params + [limit]).fetchall()
+    return [{"id": row[0], "score": row[1], "metadata": role_metadata(row[2:])} for row in rows]
+
+def option(args, flag):
+    return args[args.index(flag) + 1] if flag in args[:-1] else None
+
+def main():
+    args = sys.argv[1:]
+    if args and args[0] == "rebuild":
+        db_path = args[1] if len(args) > 1 else DEFAULT_DB
+        conn = sqlite3.connect(db_path)
+        start = time.time()
+        create_tables(conn)
+        rebuild(conn)
+        count = conn.execute("SELECT COUNT(*) FROM role_search").fetchone()[0]
+        print(f"✅ {db_path}: {count:,} roles indexed ({time.time() - start:.1f}s)")
+        return
+
+    values = [arg for i, arg in enumerate(args) if not arg.startswith("--") and (i == 0 or not args[i - 1].startswith("--"))]
+    db_path = next((arg for arg in values if arg.endswith(".db")), DEFAULT_DB)
+    query = " ".join(arg for arg in values if not arg.endswith(".db"))
+    if not query:
+        print(__doc__)
+        return
+    filters = {}
+    if option(args, "--industry"):
+        filters["industry"] = option(args, "--industry")
+    if option(args, "--seniority"):
+        filters["seniority_level"] = option(args, "--seniority")
+    limit = int(option(args, "--limit") or 10)
+
+    conn = sqlite3.connect(db_path)
+    migrate(conn)
+    start = time.time()
+    results = search(conn, query, filters, limit)
+    print(f"🔎 {len(results)} results for {query!r} ({(time.time() - start) * 1000:.1f} ms)")
+    for result in results:
+        metadata = result["metadata"]
+        print(f"  {result['score']:6.2f}  {metadata['title']} @ {metadata['company']} "
+              f"({metadata['seniority_level']}, {metadata['location']})")
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,18 @@
 #!/usr/bin/env python3
 
 import os
+import re
+import sys
 import json
+import sqlite3
 import random
 import time
 from datetime import datetime
 from dotenv import load_dotenv
 from anthropic import Anthropic
+from rate_limiter import limiter
+from stream_json import salvage_array
+from message_batches import MessageBatchRunner, LocalBatchClient, result_text
 
 load_dotenv()
 client = Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
@@ -21,21 +27,73 @@ INDUSTRIES = [
     "Pharmaceuticals", "Telecommunications", "Utilities", "Logistics", "Sports"
 ]
 
-def generate_batch(batch_size=100, batch_num=1):
-    """Generate a batch of companies with detailed progress tracking"""
-    companies = []
-    
-    for i in range(batch_size):
-        industry = random.choice(INDUSTRIES)
-        
+def request_missing_roles(company, missing, industry):
+    """Ask for only the roles a truncated company response is missing"""
+    existing = [role.get("title", "") for role in company.get("roles", [])]
+    prompt = f"""Generate {missing} more job roles at {company.get('company_name', 'this company')} ({industry}).
+
+Existing roles (do NOT repeat them): {', '.join(existing)}
+
+Return ONLY a JSON array of roles in this format:
+[
+  {{
+    "title": "Specific job title",
+    "department": "Department name",
+    "description": "Detailed job description",
+    "location": "City, State",
+    "salary_range": [min_salary, max_salary],
+    "seniority_level": "Entry/Mid/Senior/Director/VP/C-Suite",
+    "required_skills": ["skill1", "skill2", "skill3"],
+    "experience_years": 0-15
+  }}
+]"""
+    response = limiter.create_message(
+        client,
+        model="claude-3-5-sonnet-20241022",
+        max_tokens=300 * missing + 200,
+        temperature=0.8,
+        messages=[{"role": "user", "content": prompt}]
+    )
+    roles, _, _ = salvage_array(response.content[0].text, wrapper_key="roles")
+    return [role for role in roles if isinstance(role, dict)][:missing]
+
+def salvage_company(text, role_count):
+    """Parse a company response, salvaging a truncated one; returns (company, roles still missing)"""
+    try:
+        return json.loads(text), 0
+    except json.JSONDecodeError:
+        roles, _, company = salvage_array(text, wrapper_key="roles")
+        if not company.get("company_name"):
+            raise
+    company["roles"] = [role for role in roles if isinstance(role, dict)]
+    print(f"🩹 Salvaged {company['company_name']} with {len(company['roles'])}/{role_count} roles")
+    return company, max(role_count - len(company["roles"]), 0)
+
+def parse_company(text, role_count, industry, top_up=True):
+    """Parse a company response, salvaging a truncated one and topping up its roles"""
+    company, missing = salvage_company(text, role_count)
+    if missing and top_up:
+        company["roles"] += request_missing_roles(company, missing, industry)
+    return company
+
+COMPANY_TYPES = ["startup", "mid-size", "enterprise", "Fortune 500", "family-owned", "public", "private equity backed"]
+
+def random_company_spec(batch_num):
+    """Randomized industry, company type and role count for one company"""
+    return {
+        "industry": random.choice(INDUSTRIES),
         # Enhanced randomization
-        seed = random.randint(10000, 99999)
-        company_types = ["startup", "mid-size", "enterprise", "Fortune 500", "family-owned", "public", "private equity backed"]
-        company_type = random.choice(company_types)
-        
-        role_count = random.choice([3, 4, 5, 6])  # Vary role count
-        
-        prompt = f"""Generate 1 {company_type} company in {industry} (batch {batch_num}, seed: {seed}).
+        "seed": random.randint(10000, 99999),
+        "company_type": random.choice(COMPANY_TYPES),
+        "role_count": random.choice([3, 4, 5, 6]),  # Vary role count
+        "batch_num": batch_num,
+    }
+
+def build_company_prompt(spec):
+    industry, company_type, role_count = spec["industry"], spec["company_type"], spec["role_count"]
+    seed, batch_num = spec["seed"], spec["batch_num"]
+    
+    prompt = f"""Generate 1 {company_type} company in {industry} (batch {batch_num}, seed: {seed}).
 
 Create exactly {role_count} diverse job roles covering entry to executive levels.
 
@@ -70,32 +128,40 @@ JSON format:
 }}
 
 Return ONLY valid JSON."""
+    return prompt
 
+def generate_batch(batch_size=100, batch_num=1):
+    """Generate a batch of companies with detailed progress tracking"""
+    companies = []
+    
+    for i in range(batch_size):
+        spec = random_company_spec(batch_num)
+        industry, role_count = spec["industry"], spec["role_count"]
+        prompt = build_company_prompt(spec)
+        
         try:
-            response = client.messages.create(
+            response = limiter.create_message(
+                client,
                 model="claude-3-5-sonnet-20241022",
                 max_tokens=3000,
                 temperature=0.8,  # Higher temp for more diversity
                 messages=[{"role": "user", "content": prompt}]
             )
             
-            company_data = json.loads(response.content[0].text.strip())
+            company_data = parse_company(response.content[0].text.strip(), role_count, industry)
             companies.append(company_data)
             
             print(f"✅ Batch {batch_num}: {i+1}/{batch_size} - {company_data['company_name']} ({industry})")
             
-            # Small delay to avoid rate limiting
-            time.sleep(0.1)
-            
         except Exception as e:
             print(f"❌ Batch {batch_num}: Error {i+1}/{batch_size}: {e}")
             continue
     
     return companies
 
-def save_batch(companies, batch_num):
+def save_batch(companies, batch_num, directory=".", prefix="companies_batch"):
     """Save batch to separate file"""
-    filename = f"companies_batch_{batch_num:03d}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    filename = os.path.join(directory, f"{prefix}_{batch_num:03d}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
     with open(filename, 'w') as f:
         json.dump(companies, f, indent=2)
     return filename
@@ -132,9 +198,6 @@ def generate_10k_companies():
             print(f"📈 Total progress: {total_companies}/10,000 companies ({total_companies/100:.1f}%)")
             print(f"⏱️  Rate: {rate:.1f} companies/sec, ETA: {eta:.1f} minutes")
             print(f"💾 Saved to: {filename}")
-        
-        # Longer pause between batches
-        time.sleep(1)
     
     # Create master index file
     master_index = {
@@ -153,5 +216,226 @@ def generate_10k_companies():
     print(f"⏱️  Total time: {(time.time() - start_time)/60:.1f} minutes")
     print(f"📁 Files: {len(all_files)} batch files + 1 index file")
 
+# === BULK MODE (Message Batches API) ===
+
+BULK_DB_PATH = os.path.join("data", "bulk_companies.db")
+MODEL = "claude-3-5-sonnet-20241022"
+
+# Where a bulk run keeps its request DB, batch state, batch files and index.
+# Offline runs get their own directory and a file prefix that the combiners'
+# companies_batch_*.json glob does not match, so placeholders never reach real data.
+BULK_PATHS = {
+    "api": {
+        "db": BULK_DB_PATH,
+        "state": os.path.join("data", "message_batches_10k.json"),
+        "output_dir": ".",
+        "prefix": "companies_batch",
+        "index": "companies_10k_index.json",
+    },
+    "local": {
+        "db": os.path.join("data", "local_bulk", "bulk_companies.db"),
+        "state": os.path.join("data", "local_bulk", "message_batches.json"),
+        "output_dir": os.path.join("data", "local_bulk"),
+        "prefix": "local_companies_batch",
+        "index": os.path.join("data", "local_bulk", "companies_10k_index.json"),
+    },
+}
+
+def open_bulk_db(path=BULK_DB_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS bulk_requests (
+      custom_id TEXT PRIMARY KEY,
+      industry TEXT,
+      role_count INTEGER,
+      params TEXT
+    )
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS bulk_results (
+      custom_id TEXT PRIMARY KEY,
+      status TEXT,
+      company TEXT,
+      error TEXT,
+      collected_at TEXT
+    )
+    """)
+    conn.commit()
+    return conn
+
+def load_bulk_requests(conn, total, batch_size=100):
+    """The request set for a bulk run; drawn once and reused on every resume.
+
+    A resume with a larger `total` draws only the extra requests; a smaller
+    one cannot shrink a run that was already submitted and is reported.
+    """
+    existing = conn.execute("SELECT COUNT(*) FROM bulk_requests").fetchone()[0]
+    if existing > total:
+        print(f"⚠️  This run already has {existing} requests; ignoring total={total} "
+              f"(delete the bulk DB to start a smaller run)")
+    elif existing < total:
+        if existing:
+            print(f"➕ Extending the run from {existing} to {total} requests")
+        rows = []
+        for i in range(existing, total):
+            spec = random_company_spec(i // batch_size + 1)
+            params = {
+                "model": MODEL,
+                "max_tokens": 3000,
+                "temperature": 0.8,
+                "messages": [{"role": "user", "content": build_company_prompt(spec)}],
+            }
+            rows.append((f"company-{i + 1:05d}", spec["industry"], spec["role_count"], json.dumps(params)))
+        with conn:
+            conn.executemany("INSERT INTO bulk_requests VALUES (?, ?, ?, ?)", rows)
+    rows = conn.execute("SELECT custom_id, industry, role_count, params FROM bulk_requests ORDER BY custom_id").fetchall()
+    specs = {custom_id: (industry, role_count) for custom_id, industry, role_count, _ in rows}
+    requests = [{"custom_id": custom_id, "params": json.loads(params)} for custom_id, _, _, params in rows]
+    return requests, specs
+
+def local_company_response(params):
+    """Canned response for offline runs against LocalBatchClient"""
+    prompt = params["messages"][0]["content"]
+    industry = re.search(r" company in (.+?) \(batch", prompt).group(1)
+    role_count = int(re.search(r"Create exactly (\d+)", prompt).group(1))
+    seed = re.search(r"seed: (\d+)", prompt).group(1)
+    return json.dumps({
+        "company_name": f"{industry} Company {seed}",
+        "about": f"Placeholder {industry} company generated offline",
+        "industry": industry,
+        "company_stage": "Private",
+        "size": "51-200",
+        "roles": [{"title": f"Role {i + 1}", "salary_range": [50000, 90000]} for i in range(role_count)],
+    })
+
+def top_up_salvaged(conn, specs):
+    """Request the missing roles of truncated companies, once every batch is collected"""
+    rows = conn.execute("SELECT custom_id, company FROM bulk_results WHERE status = 'salvaged'").fetchall()
+    if rows:
+        print(f"🩹 Topping up roles for {len(rows)} salvaged companies")
+    for custom_id, payload in rows:
+        industry, role_count = specs[custom_id]
+        company = json.loads(payload)
+        missing = role_count - len(company.get("roles", []))
+        try:
+            if missing > 0:
+                company["roles"] += request_missing_roles(company, missing, industry)
+        except Exception as e:
+            # Stays salvaged; the next run tries again
+            print(f"⚠️  Could not top up {company.get('company_name')}: {e}")
+            continue
+        with conn:
+            conn.execute(
+                "UPDATE bulk_results SET status = 'succeeded', company = ? WHERE custom_id = ?",
+                (json.dumps(company), custom_id)
+            )
+
+def generate_10k_bulk(total=10000, local=False, poll_seconds=None):
+    """Generate companies through message batches; rerun the same command to resume"""
+    paths = BULK_PATHS["local" if local else "api"]
+    conn = open_bulk_db(paths["db"])
+    requests, specs = load_bulk_requests(conn, total)
+    
+    if local:
+        batch_client = LocalBatchClient(local_company_response, latency=1.0)
+    else:
+        batch_client = client
+    if poll_seconds is None:
+        poll_seconds = 1 if local else 60
+    runner = MessageBatchRunner(batch_client, state_path=paths["state"], poll_seconds=poll_seconds)
+    
+    # Errored, expired or unparseable requests (and any whose result was lost) are sent again;
+    # salvaged companies only need their missing roles, which top_up_salvaged() requests
+    succeeded = {row[0] for row in conn.execute(
+        "SELECT custom_id FROM bulk_results WHERE status IN ('succeeded', 'salvaged')"
+    )}
+    retry = runner.collected_ids() - succeeded
+    if retry:
+        runner.forget(retry)
+        print(f"🔁 Resubmitting {len(retry)} requests that failed in earlier batches")
+    
+    print(f"🚀 Bulk mode: {len(requests)} requests via the Message Batches API{' (local)' if local else ''}")
+    start_time = time.time()
+    collected = 0
+    
+    def on_result(custom_id, result):
+        nonlocal collected
+        industry, role_count = specs[custom_id]
+        text = result_text(result)
+        company, error, missing = None, None, 0
+        if text is None:
+            error = str(getattr(getattr(result, "error", None), "message", result.type))
+        else:
+            try:
+                # Top-ups are synchronous API calls; they run after collection finishes
+                company, missing = salvage_company(text.strip(), role_count)
+            except Exception as e:
+                error = f"parse error: {e}"
+        if company:
+            status = "salvaged" if missing and not local else "succeeded"
+        else:
+            status = result.type if text is None else "parse_error"
+        conn.execute(
+            "INSERT OR REPLACE INTO bulk_results VALUES (?, ?, ?, ?, ?)",
+            (custom_id, status, json.dumps(company) if company else None, error, datetime.now().isoformat())
+        )
+        collected += 1
+        if collected % 500 == 0:
+            conn.commit()
+            print(f"📥 {collected} results stored")
+    
+    # Each batch's results are committed before the runner marks it collected
+    counts = runner.run(requests, on_result, on_collected=lambda batch_id: conn.commit())
+    top_up_salvaged(conn, specs)
+    
+    # Write the usual 100-company batch files and index so downstream scripts keep working
+    rows = conn.execute(
+        "SELECT company FROM bulk_results WHERE status IN ('succeeded', 'salvaged') ORDER BY custom_id"
+    ).fetchall()
+    companies = [json.loads(row[0]) for row in rows]
+    os.makedirs(paths["output_dir"], exist_ok=True)
+    # A resumed run rewrites every file; drop the previous run's so nothing is combined twice
+    if os.path.exists(paths["index"]):
+        with open(paths["index"], "r") as f:
+            previous = json.load(f)
+        if previous.get("mode") == "message_batches":
+            for path in previous.get("batch_files", []):
+                if os.path.exists(path):
+                    os.remove(path)
+    all_files = []
+    for start in range(0, len(companies), 100):
+        all_files.append(save_batch(companies[start:start + 100], start // 100 + 1,
+                                    paths["output_dir"], paths["prefix"]))
+    
+    total_roles = sum(len(company.get("roles", [])) for company in companies)
+    with open(paths["index"], "w") as f:
+        json.dump({
+            "total_companies": len(companies),
+            "total_roles": total_roles,
+            "batch_files": all_files,
+            "generated_at": datetime.now().isoformat(),
+            "generation_time_seconds": time.time() - start_time,
+            "mode": "message_batches",
+        }, f, indent=2)
+    
+    print(f"\n🎉 Bulk generation complete: {len(companies)} companies, {total_roles} roles")
+    print(f"📊 Results this run: {counts}")
+    short = conn.execute("SELECT COUNT(*) FROM bulk_results WHERE status = 'salvaged'").fetchone()[0]
+    if short:
+        print(f"⚠️  {short} salvaged companies are still missing roles (rerun to top them up)")
+    failed = conn.execute(
+        "SELECT COUNT(*) FROM bulk_results WHERE status NOT IN ('succeeded', 'salvaged')"
+    ).fetchone()[0]
+    if failed:
+        print(f"⚠️  {failed} requests failed; see bulk_results in {paths['db']} (rerun to retry them)")
+    conn.close()
+
 if __name__ == "__main__":
-    generate_10k_companies()
\ No newline at end of file
+    if len(sys.argv) > 1 and sys.argv[1] == "bulk":
+        # python generate_10k.py bulk [total] [--local]
+        args = [arg for arg in sys.argv[2:] if not arg.startswith("--")]
+        generate_10k_bulk(int(args[0]) if args else 10000, local="--local" in sys.argv)
+    else:
+        generate_10k_companies()
\ No newline at end of file
@@ -7,6 +7,7 @@ import requests
 from datetime import datetime
 from dotenv import load_dotenv
 from anthropic import Anthropic
+from rate_limiter import limiter
 
 load_dotenv()
 client = Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
@@ -38,7 +39,8 @@ Return ONLY a JSON object:
 If you cannot find the real domain with confidence, set confidence to "low" and provide your best educated guess."""
 
     try:
-        response = client.messages.create(
+        response = limiter.create_message(
+            client,
             model="claude-3-5-sonnet-20241022",
             max_tokens=1000,
             temperature=0.1,  # Very low temperature for accuracy
@@ -78,9 +80,6 @@ def get_real_domains_batch(companies_batch, batch_size=5):
             # Keep company without domain info
             results.append(company)
             print(f"❌ Could not find domain for {company_name}")
-        
-        # Small delay to avoid rate limiting
-        time.sleep(0.5)
     
     return results
 
@@ -125,9 +124,6 @@ def enrich_with_real_domains(input_file, batch_size=5):
         
         print(f"📈 Progress: {processed}/{len(companies)} ({processed/len(companies)*100:.1f}%)")
         print(f"⏱️  Rate: {rate:.1f} companies/sec, ETA: {eta:.1f} minutes")
-        
-        # Rate limiting
-        time.sleep(1)
     
     # Generate output filename
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
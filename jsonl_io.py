@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Newline-delimited JSON (JSONL) reading and writing, one company per line.
+
+Compression is picked from the file extension: `.gz` uses gzip and `.zst`
+uses zstandard (optional dependency). Appends add a new gzip member / zstd
+frame, which the reader handles transparently, so the raw generation log can
+be appended to after every sub-industry and still be streamed back in
+constant memory.
+"""
+
+import io
+import gzip
+import json
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("Reading or writing .zst files needs the 'zstandard' package (pip install zstandard)")
+    return zstandard
+
+def open_text(path, mode="r"):
+    """Open a (possibly compressed) JSONL file in text mode; mode is 'r', 'w' or 'a'"""
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    if path.endswith(".zst"):
+        zstandard = _zstd()
+        if mode == "r":
+            raw = zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), read_across_frames=True, closefd=True)
+        else:
+            raw = zstandard.ZstdCompressor().stream_writer(open(path, mode + "b"), closefd=True)
+        return io.TextIOWrapper(raw, encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+def append_jsonl(path, records):
+    """Append records to a JSONL file, one compact JSON document per line"""
+    count = 0
+    with open_text(path, "a") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")))
+            f.write("\n")
+            count += 1
+    return count
+
+def write_jsonl(path, records):
+    """Write records to a fresh JSONL file"""
+    count = 0
+    with open_text(path, "w") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")))
+            f.write("\n")
+            count += 1
+    return count
+
+def iter_jsonl(path, skip_invalid=True):
+    """Yield one record per line; a torn last line from a crash is skipped"""
+    with open_text(path, "r") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                if not skip_invalid:
+                    raise
+                print(f"⚠️  Skipping invalid JSON on line {line_number} of {path}: {e}")
+
+def is_jsonl(path):
+    return path.endswith((".jsonl", ".jsonl.gz", ".jsonl.zst"))
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Single-pass recovery parser for legacy enriched_companies*.json files.
+
+Those files are a series of JSON arrays joined by ",\n" (`[...],\n[...],`),
+which is not valid JSON as a whole. This reader streams the file in chunks
+and walks the top level itself: arrays and separators are skipped, and each
+object is decoded with json.JSONDecoder.raw_decode, which handles braces
+inside strings correctly. An object that cannot be decoded is reported with
+its byte offset and the reader resyncs at the next company, so the whole
+file is read in time proportional to its size.
+"""
+
+import re
+import json
+import codecs
+
+COMPANY_START = re.compile(r'\{\s*"company_name"')
+WHITESPACE = " \t\r\n"
+
+def iter_legacy_companies(file_path, errors=None, chunk_size=1 << 20):
+    """Yield company dicts from a legacy file; parse failures go into `errors`"""
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+    buffer = ""
+    base_offset = 0  # byte offset of buffer[0] in the file
+    pos = 0
+    eof = False
+
+    with open(file_path, "rb") as f:
+        def fill():
+            nonlocal buffer, base_offset, pos, eof
+            # Drop what has been consumed so memory stays bounded by chunk size
+            if pos:
+                base_offset += len(buffer[:pos].encode("utf-8"))
+                buffer = buffer[pos:]
+                pos = 0
+            chunk = f.read(chunk_size)
+            if chunk:
+                buffer += utf8.decode(chunk)
+            else:
+                buffer += utf8.decode(b"", final=True)
+                eof = True
+
+        def byte_offset(index):
+            return base_offset + len(buffer[:index].encode("utf-8"))
+
+        fill()
+        while True:
+            # Skip array brackets, separators and whitespace between objects
+            while pos < len(buffer) and (buffer[pos] in WHITESPACE or buffer[pos] in "[],"):
+                pos += 1
+            if pos >= len(buffer):
+                if eof:
+                    return
+                fill()
+                continue
+
+            if buffer[pos] != "{":
+                if errors is not None:
+                    errors.append({"offset": byte_offset(pos), "error": f"Unexpected character {buffer[pos]!r}"})
+                pos = resync(buffer, pos + 1)
+                if pos is None:
+                    pos = len(buffer)
+                continue
+
+            try:
+                obj, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError as e:
+                next_start = resync(buffer, pos + 1)
+                if next_start is None and not eof:
+                    # Object may just run past the end of the buffer: read more and retry
+                    fill()
+                    continue
+                if errors is not None:
+                    errors.append({"offset": byte_offset(pos), "error": f"{e.msg} (at byte {byte_offset(e.pos)})"})
+                pos = next_start if next_start is not None else len(buffer)
+                continue
+
+            pos = end
+            if isinstance(obj, dict) and "companies" in obj and isinstance(obj["companies"], list):
+                for company in obj["companies"]:
+                    if isinstance(company, dict):
+                        yield company
+            elif isinstance(obj, dict):
+                yield obj
+
+def resync(buffer, start):
+    """Index of the next company object at or after `start`, or None"""
+    match = COMPANY_START.search(buffer, start)
+    return match.start() if match else None
+
+def parse_legacy_file(file_path):
+    """Return (companies, errors) for a legacy file"""
+    errors = []
+    companies = list(iter_legacy_companies(file_path, errors))
+    return companies, errors
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+LLM response cache in a single SQLite file.
+
+Replaces one `cache/{prefix}-{sha256}.json` file per prompt. Values are
+compact JSON compressed with zlib and stored under the same
+"{prefix}-{sha256}" key the old files used, so an existing cache directory
+can be imported as-is (and is read through lazily until it is). The database
+runs in WAL mode, so the parallel batch processes can share it.
+
+With a size limit set (LLM_CACHE_MAX_BYTES), the least recently used
+entries are evicted once the stored values exceed it.
+
+Usage:
+    python llm_cache.py import [cache_dir] [--delete]
+    python llm_cache.py stats
+"""
+
+import os
+import sys
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import threading
+
+LLM_CACHE_PATH = os.path.join("cache", "llm_cache.db")
+LEGACY_CACHE_DIR = "cache"
+DEFAULT_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", "0")) or None
+COMPRESSION_LEVEL = 6
+
+def prompt_key(prompt, prefix="gpt"):
+    """Cache key for a prompt; matches the old cache file names without `.json`"""
+    return f"{prefix}-{hashlib.sha256(prompt.encode()).hexdigest()}"
+
+def encode_value(value):
+    return zlib.compress(json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), COMPRESSION_LEVEL)
+
+def decode_value(blob):
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+class LLMCache:
+    """Compressed key-value store for parsed LLM responses"""
+
+    def __init__(self, path=LLM_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES, legacy_dir=LEGACY_CACHE_DIR):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.legacy_dir = legacy_dir
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+        CREATE TABLE IF NOT EXISTS responses (
+          key TEXT PRIMARY KEY,
+          value BLOB,
+          size INTEGER,
+          last_access REAL
+        )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses(last_access)")
+        self.conn.commit()
+        self.lock = threading.Lock()
+        # Running estimate of stored bytes; recounted exactly before evicting
+        self.approx_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+        self.hits = 0
+        self.misses = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.evictions = 0
+        self.legacy_imports = 0
+
+    def get(self, key, default=None):
+        """Cached value for `key`, or `default` on a miss"""
+        with self.lock:
+            row = self.conn.execute("SELECT value FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self.hits += 1
+                self.bytes_read += len(row[0])
+                if self.max_bytes:
+                    # Access times only matter when eviction is on; skip the write otherwise
+                    with self.conn:
+                        self.conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+                return decode_value(row[0])
+
+        # Not imported yet: read through to the old one-file-per-prompt cache
+        legacy_file = os.path.join(self.legacy_dir, f"{key}.json") if self.legacy_dir else None
+        if legacy_file and os.path.exists(legacy_file):
+            try:
+                with open(legacy_file, "r") as f:
+                    value = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                value = None
+            if value is not None:
+                self.set(key, value)
+                with self.lock:
+                    self.hits += 1
+                    self.legacy_imports += 1
+                return value
+
+        with self.lock:
+            self.misses += 1
+        return default
+
+    def set(self, key, value):
+        blob = encode_value(value)
+        with self.lock:
+            with self.conn:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, size, last_access) VALUES (?, ?, ?, ?)",
+                    (key, blob, len(blob), time.time())
+                )
+            self.bytes_written += len(blob)
+            self.approx_bytes += len(blob)
+            if self.max_bytes and self.approx_bytes > self.max_bytes:
+                self._evict()
+
+    def __contains__(self, key):
+        with self.lock:
+            return self.conn.execute("SELECT 1 FROM responses WHERE key = ?", (key,)).fetchone() is not None
+
+    def _evict(self):
+        """Drop least recently used entries until the cache is under 90% of max_bytes"""
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        self.approx_bytes = total
+        if total <= self.max_bytes:
+            return
+        target = int(self.max_bytes * 0.9)
+        doomed = []
+        for key, size in self.conn.execute("SELECT key, size FROM responses ORDER BY last_access"):
+            if total <= target:
+                break
+            doomed.append((key,))
+            total -= size
+        with self.conn:
+            self.conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+        self.evictions += len(doomed)
+        self.approx_bytes = total
+
+    def import_directory(self, cache_dir=LEGACY_CACHE_DIR, delete=False, batch_size=1000):
+        """Load every `{prefix}-{sha256}.json` file in `cache_dir`; returns (imported, failed)"""
+        imported = failed = 0
+        batch, paths = [], []
+
+        def flush():
+            with self.lock:
+                with self.conn:
+                    self.conn.executemany(
+                        "INSERT OR REPLACE INTO responses (key, value, size, last_access) VALUES (?, ?, ?, ?)", batch
+                    )
+                self.approx_bytes += sum(row[2] for row in batch)
+            if delete:
+                for path in paths:
+                    os.remove(path)
+            batch.clear()
+            paths.clear()
+
+        with os.scandir(cache_dir) as entries:
+            for entry in entries:
+                if not entry.is_file() or not entry.name.endswith(".json"):
+                    continue
+                try:
+                    with open(entry.path, "r") as f:
+                        value = json.load(f)
+                except (OSError, json.JSONDecodeError) as e:
+                    print(f"⚠️  Skipping {entry.name}: {e}")
+                    failed += 1
+                    continue
+                blob = encode_value(value)
+                batch.append((entry.name[:-len(".json")], blob, len(blob), entry.stat().st_mtime))
+                paths.append(entry.path)
+                imported += 1
+                if len(batch) >= batch_size:
+                    flush()
+        if batch:
+            flush()
+
+        if self.max_bytes:
+            with self.lock:
+                self._evict()
+        return imported, failed
+
+    def stats(self):
+        with self.lock:
+            entries, stored = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "stored_bytes": stored,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+            "evictions": self.evictions,
+            "legacy_imports": self.legacy_imports,
+        }
+
+    def close(self):
+        self.conn.close()
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in ("import", "stats"):
+        print("Usage: python llm_cache.py import [cache_dir] [--delete] | stats")
+        sys.exit(1)
+
+    cache = LLMCache(legacy_dir=None)
+    if sys.argv[1] == "import":
+        args = [arg for arg in sys.argv[2:] if arg != "--delete"]
+        cache_dir = args[0] if args else LEGACY_CACHE_DIR
+        start = time.time()
+        imported, failed = cache.import_directory(cache_dir, delete="--delete" in sys.argv)
+        print(f"✅ Imported {imported} cached responses from {cache_dir} ({failed} failed) in {time.time() - start:.1f}s")
+
+    stats = cache.stats()
+    print(f"📦 {stats['entries']} entries, {stats['stored_bytes'] / 1e6:.1f} MB compressed in {cache.path}")
+
+if __name__ == "__main__":
+    main()
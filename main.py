@@ -2,39 +2,77 @@ import os
 import sqlite3
 import json
 import time
+import asyncio
 import uuid
 import hashlib
-import requests
+import numpy as np
 from datetime import datetime
 from dotenv import load_dotenv
-from anthropic import Anthropic
-from pinecone import Pinecone
+from anthropic import Anthropic, AsyncAnthropic
+from vector_store import open_index
+from rate_limiter import limiter
+from upsert_buffer import UpsertBuffer
+from sqlite_writer import SqliteBatchWriter
+from jsonl_io import append_jsonl, iter_jsonl
+from llm_cache import LLMCache, prompt_key
+from work_coordinator import WorkCoordinator
+from stream_json import JsonArrayStreamParser, salvage_array
+from enriched_prompts import system_blocks, build_user_prompt, expand_company, expand_companies
 
 # Load environment variables
 load_dotenv()
 
 # === CONFIG ===
 client = Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
-pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY") or "pc-...")
-dense_index = pc.Index("dense-milo-companies")
-sparse_index = pc.Index("sparse-milo-companies")
+async_client = AsyncAnthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+# Hosted Pinecone, or the local index when VECTOR_BACKEND=local
+dense_index = open_index("dense-milo-companies")
+sparse_index = open_index("sparse-milo-companies")
 # Use batch number in namespace for parallel processing
 batch_num = os.getenv("BATCH_NUM", "1")
 DENSE_NAMESPACE = f"dense-companies-claude-v8-batch{batch_num}"
 SPARSE_NAMESPACE = f"sparse-companies-claude-v8-batch{batch_num}"
+# Vectors are upserted in batches; flushed after every sub-industry
+dense_buffer = UpsertBuffer(dense_index)
+sparse_buffer = UpsertBuffer(sparse_index)
+# (dense, sparse) vectors of the current unit, held back until its rows are committed
+unit_vectors = []
 
 CACHE_DIR = "cache"
 os.makedirs(CACHE_DIR, exist_ok=True)
+# Parsed responses live in one SQLite file; old cache/*.json files are read through
+llm_cache = LLMCache(os.path.join(CACHE_DIR, "llm_cache.db"), legacy_dir=CACHE_DIR)
 DATA_DIR = "data"
 os.makedirs(DATA_DIR, exist_ok=True)
-# Use batch-specific file names for parallel processing  
-batch_num = os.getenv("BATCH_NUM", "1")
+# Use batch-specific file names for parallel processing
 DB_PATH = os.path.join(DATA_DIR, f"companies_batch{batch_num}.db")
-JSON_PATH = os.path.join(DATA_DIR, f"enriched_companies_batch{batch_num}.json")
+# Raw generation log: one company per line, optionally compressed ("gz" or "zst")
+RAW_LOG_COMPRESSION = os.getenv("RAW_LOG_COMPRESSION", "")
+JSON_PATH = os.path.join(DATA_DIR, f"enriched_companies_batch{batch_num}.jsonl")
+if RAW_LOG_COMPRESSION:
+    JSON_PATH += f".{RAW_LOG_COMPRESSION}"
 PROGRESS_PATH = os.path.join(DATA_DIR, f"progress_batch{batch_num}.json")
+# Number of sub-industry requests kept in flight by the async runner
+CONCURRENCY = int(os.getenv("CONCURRENCY", "8"))
+# Stream responses and store each company as soon as it arrives
+STREAM_RESPONSES = os.getenv("STREAM_RESPONSES", "") == "1"
+# Companies requested per sub-industry, and follow-ups allowed to top up a truncated response
+COMPANIES_PER_UNIT = 15
+MAX_FOLLOWUPS = 2
+# Send the static instructions as a cached system prefix, and optionally ask for short keys
+PROMPT_CACHING = os.getenv("PROMPT_CACHING", "") == "1"
+COMPACT_SCHEMA = os.getenv("COMPACT_SCHEMA", "") == "1"
+# Token usage and latency of every request, one JSON line each
+USAGE_PATH = os.path.join(DATA_DIR, f"usage_batch{batch_num}.jsonl")
+USAGE_FIELDS = ("input_tokens", "output_tokens", "cache_creation_input_tokens", "cache_read_input_tokens")
+# USD per million tokens for claude-3-5-sonnet (cache writes cost 1.25x input, reads 0.1x)
+TOKEN_PRICES = {"input_tokens": 3.0, "output_tokens": 15.0,
+                "cache_creation_input_tokens": 3.75, "cache_read_input_tokens": 0.30}
+usage_totals = dict.fromkeys(USAGE_FIELDS + ("requests", "companies", "latency"), 0)
 
 # === DB SETUP ===
-conn = sqlite3.connect(DB_PATH)
+# The async runner writes from a single worker thread, never concurrently
+conn = sqlite3.connect(DB_PATH, check_same_thread=False)
 cursor = conn.cursor()
 cursor.execute("""
 CREATE TABLE IF NOT EXISTS companies (
@@ -76,68 +114,135 @@ CREATE TABLE IF NOT EXISTS roles (
 )
 """)
 conn.commit()
+# Enables WAL + synchronous=NORMAL and adds the progress table
+db_writer = SqliteBatchWriter(conn)
 
 # === HELPERS ===
-def gpt(prompt, model="claude-3-5-sonnet-20241022", retries=3):
+def gpt(prompt, model="claude-3-5-sonnet-20241022", retries=3, system=None):
+    return gpt_message(prompt, model, retries, system).content[0].text
+
+def gpt_message(prompt, model="claude-3-5-sonnet-20241022", retries=3, system=None):
+    """Full API response (text, usage, stop_reason); `system` may carry cache_control blocks"""
+    extra = {"system": system} if system else {}
     for attempt in range(retries):
         try:
-            response = client.messages.create(
+            return limiter.create_message(
+                client,
                 model=model,
                 max_tokens=4000,
                 temperature=0.7,
-                messages=[{"role": "user", "content": prompt}]
+                messages=[{"role": "user", "content": prompt}],
+                **extra
             )
-            return response.content[0].text
         except Exception as e:
             if attempt < retries - 1:
                 time.sleep(2)
             else:
                 raise e
 
-import requests
+async def agpt(prompt, model="claude-3-5-sonnet-20241022", retries=3, system=None):
+    """Async counterpart of gpt() using the async Anthropic client"""
+    return (await agpt_message(prompt, model, retries, system)).content[0].text
 
-def get_dense_embedding(text: str):
-    # Use a simple embedding service or local model
+async def agpt_message(prompt, model="claude-3-5-sonnet-20241022", retries=3, system=None):
+    extra = {"system": system} if system else {}
+    for attempt in range(retries):
+        try:
+            return await limiter.acreate_message(
+                async_client,
+                model=model,
+                max_tokens=4000,
+                temperature=0.7,
+                messages=[{"role": "user", "content": prompt}],
+                **extra
+            )
+        except Exception as e:
+            if attempt < retries - 1:
+                await asyncio.sleep(2)
+            else:
+                raise e
+
+def stream_gpt(prompt, model="claude-3-5-sonnet-20241022", system=None):
+    """Yield the text of a streamed response as it arrives; returns the final message"""
+    extra = {"system": system} if system else {}
+    return (yield from limiter.stream_message(
+        client,
+        model=model,
+        max_tokens=4000,
+        temperature=0.7,
+        messages=[{"role": "user", "content": prompt}],
+        **extra
+    ))
+
+def log_usage(response, label, started, companies=None):
+    """Append one request's token usage and latency to USAGE_PATH"""
+    usage = getattr(response, "usage", None)
+    row = {
+        "label": label,
+        "at": datetime.utcnow().isoformat(),
+        "latency": round(time.time() - started, 2),
+        "stop_reason": getattr(response, "stop_reason", None),
+        "companies": companies,
+    }
+    for field in USAGE_FIELDS:
+        row[field] = getattr(usage, field, 0) or 0
+        usage_totals[field] += row[field]
+    usage_totals["requests"] += 1
+    usage_totals["companies"] += companies or 0
+    usage_totals["latency"] += row["latency"]
+    append_jsonl(USAGE_PATH, [row])
+
+def usage_cost(totals):
+    return sum(totals[field] * price for field, price in TOKEN_PRICES.items()) / 1e6
+
+def count_companies(result):
+    if isinstance(result, dict):
+        result = result.get("companies")
+    return len(result) if isinstance(result, list) else None
+
+EMBEDDING_DIM = 1024
+SPARSE_THRESHOLD = 0.1
+
+def embed_batch(texts):
+    """Hash-based demo embeddings for many texts in one vectorized pass.
+    
+    Returns a contiguous (len(texts), 1024) float32 array of dense vectors and
+    the sparse projection of each row as (indices, values) arrays. Each vector
+    is the SHA-256 digest of the text tiled to 1024 values and mapped to
+    [-1, 1); the sparse form keeps entries with |value| > 0.1.
+    """
     # For now, create a mock embedding vector of 1024 dimensions
     # In production, you'd use sentence-transformers or another embedding service
-    import hashlib
+    digests = b"".join(hashlib.sha256(text.encode()).digest() for text in texts)
+    hash_bytes = np.frombuffer(digests, dtype=np.uint8).reshape(len(texts), 32)
     
-    # Create a deterministic hash-based embedding for demo
-    hash_obj = hashlib.sha256(text.encode())
-    hash_bytes = hash_obj.digest()
+    # Normalize the 32 digest bytes to [-1, 1] once, then repeat them across 1024 dims
+    base = (hash_bytes.astype(np.float32) - 128.0) / 128.0
+    dense = np.ascontiguousarray(np.tile(base, (1, EMBEDDING_DIM // 32)))
     
-    # Convert to 1024 floats
-    embedding = []
-    for i in range(1024):
-        byte_val = hash_bytes[i % len(hash_bytes)]
-        # Normalize to [-1, 1]
-        embedding.append((byte_val - 128) / 128.0)
+    keep = np.abs(dense) > SPARSE_THRESHOLD
+    sparse = []
+    for row, mask in zip(dense, keep):
+        indices = np.flatnonzero(mask).astype(np.int32)
+        sparse.append((indices, np.ascontiguousarray(row[indices])))
     
-    return embedding
+    return dense, sparse
+
+def get_dense_embedding(text: str):
+    dense, _ = embed_batch([text])
+    return dense[0].tolist()
 
 def get_sparse_embedding(text: str):
-    # For now, use the dense embedding and convert to sparse format
-    dense_emb = get_dense_embedding(text)
-    # Convert to sparse format: only non-zero values with their indices
-    threshold = 0.1
-    sparse_dict = {}
-    for i, val in enumerate(dense_emb):
-        if abs(val) > threshold:
-            sparse_dict[i] = float(val)
-    
+    _, sparse = embed_batch([text])
+    indices, values = sparse[0]
     # Return in Pinecone sparse format
     return {
-        "indices": list(sparse_dict.keys()),
-        "values": list(sparse_dict.values())
+        "indices": indices.tolist(),
+        "values": values.tolist()
     }
 
-def cached_gpt(prompt, cache_prefix="gpt", model="claude-3-5-sonnet-20241022"):
-    cache_key = hashlib.sha256(prompt.encode()).hexdigest()
-    cache_file = os.path.join(CACHE_DIR, f"{cache_prefix}-{cache_key}.json")
-    if os.path.exists(cache_file):
-        with open(cache_file, "r") as f:
-            return json.load(f)
-    result = gpt(prompt, model=model)
+def parse_json_response(result):
+    """Extract and parse the JSON payload from a raw Claude response"""
     try:
         # Extract JSON from markdown code blocks if present
         if "```json" in result:
@@ -175,10 +280,7 @@ def cached_gpt(prompt, cache_prefix="gpt", model="claude-3-5-sonnet-20241022"):
             if json_end > 0:
                 result = result[json_start:json_end].strip()
         
-        parsed = json.loads(result)
-        with open(cache_file, "w") as f:
-            json.dump(parsed, f, indent=2)
-        return parsed
+        return json.loads(result)
     except json.JSONDecodeError as e:
         print(f"Invalid JSON from Claude:\n{result[:500]}...")
         print(f"JSON Error: {e}")
@@ -189,62 +291,93 @@ def cached_gpt(prompt, cache_prefix="gpt", model="claude-3-5-sonnet-20241022"):
         print(f"Result preview: {str(result)[:200]}...")
         raise
 
+def request_key(prompt, cache_prefix, system=None):
+    # The system prefix is part of the request, so it is part of the key when there is one
+    return prompt_key(prompt if system is None else json.dumps(system) + prompt, cache_prefix)
+
+def cached_gpt(prompt, cache_prefix="gpt", model="claude-3-5-sonnet-20241022", recover=None, system=None):
+    """Cached, parsed response; `recover(text)` builds a result from unparseable (truncated) text"""
+    key = request_key(prompt, cache_prefix, system)
+    cached = llm_cache.get(key)
+    if cached is not None:
+        return cached
+    started = time.time()
+    response = gpt_message(prompt, model=model, system=system)
+    result = response.content[0].text
+    try:
+        parsed = parse_json_response(result)
+    except json.JSONDecodeError:
+        log_usage(response, cache_prefix, started, len(salvage_array(result)[0]))
+        if recover is None:
+            raise
+        parsed = recover(result)
+    else:
+        log_usage(response, cache_prefix, started, count_companies(parsed))
+    llm_cache.set(key, parsed)
+    return parsed
+
+async def cached_agpt(prompt, cache_prefix="gpt", model="claude-3-5-sonnet-20241022", recover=None, system=None):
+    """Async counterpart of cached_gpt() sharing the same cache"""
+    key = request_key(prompt, cache_prefix, system)
+    cached = llm_cache.get(key)
+    if cached is not None:
+        return cached
+    started = time.time()
+    response = await agpt_message(prompt, model=model, system=system)
+    result = response.content[0].text
+    try:
+        parsed = parse_json_response(result)
+    except json.JSONDecodeError:
+        log_usage(response, cache_prefix, started, len(salvage_array(result)[0]))
+        if recover is None:
+            raise
+        # Recovery makes blocking follow-up requests; keep them off the event loop
+        parsed = await asyncio.to_thread(recover, result)
+    else:
+        log_usage(response, cache_prefix, started, count_companies(parsed))
+    llm_cache.set(key, parsed)
+    return parsed
+
+def print_cache_stats():
+    stats = llm_cache.stats()
+    print(f"🗄️  LLM cache: {stats['hits']} hits, {stats['misses']} misses, "
+          f"{stats['bytes_read'] / 1e6:.1f} MB read, {stats['bytes_written'] / 1e6:.1f} MB written, "
+          f"{stats['evictions']} evicted, {stats['entries']} entries")
+    print_usage_stats(usage_totals)
+
+def print_usage_stats(totals):
+    if not totals["requests"]:
+        return
+    cost = usage_cost(totals)
+    print(f"💵 Tokens: {totals['input_tokens']:,} in, {totals['output_tokens']:,} out, "
+          f"{totals['cache_read_input_tokens']:,} cache read, {totals['cache_creation_input_tokens']:,} cache write "
+          f"over {totals['requests']} requests (${cost:.2f}, {totals['latency'] / totals['requests']:.1f}s avg)")
+    if totals["companies"]:
+        print(f"   Per company: ${cost / totals['companies']:.4f}, "
+              f"{totals['output_tokens'] / totals['companies']:.0f} output tokens, "
+              f"{totals['latency'] / totals['companies']:.1f}s")
+
+def summarize_usage(path=USAGE_PATH):
+    """Totals of a usage log, e.g. from an earlier run"""
+    totals = dict.fromkeys(usage_totals, 0)
+    if not os.path.exists(path):
+        return totals
+    for row in iter_jsonl(path):
+        totals["requests"] += 1
+        totals["companies"] += row.get("companies") or 0
+        totals["latency"] += row.get("latency", 0)
+        for field in USAGE_FIELDS:
+            totals[field] += row.get(field, 0)
+    return totals
+
 def save_json(companies):
-    with open(JSON_PATH, "a") as f:
-        json.dump(companies, f)
-        f.write(",\n")
+    append_jsonl(JSON_PATH, (company for company in companies if isinstance(company, dict)))
 
 def save_to_sqlite(company, role, company_id, role_id):
-    # Save company
-    cursor.execute("""
-    INSERT OR IGNORE INTO companies (
-        id, company_name, about, industry, sub_industry, company_stage, size,
-        culture_tags, tech_stack, source, fetched_at
-    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, (
-        company_id,
-        company["company_name"],
-        company["about"],
-        company["industry"],
-        company["sub_industry"],
-        company.get("company_stage", ""),
-        company.get("size", ""),
-        json.dumps(company.get("culture_tags", [])),
-        json.dumps(company.get("tech_stack", [])),
-        "gpt",
-        datetime.utcnow().isoformat()
-    ))
-    
-    # Save role
-    cursor.execute("""
-    INSERT OR IGNORE INTO roles (
-        id, company_id, company_name, title, department, seniority_level, industry, sub_industry, 
-        location, description, required_skills, nice_to_have_skills,
-        salary_min, salary_max, visa_sponsorship, min_experience_years, source, fetched_at
-    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, (
-        role_id,
-        company_id,
-        company["company_name"],
-        role["title"],
-        role.get("department", ""),
-        role.get("seniority_level", ""),
-        company["industry"],
-        company["sub_industry"],
-        role["location"],
-        role["description"],
-        json.dumps(role["required_skills"]),
-        json.dumps(role["nice_to_have_skills"]),
-        role["salary_range"][0] if role["salary_range"] else 0,
-        role["salary_range"][1] if role["salary_range"] else 0,
-        role["visa_sponsorship"],
-        role["min_experience_years"],
-        "gpt",
-        datetime.utcnow().isoformat()
-    ))
-    conn.commit()
+    # Buffered; written in one transaction by commit_unit()
+    db_writer.add(company, role, company_id, role_id)
 
-def upsert_to_pinecone(company, role, company_id, role_id):
+def build_embed_text(company, role):
     embed_text = f"""
 Company: {company['company_name']}
 About: {company['about']}
@@ -256,10 +389,14 @@ Skills: {', '.join(role['required_skills'] + role['nice_to_have_skills'])}
 Culture: {', '.join(company.get('culture_tags', []))}
 Tech Stack: {', '.join(company.get('tech_stack', []))}
 """
+    return embed_text.strip()
 
-    # Get both dense and sparse embeddings
-    dense_embedding = get_dense_embedding(embed_text.strip())
-    sparse_embedding = get_sparse_embedding(embed_text.strip())
+def upsert_to_pinecone(company, role, company_id, role_id, dense_embedding=None, sparse_embedding=None):
+    # Get both dense and sparse embeddings unless the caller batched them
+    if dense_embedding is None or sparse_embedding is None:
+        embed_text = build_embed_text(company, role)
+        dense_embedding = get_dense_embedding(embed_text)
+        sparse_embedding = get_sparse_embedding(embed_text)
 
     # Shared metadata
     metadata = {
@@ -302,11 +439,27 @@ Tech Stack: {', '.join(company.get('tech_stack', []))}
         "metadata": metadata
     }
 
-    # Upsert to both indexes
-    dense_index.upsert([dense_vector], namespace=DENSE_NAMESPACE)
-    sparse_index.upsert([sparse_vector], namespace=SPARSE_NAMESPACE)
+    # Held until commit_unit(), so a discarded unit never reaches either index
+    unit_vectors.append((dense_vector, sparse_vector))
+
+    print(f"✅ Queued {metadata['title']} ({metadata['department']}) at {metadata['company']} for both dense and sparse indexes")
+
+def flush_upserts():
+    """Send the unit's vectors to both indexes; raises if any batch failed"""
+    vectors = unit_vectors[:]
+    unit_vectors.clear()
+    for dense_vector, sparse_vector in vectors:
+        dense_buffer.add(dense_vector, namespace=DENSE_NAMESPACE)
+        sparse_buffer.add(sparse_vector, namespace=SPARSE_NAMESPACE)
+    try:
+        dense_buffer.flush()
+    finally:
+        sparse_buffer.flush()
 
-    print(f"✅ Upserted {metadata['title']} ({metadata['department']}) at {metadata['company']} to both dense and sparse indexes")
+def discard_unit():
+    """Drop the unit's uncommitted rows and its vectors that were never sent"""
+    db_writer.discard()
+    unit_vectors.clear()
 
 def get_industry_tree():
     prompt = """Return ONLY a valid JSON object of major industries and their sub-industries. Include these additional sectors:
@@ -354,11 +507,11 @@ def web_search_companies(industry, subindustry):
         print(f"Web search failed: {e}")
         return ""
 
-def get_enriched_companies(industry, subindustry):
+def build_enriched_prompt(industry, subindustry, count=COMPANIES_PER_UNIT, exclude=()):
     # First, search for real company data
     web_data = web_search_companies(industry, subindustry)
     
-    prompt = f"""You are a recruitment expert with access to web search data. Generate 15 real companies in "{subindustry}" ({industry}).
+    prompt = f"""You are a recruitment expert with access to web search data. Generate {count} real companies in "{subindustry}" ({industry}).
 
 Web search context: {web_data}
 
@@ -410,32 +563,115 @@ JSON format:
 ]
 
 Return ONLY valid JSON with realistic data."""
+    if exclude:
+        # Follow-up requests must not repeat companies we already have
+        prompt += f"\n\nThese companies are already covered, do NOT include them: {', '.join(exclude)}"
+    return prompt
+
+def enriched_request(industry, subindustry, count=COMPANIES_PER_UNIT, exclude=()):
+    """(prompt, system) for a sub-industry request.
+    
+    With PROMPT_CACHING or COMPACT_SCHEMA the instructions and schema move to a
+    cached system prefix and only the sub-industry goes in the prompt; by
+    default the single legacy prompt is sent, so existing cache keys still hit.
+    """
+    if not (PROMPT_CACHING or COMPACT_SCHEMA):
+        return build_enriched_prompt(industry, subindustry, count, exclude), None
+    web_data = web_search_companies(industry, subindustry)
+    return build_user_prompt(industry, subindustry, web_data, count, exclude), system_blocks(COMPACT_SCHEMA)
+
+def expand_result(result, industry, subindustry):
+    """Full field names for a (possibly compact) parsed response"""
+    if isinstance(result, list):
+        return expand_companies(result, industry, subindustry)
+    if isinstance(result, dict) and isinstance(result.get("companies"), list):
+        return {**result, "companies": expand_companies(result["companies"], industry, subindustry)}
+    return result
+
+def enriched_cache_prefix(industry, subindustry, shared=False):
+    # Coordinated workers never repeat a unit, so they share one cache entry per unit
+    if shared:
+        return f"{industry}-{subindustry}-v8-15companies-shared"
     # Add batch number to cache key for multiple runs
-    batch_num = os.getenv("BATCH_NUM", "1")
-    return cached_gpt(prompt, cache_prefix=f"{industry}-{subindustry}-v8-15companies-batch{batch_num}")
+    return f"{industry}-{subindustry}-v8-15companies-batch{batch_num}"
+
+def request_missing_companies(industry, subindustry, companies, expected=COMPANIES_PER_UNIT):
+    """Top up a short list of companies with smaller follow-up requests for only the missing count"""
+    added = []
+    for _ in range(MAX_FOLLOWUPS):
+        missing = expected - len(companies) - len(added)
+        if missing <= 0:
+            break
+        have = {company.get("company_name", "").lower() for company in companies + added}
+        print(f"🔁 Requesting {missing} more companies for {industry} > {subindustry}")
+        prompt, system = enriched_request(industry, subindustry, count=missing,
+                                          exclude=[company.get("company_name", "") for company in companies + added])
+        started = time.time()
+        response = gpt_message(prompt, system=system)
+        followup, _, _ = salvage_array(response.content[0].text)
+        followup = expand_companies(followup, industry, subindustry)
+        log_usage(response, f"{industry}-{subindustry}-followup", started, len(followup))
+        new = [c for c in followup if isinstance(c, dict) and c.get("company_name", "").lower() not in have]
+        if not new:
+            break
+        added.extend(new[:missing])
+    return added
+
+def recover_enriched_companies(text, industry, subindustry, expected=COMPANIES_PER_UNIT):
+    """Keep the complete companies of a truncated response and request only the rest"""
+    companies, complete, _ = salvage_array(text)
+    companies = [expand_company(company, industry, subindustry) for company in companies if isinstance(company, dict)]
+    if not companies:
+        raise ValueError("Truncated response contained no complete companies")
+    print(f"🩹 Salvaged {len(companies)}/{expected} companies from {'an invalid' if complete else 'a truncated'} response")
+    return companies + request_missing_companies(industry, subindustry, companies, expected)
+
+def get_enriched_companies(industry, subindustry, shared_cache=False):
+    prompt, system = enriched_request(industry, subindustry)
+    result = cached_gpt(prompt, cache_prefix=enriched_cache_prefix(industry, subindustry, shared_cache),
+                        recover=lambda text: recover_enriched_companies(text, industry, subindustry), system=system)
+    return expand_result(result, industry, subindustry)
+
+async def aget_enriched_companies(industry, subindustry):
+    prompt, system = enriched_request(industry, subindustry)
+    result = await cached_agpt(prompt, cache_prefix=enriched_cache_prefix(industry, subindustry),
+                               recover=lambda text: recover_enriched_companies(text, industry, subindustry), system=system)
+    return expand_result(result, industry, subindustry)
 
 def load_progress():
+    # The progress table is committed with the rows and wins; the JSON file only adds
+    # keys the table lacks (units finished before the table existed)
+    progress = db_writer.load_progress()
     if os.path.exists(PROGRESS_PATH):
         with open(PROGRESS_PATH, "r") as f:
-            return json.load(f)
-    return {}
+            for key, status in json.load(f).items():
+                progress.setdefault(key, status)
+    return progress
 
 def save_progress(progress):
     with open(PROGRESS_PATH, "w") as f:
         json.dump(progress, f)
 
+def commit_unit(key, progress):
+    """Commit a sub-industry's rows and its progress checkpoint in one transaction,
+    then send its vectors, so the indexes only ever hold committed roles"""
+    db_writer.commit(progress_key=key)
+    progress[key] = "done"
+    save_progress(progress)
+    try:
+        flush_upserts()
+    except Exception as e:
+        # Rows are stored; upserts are idempotent by role id, so the vectors can be re-sent from SQLite
+        raise RuntimeError(f"{key} committed to SQLite but its vectors failed: {e}") from e
+
 # === BATCH PROCESSING ===
-def run_batch(target_industries=None, start_from=None):
-    """Run processing for specific industries or continue from a checkpoint"""
-    industry_tree = get_industry_tree()
-    progress = load_progress()
-    
+def pending_work_units(industry_tree, progress, target_industries=None, start_from=None):
+    """Yield (industry, subindustry, key) for every unit not yet marked done"""
     # Filter industries if specified
     if target_industries:
         industry_tree = {k: v for k, v in industry_tree.items() if k in target_industries}
     
     started = start_from is None
-    total_processed = 0
     
     for industry, subindustries in industry_tree.items():
         for subindustry in subindustries:
@@ -450,89 +686,297 @@ def run_batch(target_industries=None, start_from=None):
             
             if progress.get(key) == "done":
                 continue
-                
-            print(f"\n🔍 {industry} > {subindustry}")
+            
+            yield industry, subindustry, key
+
+def extract_companies(result):
+    """Normalize a Claude response into a list of companies, or None to skip"""
+    # Handle case where Claude wraps in {"companies": [...]}
+    if isinstance(result, dict) and "companies" in result:
+        return result["companies"]
+    elif isinstance(result, list):
+        return result
+    elif isinstance(result, dict):
+        # Check if it's a single company wrapped in a dict
+        if "company_name" in result:
+            return [result]
+        elif "status" in result:
+            print(f"Claude returned status message instead of companies. Skipping...")
+            return None
+        else:
+            print(f"Dict without 'companies' key. Keys: {list(result.keys())}")
+            print(f"Sample data: {str(result)[:200]}...")
+            return None
+    else:
+        print(f"Expected list or dict with 'companies' key, got {type(result)}")
+        return None
+
+def process_companies(companies):
+    """Buffer every company and role of one sub-industry until commit_unit()"""
+    save_json(companies)
+    for i, company in enumerate(companies):
+        process_company(company, f"{i+1}/{len(companies)}")
+
+def process_company(company, position=""):
+    """Buffer one company's roles for SQLite and its vectors for Pinecone"""
+    if not isinstance(company, dict):
+        print(f"Expected dict, got {type(company)}: {company}")
+        return
+    
+    print(f"Processing company {position}: {company.get('company_name', 'Unknown')}")
+    # Clean company name for ASCII-only IDs
+    clean_name = company['company_name'].lower()
+    # Remove non-ASCII characters
+    clean_name = ''.join(c for c in clean_name if ord(c) < 128)
+    # Replace spaces and special chars with dashes
+    clean_name = ''.join(c if c.isalnum() else '-' for c in clean_name)
+    # Remove multiple consecutive dashes
+    clean_name = '-'.join(filter(None, clean_name.split('-')))
+    company_id = f"{clean_name}-{uuid.uuid4().hex[:6]}"
+    roles = company.get("roles", [])
+    print(f"  Found {len(roles)} roles")
+    
+    for role in roles:
+        # Ensure all required fields exist with defaults
+        role.setdefault("title", "Unknown Title")
+        role.setdefault("department", "")
+        role.setdefault("description", "")
+        role.setdefault("required_skills", [])
+        role.setdefault("nice_to_have_skills", [])
+        role.setdefault("location", "")
+        # Fix salary_range to ensure it's always a valid list with 2 elements
+        salary_range = role.get("salary_range", [0, 0])
+        if not isinstance(salary_range, list) or len(salary_range) != 2:
+            salary_range = [0, 0]
+        role["salary_range"] = salary_range
+        role.setdefault("visa_sponsorship", False)
+        role.setdefault("min_experience_years", 0)
+        role.setdefault("seniority_level", "")
+    
+    # Embed every role of the company in one vectorized pass
+    dense, sparse = embed_batch([build_embed_text(company, role) for role in roles])
+    
+    for j, role in enumerate(roles):
+        print(f"  Processing role {j+1}/{len(roles)}: {role['title']}")
+        # Clean role title for ASCII-only IDs
+        clean_title = role['title'].lower()
+        clean_title = ''.join(c for c in clean_title if ord(c) < 128)
+        clean_title = ''.join(c if c.isalnum() else '-' for c in clean_title)
+        clean_title = '-'.join(filter(None, clean_title.split('-')))
+        role_id = f"{company_id}-{clean_title}-{uuid.uuid4().hex[:6]}"
+        save_to_sqlite(company, role, company_id, role_id)
+        indices, values = sparse[j]
+        upsert_to_pinecone(
+            company, role, company_id, role_id,
+            dense_embedding=dense[j].tolist(),
+            sparse_embedding={"indices": indices.tolist(), "values": values.tolist()}
+        )
+
+def stream_enriched_companies(industry, subindustry, shared_cache=False):
+    """Generate a sub-industry from a streamed response, storing each company as it arrives.
+    
+    Companies are written as soon as their closing brace is received, so a
+    response cut short by max_tokens or a dropped connection keeps every
+    company that was complete. Only fully received responses are cached.
+    """
+    prompt, system = enriched_request(industry, subindustry)
+    label = enriched_cache_prefix(industry, subindustry, shared_cache)
+    key = request_key(prompt, label, system)
+    cached = llm_cache.get(key)
+    if cached is not None:
+        companies = extract_companies(expand_result(cached, industry, subindustry))
+        if companies:
+            print(f"Got {len(companies)} companies (cached)")
+            process_companies(companies)
+        return companies
+    
+    parser = JsonArrayStreamParser()
+    companies = []
+    response = None
+    started = time.time()
+    
+    stream = stream_gpt(prompt, system=system)
+    try:
+        while True:
+            for company in parser.feed(next(stream)):
+                company = expand_company(company, industry, subindustry)
+                if not companies:
+                    print(f"⚡ First company after {time.time() - started:.1f}s")
+                companies.append(company)
+                save_json([company])
+                process_company(company, str(len(companies)))
+    except StopIteration as stop:
+        response = stop.value
+    except Exception as e:
+        if not companies:
+            raise
+        print(f"⚠️  Stream failed after {len(companies)} companies, keeping them: {e}")
+    
+    complete = parser.close()
+    if response is not None:
+        log_usage(response, label, started, len(companies))
+    truncated = getattr(response, "stop_reason", None) == "max_tokens"
+    if not complete or truncated:
+        print(f"⚠️  Incomplete response ({'; '.join(parser.errors) or 'max_tokens'}), kept {len(companies)} companies")
+        extra = request_missing_companies(industry, subindustry, companies) if companies else []
+        if extra:
+            save_json(extra)
+            for company in extra:
+                companies.append(company)
+                process_company(company, str(len(companies)))
+        complete = len(companies) >= COMPANIES_PER_UNIT
+    if complete:
+        llm_cache.set(key, companies)
+    
+    print(f"Got {len(companies)} companies in {time.time() - started:.1f}s")
+    return companies
+
+def generate_unit(industry, subindustry, shared_cache=False):
+    """Generate one sub-industry and buffer its rows; returns the companies, or None to skip"""
+    if STREAM_RESPONSES:
+        return stream_enriched_companies(industry, subindustry, shared_cache) or None
+    
+    result = get_enriched_companies(industry, subindustry, shared_cache)
+    companies = extract_companies(result)
+    if companies is None:
+        return None
+    
+    print(f"Got {len(companies)} companies")
+    process_companies(companies)
+    return companies
+
+def run_batch(target_industries=None, start_from=None):
+    """Run processing for specific industries or continue from a checkpoint"""
+    industry_tree = get_industry_tree()
+    progress = load_progress()
+    
+    total_processed = 0
+    
+    for industry, subindustry, key in pending_work_units(industry_tree, progress, target_industries, start_from):
+        print(f"\n🔍 {industry} > {subindustry}")
+        try:
+            companies = generate_unit(industry, subindustry)
+            if companies is None:
+                continue
+            
+            commit_unit(key, progress)
+            total_processed += len(companies)
+            print(f"📊 Total companies processed so far: {total_processed}")
+            
+        except Exception as e:
+            discard_unit()
+            print(f"❌ Error in {industry} > {subindustry}: {e}")
+            time.sleep(3)
+    
+    print_cache_stats()
+
+def run_worker(target_industries=None):
+    """Pull work units from the shared coordinator until none are left.
+    
+    Any number of worker processes can run this at once; each unit is leased
+    to one worker at a time and handed to another if its worker dies.
+    """
+    industry_tree = get_industry_tree()
+    progress = load_progress()
+    coordinator = WorkCoordinator(worker_id=f"batch{batch_num}-{os.getpid()}")
+    
+    units = list(pending_work_units(industry_tree, {}, target_industries))
+    coordinator.seed(units, done_keys=[key for key, status in progress.items() if status == "done"])
+    keys = [key for _, _, key in units] if target_industries else None
+    
+    total_processed = 0
+    print(f"👷 Worker {coordinator.worker_id} started: {coordinator.stats()}")
+    
+    while True:
+        unit = coordinator.claim(keys)
+        if unit is None:
+            break
+        industry, subindustry, key = unit
+        print(f"\n🔍 {industry} > {subindustry}")
+        
+        with coordinator.keepalive(key) as lease_lost:
             try:
-                result = get_enriched_companies(industry, subindustry)
+                companies = generate_unit(industry, subindustry, shared_cache=True)
+                if companies is None:
+                    coordinator.release(key, "no companies in response")
+                    continue
                 
-                # Handle case where Claude wraps in {"companies": [...]}
-                if isinstance(result, dict) and "companies" in result:
-                    companies = result["companies"]
-                elif isinstance(result, list):
-                    companies = result
-                elif isinstance(result, dict):
-                    # Check if it's a single company wrapped in a dict
-                    if "company_name" in result:
-                        companies = [result]
-                    elif "status" in result:
-                        print(f"Claude returned status message instead of companies. Skipping...")
-                        continue
-                    else:
-                        print(f"Dict without 'companies' key. Keys: {list(result.keys())}")
-                        print(f"Sample data: {str(result)[:200]}...")
-                        continue
-                else:
-                    print(f"Expected list or dict with 'companies' key, got {type(result)}")
+                # Another worker owns the unit once our lease has lapsed; drop our copy
+                if lease_lost.is_set() or not coordinator.owns(key):
+                    discard_unit()
+                    print(f"⚠️  Lease on {key} expired; discarding results")
                     continue
                 
-                print(f"Got {len(companies)} companies")
-                    
-                save_json(companies)
-                for i, company in enumerate(companies):
-                    if not isinstance(company, dict):
-                        print(f"Expected dict, got {type(company)}: {company}")
-                        continue
-                        
-                    print(f"Processing company {i+1}/{len(companies)}: {company.get('company_name', 'Unknown')}")
-                    # Clean company name for ASCII-only IDs
-                    clean_name = company['company_name'].lower()
-                    # Remove non-ASCII characters
-                    clean_name = ''.join(c for c in clean_name if ord(c) < 128)
-                    # Replace spaces and special chars with dashes
-                    clean_name = ''.join(c if c.isalnum() else '-' for c in clean_name)
-                    # Remove multiple consecutive dashes
-                    clean_name = '-'.join(filter(None, clean_name.split('-')))
-                    company_id = f"{clean_name}-{uuid.uuid4().hex[:6]}"
-                    roles = company.get("roles", [])
-                    print(f"  Found {len(roles)} roles")
-                    
-                    for j, role in enumerate(roles):
-                        # Ensure all required fields exist with defaults
-                        role.setdefault("title", "Unknown Title")
-                        role.setdefault("department", "")
-                        role.setdefault("description", "")
-                        role.setdefault("required_skills", [])
-                        role.setdefault("nice_to_have_skills", [])
-                        role.setdefault("location", "")
-                        # Fix salary_range to ensure it's always a valid list with 2 elements
-                        salary_range = role.get("salary_range", [0, 0])
-                        if not isinstance(salary_range, list) or len(salary_range) != 2:
-                            salary_range = [0, 0]
-                        role["salary_range"] = salary_range
-                        role.setdefault("visa_sponsorship", False)
-                        role.setdefault("min_experience_years", 0)
-                        role.setdefault("seniority_level", "")
-                        
-                        print(f"  Processing role {j+1}/{len(roles)}: {role['title']}")
-                        # Clean role title for ASCII-only IDs
-                        clean_title = role['title'].lower()
-                        clean_title = ''.join(c for c in clean_title if ord(c) < 128)
-                        clean_title = ''.join(c if c.isalnum() else '-' for c in clean_title)
-                        clean_title = '-'.join(filter(None, clean_title.split('-')))
-                        role_id = f"{company_id}-{clean_title}-{uuid.uuid4().hex[:6]}"
-                        save_to_sqlite(company, role, company_id, role_id)
-                        upsert_to_pinecone(company, role, company_id, role_id)
-                        time.sleep(0.05)  # Minimal sleep for massive scale
-                        
-                progress[key] = "done"
-                save_progress(progress)
+                commit_unit(key, progress)
+                coordinator.complete(key)
                 total_processed += len(companies)
                 print(f"📊 Total companies processed so far: {total_processed}")
-                time.sleep(2)
                 
             except Exception as e:
+                discard_unit()
+                coordinator.release(key, str(e))
                 print(f"❌ Error in {industry} > {subindustry}: {e}")
                 time.sleep(3)
+    
+    print(f"\n🏁 Worker {coordinator.worker_id} finished: {total_processed} companies, queue {coordinator.stats()}")
+    print_cache_stats()
+
+async def run_batch_async(target_industries=None, start_from=None, concurrency=CONCURRENCY):
+    """Keep up to `concurrency` sub-industry requests in flight in one process.
+    
+    Generation runs on the async Anthropic client; finished sub-industries are
+    pushed onto a queue and a single consumer writes them to SQLite and
+    Pinecone in a worker thread, so storage never runs concurrently.
+    """
+    industry_tree = get_industry_tree()
+    progress = load_progress()
+    units = list(pending_work_units(industry_tree, progress, target_industries, start_from))
+    
+    print(f"🚀 Async mode: {len(units)} sub-industries, {concurrency} in flight")
+    
+    semaphore = asyncio.Semaphore(concurrency)
+    queue = asyncio.Queue(maxsize=concurrency * 2)
+    total_processed = 0
+    
+    async def produce(industry, subindustry, key):
+        async with semaphore:
+            print(f"\n🔍 {industry} > {subindustry}")
+            try:
+                result = await aget_enriched_companies(industry, subindustry)
+            except Exception as e:
+                print(f"❌ Error in {industry} > {subindustry}: {e}")
+                return
+        companies = extract_companies(result)
+        if companies is not None:
+            await queue.put((key, companies))
+    
+    async def consume():
+        nonlocal total_processed
+        while True:
+            item = await queue.get()
+            if item is None:
+                queue.task_done()
+                return
+            key, companies = item
+            print(f"Got {len(companies)} companies for {key}")
+            try:
+                await asyncio.to_thread(process_companies, companies)
+                await asyncio.to_thread(commit_unit, key, progress)
+                total_processed += len(companies)
+                print(f"📊 Total companies processed so far: {total_processed}")
+            except Exception as e:
+                discard_unit()
+                print(f"❌ Error storing {key}: {e}")
+            finally:
+                queue.task_done()
+    
+    consumer = asyncio.create_task(consume())
+    await asyncio.gather(*(produce(*unit) for unit in units))
+    await queue.put(None)
+    await consumer
+    
+    print(f"\n🎉 Async run complete: {total_processed} companies processed")
+    print_cache_stats()
 
 # === MAIN EXECUTION ===
 if __name__ == "__main__":
@@ -553,11 +997,28 @@ if __name__ == "__main__":
             # Continue from checkpoint: python main.py continue "Industry::Sub-Industry"
             start_point = sys.argv[2] if len(sys.argv) > 2 else None
             run_batch(start_from=start_point)
+        elif sys.argv[1] == "async":
+            # Run everything in one process: python main.py async 16 ["Industry,Industry"]
+            concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else CONCURRENCY
+            industries = sys.argv[3].split(",") if len(sys.argv) > 3 else None
+            asyncio.run(run_batch_async(target_industries=industries, concurrency=concurrency))
+        elif sys.argv[1] == "usage":
+            # Totals of this batch's usage log: python main.py usage [path]
+            print_usage_stats(summarize_usage(sys.argv[2] if len(sys.argv) > 2 else USAGE_PATH))
+        elif sys.argv[1] == "worker":
+            # Coordinated worker; start as many as you like: python main.py worker ["Industry,Industry"]
+            industries = sys.argv[2].split(",") if len(sys.argv) > 2 else None
+            run_worker(target_industries=industries)
         else:
             print("Usage:")
             print("  python main.py                                    # Run all industries")
             print("  python main.py batch 'Legal Services'            # Run specific industry")
             print("  python main.py continue 'Finance::Private Equity' # Continue from checkpoint")
+            print("  python main.py async 16                          # Run all industries, 16 requests in flight")
+            print("  python main.py worker                            # Take units from the shared work queue")
+            print("  python main.py usage                             # Token usage and cost per company so far")
+            print("  STREAM_RESPONSES=1 python main.py ...            # Store each company as it streams in")
+            print("  PROMPT_CACHING=1 COMPACT_SCHEMA=1 python main.py  # Cached system prefix, short JSON keys")
     else:
         # Run all industries
         run_batch()
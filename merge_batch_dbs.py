@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Merge the per-batch SQLite databases into one canonical database.
+
+Every generation process writes its own data/companies_batchN.db (and older
+runs left data/companies.db). This tool ATTACHes each of them in turn and
+copies their rows with INSERT ... SELECT, so the data never passes through
+Python. Companies are deduplicated on their normalized name (see
+near_duplicates.normalize_name: "Acme Inc" and "acme" are one company); the
+first copy wins and every role of a dropped copy is re-pointed at the kept
+company_id. Roles are in turn unique per (company_id, title_key), the
+title lowercased and single-spaced, so a role that several batches
+generated for the same company is kept once instead of piling up on the
+kept copy. Indexes, the skill_index skills / tags tables and the
+fts_search full-text index are built once after the bulk load. Merging is
+idempotent, so it can be re-run on a growing set of batch databases.
+
+The `progress` command is the cheap monitor used by run_massive.sh: one
+process attaches every batch database read-only and counts all of them in a
+single query, instead of two sqlite3 CLI invocations per batch.
+
+Usage:
+    python merge_batch_dbs.py [output.db] [source.db ...]
+    python merge_batch_dbs.py progress [num_batches]
+    python merge_batch_dbs.py count [output.db]
+"""
+
+import os
+import re
+import sys
+import glob
+import sqlite3
+import time
+
+import fts_search
+from near_duplicates import normalize_name
+from skill_index import create_tables as create_skill_tables, backfill as backfill_skills, tag_key
+from sqlite_writer import COMPANY_COLUMNS, ROLE_COLUMNS
+
+DATA_DIR = "data"
+MERGED_PATH = os.path.join(DATA_DIR, "companies_merged.db")
+LEGACY_PATH = os.path.join(DATA_DIR, "companies.db")
+BATCH_PATTERN = os.path.join(DATA_DIR, "companies_batch*.db")
+# SQLite's default SQLITE_MAX_ATTACHED is 10
+MAX_ATTACHED = 8
+
+INDEXES = {
+    "idx_companies_industry": "companies(industry)",
+    "idx_companies_sub_industry": "companies(sub_industry)",
+    "idx_roles_company_id": "roles(company_id)",
+    "idx_roles_industry": "roles(industry)",
+    "idx_roles_sub_industry": "roles(sub_industry)",
+    "idx_roles_seniority_level": "roles(seniority_level)",
+    "idx_roles_location": "roles(location)",
+}
+
+def batch_number(path):
+    match = re.search(r"companies_batch(\d+)\.db$", path)
+    return int(match.group(1)) if match else 0
+
+def batch_paths():
+    return sorted(glob.glob(BATCH_PATTERN), key=batch_number)
+
+def source_paths():
+    """Legacy companies.db first, then batches in numeric order (batch10 after batch9)"""
+    legacy = [LEGACY_PATH] if os.path.exists(LEGACY_PATH) else []
+    return legacy + batch_paths()
+
+def sql_name_key(name):
+    return normalize_name(name) if isinstance(name, str) else ""
+
+def connect(path):
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.create_function("name_key", 1, sql_name_key, deterministic=True)
+    conn.create_function("title_key", 1, tag_key, deterministic=True)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS companies (
+      id TEXT PRIMARY KEY,
+      company_name TEXT,
+      about TEXT,
+      industry TEXT,
+      sub_industry TEXT,
+      company_stage TEXT,
+      size TEXT,
+      culture_tags TEXT,
+      tech_stack TEXT,
+      source TEXT,
+      fetched_at TEXT,
+      name_key TEXT UNIQUE
+    )
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS roles (
+      id TEXT PRIMARY KEY,
+      company_id TEXT,
+      company_name TEXT,
+      title TEXT,
+      department TEXT,
+      seniority_level TEXT,
+      industry TEXT,
+      sub_industry TEXT,
+      location TEXT,
+      description TEXT,
+      required_skills TEXT,
+      nice_to_have_skills TEXT,
+      salary_min INTEGER,
+      salary_max INTEGER,
+      visa_sponsorship BOOLEAN,
+      min_experience_years INTEGER,
+      source TEXT,
+      fetched_at TEXT,
+      title_key TEXT,
+      FOREIGN KEY (company_id) REFERENCES companies (id)
+    )
+    """)
+    dedupe_roles(conn)
+    conn.commit()
+    return conn
+
+def dedupe_roles(conn):
+    """Enforce one role per (company_id, title_key), first copy wins
+
+    Merged databases from before title_key existed get the column, lose
+    their repeated roles (the role_search triggers follow the deletes) and
+    then the unique index that INSERT OR IGNORE relies on.
+    """
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(roles)")}
+    with conn:
+        if "title_key" not in columns:
+            conn.execute("ALTER TABLE roles ADD COLUMN title_key TEXT")
+            conn.execute("UPDATE roles SET title_key = title_key(title)")
+            conn.execute("""
+            DELETE FROM roles WHERE rowid NOT IN (
+              SELECT MIN(rowid) FROM roles GROUP BY company_id, title_key
+            )
+            """)
+            if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'role_skills'").fetchone():
+                conn.execute("DELETE FROM role_skills WHERE role_id NOT IN (SELECT id FROM roles)")
+        conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_roles_company_title ON roles(company_id, title_key)")
+
+def attach_readonly(conn, path, alias):
+    # mode=ro leaves databases that generation processes are still writing untouched
+    conn.execute(f"ATTACH DATABASE ? AS {alias}", (f"file:{os.path.abspath(path)}?mode=ro",))
+
+def merge_source(conn, path):
+    """Copy one attached database into the merged one; returns per-source counts"""
+    before = conn.execute("SELECT (SELECT COUNT(*) FROM companies), (SELECT COUNT(*) FROM roles)").fetchone()
+    attach_readonly(conn, path, "src")
+    try:
+        with conn:
+            company_columns = ", ".join(COMPANY_COLUMNS)
+            # Conflicts on id or name_key are the duplicates being dropped
+            conn.execute(f"""
+            INSERT OR IGNORE INTO companies ({company_columns}, name_key)
+            SELECT {company_columns}, name_key(company_name) FROM src.companies ORDER BY rowid
+            """)
+            # Source company id -> id of the company that was kept for its name
+            conn.execute("DROP TABLE IF EXISTS temp.company_map")
+            conn.execute("""
+            CREATE TEMP TABLE company_map AS
+            SELECT s.id AS source_id, c.id AS company_id, c.company_name AS company_name
+            FROM src.companies s JOIN companies c ON c.name_key = name_key(s.company_name)
+            """)
+            conn.execute("CREATE UNIQUE INDEX temp.idx_company_map ON company_map(source_id)")
+            role_columns = ", ".join(ROLE_COLUMNS)
+            role_values = ", ".join(
+                {"company_id": "COALESCE(m.company_id, r.company_id)",
+                 "company_name": "COALESCE(m.company_name, r.company_name)"}.get(column, f"r.{column}")
+                for column in ROLE_COLUMNS
+            )
+            # Conflicts on id or (company_id, title_key) are repeated roles
+            conn.execute(f"""
+            INSERT OR IGNORE INTO roles ({role_columns}, title_key)
+            SELECT {role_values}, title_key(r.title)
+            FROM src.roles r LEFT JOIN company_map m ON m.source_id = r.company_id
+            ORDER BY r.rowid
+            """)
+            read = conn.execute("SELECT (SELECT COUNT(*) FROM src.companies), (SELECT COUNT(*) FROM src.roles)").fetchone()
+            conn.execute("DROP TABLE temp.company_map")
+    finally:
+        conn.execute("DETACH DATABASE src")
+    after = conn.execute("SELECT (SELECT COUNT(*) FROM companies), (SELECT COUNT(*) FROM roles)").fetchone()
+    return {
+        "source": path,
+        "companies_read": read[0],
+        "roles_read": read[1],
+        "companies_added": after[0] - before[0],
+        "roles_added": after[1] - before[1],
+    }
+
+def create_indexes(conn):
+    with conn:
+        for name, target in INDEXES.items():
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {target}")
+    conn.execute("ANALYZE")
+
+def merge_batch_dbs(output_path=MERGED_PATH, sources=None):
+    """Merge `sources` (default: companies.db + every batch db) into output_path"""
+    sources = sources if sources is not None else source_paths()
+    sources = [path for path in sources if os.path.abspath(path) != os.path.abspath(output_path)]
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    conn = connect(output_path)
+    results = []
+    try:
+        for path in sources:
+            try:
+                results.append(merge_source(conn, path))
+            except sqlite3.DatabaseError as e:
+                results.append({"source": path, "error": str(e)})
+        create_indexes(conn)
+        # Re-pointed company ids make the batches' own junction rows unusable; rebuild here
+        create_skill_tables(conn)
+        backfill_skills(conn)
+        # First merge fills role_search; afterwards its triggers keep it in sync
+        fts_search.migrate(conn)
+        totals = count_rows(conn)
+    finally:
+        conn.close()
+    return results, totals
+
+def count_rows(conn):
+    companies, roles = conn.execute("SELECT (SELECT COUNT(*) FROM companies), (SELECT COUNT(*) FROM roles)").fetchone()
+    return {"companies": companies, "roles": roles}
+
+# ---------- Progress monitor ----------
+
+def batch_progress(paths):
+    """{path: (companies, roles) or None} using one query per MAX_ATTACHED databases"""
+    progress = {path: None for path in paths}
+    conn = sqlite3.connect(":memory:", uri=True)
+    try:
+        for start in range(0, len(paths), MAX_ATTACHED):
+            chunk = paths[start:start + MAX_ATTACHED]
+            selects = []
+            for index, path in enumerate(chunk):
+                alias = f"b{index}"
+                try:
+                    attach_readonly(conn, path, alias)
+                    conn.execute(f"SELECT 1 FROM {alias}.companies, {alias}.roles LIMIT 0")
+                except sqlite3.DatabaseError:
+                    # Not created yet, or the writer has not made the tables yet
+                    if alias in {row[1] for row in conn.execute("PRAGMA database_list")}:
+                        conn.execute(f"DETACH DATABASE {alias}")
+                    continue
+                selects.append(
+                    f"SELECT {index}, (SELECT COUNT(*) FROM {alias}.companies), (SELECT COUNT(*) FROM {alias}.roles)"
+                )
+            if selects:
+                for index, companies, roles in conn.execute(" UNION ALL ".join(selects)):
+                    progress[chunk[index]] = (companies, roles)
+            for row in conn.execute("PRAGMA database_list").fetchall():
+                if row[1] not in ("main", "temp"):
+                    conn.execute(f"DETACH DATABASE {row[1]}")
+    finally:
+        conn.close()
+    return progress
+
+def print_progress(num_batches=None):
+    if num_batches:
+        numbers = range(1, num_batches + 1)
+    else:
+        numbers = [batch_number(path) for path in batch_paths()]
+    paths = [os.path.join(DATA_DIR, f"companies_batch{i}.db") for i in numbers]
+    progress = batch_progress([path for path in paths if os.path.exists(path)])
+    total_companies = total_roles = 0
+    for number, path in zip(numbers, paths):
+        counts = progress.get(path)
+        if counts is None:
+            print(f"  Batch {number}: Starting...")
+            continue
+        print(f"  Batch {number}: {counts[0]} companies, {counts[1]} roles")
+        total_companies += counts[0]
+        total_roles += counts[1]
+    print(f"  Total: {total_companies} companies, {total_roles} roles")
+
+def main():
+    args = sys.argv[1:]
+    if args and args[0] == "progress":
+        print_progress(int(args[1]) if len(args) > 1 else None)
+        return
+    if args and args[0] == "count":
+        # Machine-readable "companies roles" for shell scripts
+        conn = sqlite3.connect(args[1] if len(args) > 1 else MERGED_PATH)
+        try:
+            totals = count_rows(conn)
+        except sqlite3.DatabaseError:
+            totals = {"companies": 0, "roles": 0}
+        finally:
+            conn.close()
+        print(totals["companies"], totals["roles"])
+        return
+
+    output_path = args[0] if args else MERGED_PATH
+    sources = args[1:] or None
+    print(f"🗄️  Merging batch databases into {output_path}")
+    start = time.time()
+    results, totals = merge_batch_dbs(output_path, sources)
+    for result in results:
+        if "error" in result:
+            print(f"   ❌ {result['source']}: {result['error']}")
+            continue
+        print(f"   📂 {result['source']}: {result['companies_added']}/{result['companies_read']} companies, "
+              f"{result['roles_added']}/{result['roles_read']} roles added")
+    print(f"✅ {totals['companies']:,} companies, {totals['roles']:,} roles in {output_path} "
+          f"({time.time() - start:.1f}s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Bulk generation through the Anthropic Message Batches API.
+
+MessageBatchRunner submits a large set of requests as message batches,
+polls until they end and hands every result to a callback as it is read
+from the results stream. Submitted batch IDs are written to a state file
+straight away, so a restarted run polls and collects the batches it
+already paid for instead of submitting them again.
+
+LocalBatchClient mimics `client.messages.batches` on disk, so the whole
+submit / poll / collect cycle (including resume) can be run offline.
+"""
+
+import os
+import json
+import time
+import uuid
+from types import SimpleNamespace
+from datetime import datetime
+
+BATCH_STATE_PATH = os.path.join("data", "message_batches.json")
+# API limits are 100,000 requests / 256 MB per batch; stay well inside them
+MAX_REQUESTS_PER_BATCH = 10_000
+MAX_BATCH_BYTES = 200 * 1024 * 1024
+POLL_SECONDS = 60
+
+def result_text(result):
+    """Text of a succeeded batch result, or None"""
+    if result.type != "succeeded":
+        return None
+    return "".join(block.text for block in result.message.content if getattr(block, "type", "text") == "text")
+
+class MessageBatchRunner:
+    """Submits requests as message batches and collects their results, resumably"""
+
+    def __init__(self, client, state_path=BATCH_STATE_PATH, poll_seconds=POLL_SECONDS,
+                 max_requests=MAX_REQUESTS_PER_BATCH, max_bytes=MAX_BATCH_BYTES):
+        self.client = client
+        self.state_path = state_path
+        self.poll_seconds = poll_seconds
+        self.max_requests = max_requests
+        self.max_bytes = max_bytes
+        self.state = self._load_state()
+
+    def _load_state(self):
+        if os.path.exists(self.state_path):
+            with open(self.state_path, "r") as f:
+                return json.load(f)
+        return {"batches": []}
+
+    def _save_state(self):
+        os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    def submitted_ids(self):
+        return {custom_id for batch in self.state["batches"] for custom_id in batch["custom_ids"]}
+
+    def collected_ids(self):
+        return {custom_id for batch in self.state["batches"] if batch["collected"]
+                for custom_id in batch["custom_ids"]}
+
+    def forget(self, custom_ids):
+        """Drop custom_ids from collected batches so the next submit() sends them again"""
+        custom_ids = set(custom_ids)
+        forgotten = 0
+        for batch in self.state["batches"]:
+            if not batch["collected"]:
+                continue  # still pending; its results will arrive
+            kept = [custom_id for custom_id in batch["custom_ids"] if custom_id not in custom_ids]
+            forgotten += len(batch["custom_ids"]) - len(kept)
+            batch["custom_ids"] = kept
+        if forgotten:
+            self._save_state()
+        return forgotten
+
+    def _chunks(self, requests):
+        chunk, size = [], 0
+        for request in requests:
+            request_size = len(json.dumps(request))
+            if chunk and (len(chunk) >= self.max_requests or size + request_size > self.max_bytes):
+                yield chunk
+                chunk, size = [], 0
+            chunk.append(request)
+            size += request_size
+        if chunk:
+            yield chunk
+
+    def submit(self, requests):
+        """Submit every request whose custom_id is not in a saved batch yet"""
+        already = self.submitted_ids()
+        pending = [request for request in requests if request["custom_id"] not in already]
+        if already:
+            print(f"↩️  {len(requests) - len(pending)} requests already submitted in earlier batches")
+
+        for chunk in self._chunks(pending):
+            batch = self.client.messages.batches.create(requests=chunk)
+            self.state["batches"].append({
+                "id": batch.id,
+                "custom_ids": [request["custom_id"] for request in chunk],
+                "submitted_at": datetime.utcnow().isoformat(),
+                "collected": False,
+            })
+            # Save before anything else can fail so the batch is never submitted twice
+            self._save_state()
+            print(f"📤 Submitted batch {batch.id} with {len(chunk)} requests")
+
+    def wait_and_collect(self, on_result, on_collected=None):
+        """Poll open batches and stream each ended batch's results into on_result(custom_id, result).
+
+        on_collected(batch_id) runs after a batch's last result and before the
+        batch is marked collected, so callers can make its results durable
+        first (a batch marked collected is never fetched again).
+        Returns a dict of result counts by type.
+        """
+        counts = {}
+        while True:
+            open_batches = [batch for batch in self.state["batches"] if not batch["collected"]]
+            if not open_batches:
+                return counts
+
+            for batch in open_batches:
+                status = self.client.messages.batches.retrieve(batch["id"])
+                if status.processing_status != "ended":
+                    request_counts = getattr(status, "request_counts", None)
+                    processing = getattr(request_counts, "processing", "?")
+                    print(f"⏳ Batch {batch['id']}: {status.processing_status}, {processing} processing")
+                    continue
+
+                print(f"📥 Collecting batch {batch['id']}")
+                for entry in self.client.messages.batches.results(batch["id"]):
+                    counts[entry.result.type] = counts.get(entry.result.type, 0) + 1
+                    on_result(entry.custom_id, entry.result)
+                if on_collected:
+                    on_collected(batch["id"])
+                # Results are written idempotently by the callback, so a crash here just re-collects
+                batch["collected"] = True
+                batch["collected_at"] = datetime.utcnow().isoformat()
+                self._save_state()
+
+            if any(not batch["collected"] for batch in self.state["batches"]):
+                time.sleep(self.poll_seconds)
+
+    def run(self, requests, on_result, on_collected=None):
+        self.submit(requests)
+        return self.wait_and_collect(on_result, on_collected)
+
+# ---------- Local stand-in ----------
+
+class LocalBatches:
+    """On-disk imitation of client.messages.batches: create / retrieve / results"""
+
+    def __init__(self, root, respond, latency):
+        self.root = root
+        self.respond = respond
+        self.latency = latency
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, batch_id):
+        return os.path.join(self.root, f"{batch_id}.json")
+
+    def create(self, requests):
+        batch_id = f"msgbatch_local_{uuid.uuid4().hex[:12]}"
+        with open(self._path(batch_id), "w") as f:
+            json.dump({"requests": requests, "created": time.time()}, f)
+        return SimpleNamespace(id=batch_id, processing_status="in_progress")
+
+    def retrieve(self, batch_id):
+        with open(self._path(batch_id), "r") as f:
+            batch = json.load(f)
+        ended = time.time() - batch["created"] >= self.latency
+        total = len(batch["requests"])
+        return SimpleNamespace(
+            id=batch_id,
+            processing_status="ended" if ended else "in_progress",
+            request_counts=SimpleNamespace(processing=0 if ended else total, succeeded=total if ended else 0),
+        )
+
+    def results(self, batch_id):
+        with open(self._path(batch_id), "r") as f:
+            batch = json.load(f)
+        for request in batch["requests"]:
+            try:
+                text = self.respond(request["params"])
+            except Exception as e:
+                result = SimpleNamespace(type="errored", error=SimpleNamespace(message=str(e)))
+            else:
+                message = SimpleNamespace(
+                    content=[SimpleNamespace(type="text", text=text)],
+                    stop_reason="end_turn",
+                    usage=SimpleNamespace(input_tokens=0, output_tokens=0),
+                )
+                result = SimpleNamespace(type="succeeded", message=message)
+            yield SimpleNamespace(custom_id=request["custom_id"], result=result)
+
+class LocalBatchClient:
+    """Drop-in for an Anthropic client in MessageBatchRunner; `respond(params)` returns response text"""
+
+    def __init__(self, respond, root=os.path.join("cache", "local_batches"), latency=0.0):
+        self.messages = SimpleNamespace(batches=LocalBatches(root, respond, latency))
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Incremental runner for the dataset cleaning chain.
+
+    clean -> standardize -> production -> major -> finance -> tech -> csv, columnar, audit
+
+Each stage declares its inputs (files or upstream stages) and the modules
+whose code it runs. A stage's key is a hash of its input contents plus that
+code; when the key matches the one saved in the state file the stage is
+skipped and its pickled result is reused. Stages pass data to each other as
+pickles in cache/pipeline/ instead of pretty-printed JSON, and an upstream
+stage that reruns but produces identical output does not invalidate the
+stages after it.
+
+Usage:
+    python pipeline.py                 # run whatever is out of date
+    python pipeline.py --force standardize
+    python pipeline.py --until production --export
+"""
+
+import os
+import sys
+import json
+import pickle
+import hashlib
+import argparse
+import importlib.util
+
+DATA_DIR = "data"
+PIPELINE_DIR = os.path.join("cache", "pipeline")
+STATE_PATH = os.path.join(PIPELINE_DIR, "state.json")
+# Process pool size for the audit stage (audit_engine's own default)
+AUDIT_WORKERS = int(os.getenv("AUDIT_WORKERS", str(os.cpu_count() or 1)))
+
+def hash_file(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def module_hash(name):
+    """Hash of a module's source file, so editing a script reruns its stages"""
+    return hash_file(importlib.util.find_spec(name).origin)
+
+class Stage:
+    """One step of the pipeline: fn(*inputs) -> result"""
+
+    def __init__(self, name, fn, inputs, modules, export=None):
+        self.name = name
+        self.fn = fn
+        self.inputs = inputs  # upstream stage names, or ("file", path)
+        self.modules = modules
+        self.export = export  # legacy JSON file name written by --export
+
+    @property
+    def result_path(self):
+        return os.path.join(PIPELINE_DIR, f"{self.name}.pkl")
+
+# ---------- Stage functions ----------
+
+def run_clean(*raw_paths):
+    from clean_companies_v2 import load_raw_companies, clean_raw_companies
+    return clean_raw_companies(load_raw_companies(*raw_paths))
+
+def run_standardize(companies):
+    from standardize_companies import standardize
+    return standardize(companies)
+
+def run_production(companies):
+    from final_production_clean import apply_production_fixes, validate_final_quality
+    companies = apply_production_fixes(companies)
+    validate_final_quality(companies)
+    return companies
+
+def run_major(companies):
+    from add_major_companies import create_major_companies_data
+    return companies + create_major_companies_data()
+
+def run_finance(companies):
+    from add_missing_finance_consulting import missing_firms
+    return companies + missing_firms()
+
+def run_tech(companies):
+    from add_major_tech_companies import all_tech_companies
+    return companies + all_tech_companies()
+
+def run_csv(companies):
+    from convert_to_csv import convert_companies_to_csv
+    return list(convert_companies_to_csv(companies, DATA_DIR))
+
+def run_columnar(companies):
+    from export_columnar import export_columnar
+    return list(export_columnar(companies, DATA_DIR))
+
+def run_audit(companies):
+    from audit_engine import run_audit, write_report, format_report
+    report = run_audit(companies, workers=AUDIT_WORKERS)
+    write_report(report, os.path.join(DATA_DIR, "audit_report.json"))
+    print(format_report(report))
+    return report
+
+def raw_inputs():
+    """Every per-batch JSONL generation log, or the legacy file if there are none"""
+    from clean_companies_v2 import raw_log_paths
+    return [("file", path) for path in raw_log_paths(DATA_DIR)]
+
+STAGES = [
+    Stage("clean", run_clean, raw_inputs(),
+          ["clean_companies_v2", "legacy_json", "jsonl_io"], export="cleaned_companies.json"),
+    Stage("standardize", run_standardize, ["clean"],
+          ["standardize_companies"], export="standardized_companies.json"),
+    Stage("production", run_production, ["standardize"],
+          ["final_production_clean", "near_duplicates"], export="production_companies.json"),
+    Stage("major", run_major, ["production"],
+          ["add_major_companies"], export="enhanced_production_companies.json"),
+    Stage("finance", run_finance, ["major"],
+          ["add_missing_finance_consulting"], export="final_enhanced_companies.json"),
+    Stage("tech", run_tech, ["finance"],
+          ["add_major_tech_companies"], export="complete_companies_dataset.json"),
+    Stage("csv", run_csv, ["tech"], ["convert_to_csv"]),
+    Stage("columnar", run_columnar, ["tech"], ["export_columnar"]),
+    Stage("audit", run_audit, ["tech"], ["audit_engine", "audit_rules", "near_duplicates"]),
+]
+
+# ---------- Runner ----------
+
+def load_state():
+    if os.path.exists(STATE_PATH):
+        with open(STATE_PATH, "r") as f:
+            return json.load(f)
+    return {}
+
+def save_state(state):
+    tmp_path = STATE_PATH + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, STATE_PATH)
+
+def stage_key(stage, state):
+    """Hash of the stage's code and input contents; None if an input is missing"""
+    digest = hashlib.sha256(stage.name.encode())
+    for module in stage.modules:
+        digest.update(module_hash(module).encode())
+    for source in stage.inputs:
+        if isinstance(source, tuple):
+            path = source[1]
+            if not os.path.exists(path):
+                return None
+            digest.update(f"{path}:{hash_file(path)}".encode())
+        else:
+            upstream = state.get(source)
+            if not upstream:
+                return None
+            digest.update(upstream["output_hash"].encode())
+    return digest.hexdigest()
+
+def run_pipeline(stages=STAGES, force=(), until=None, export=False):
+    os.makedirs(PIPELINE_DIR, exist_ok=True)
+    state = load_state()
+    results = {}
+
+    def result_of(name):
+        # Skipped stages are only unpickled when something downstream needs them
+        if name not in results:
+            with open(os.path.join(PIPELINE_DIR, f"{name}.pkl"), "rb") as f:
+                results[name] = pickle.load(f)
+        return results[name]
+
+    for stage in stages:
+        key = stage_key(stage, state)
+        if key is None:
+            print(f"❌ {stage.name}: missing input {stage.inputs}")
+            return False
+
+        previous = state.get(stage.name, {})
+        if stage.name not in force and previous.get("key") == key and os.path.exists(stage.result_path):
+            print(f"⏭️  {stage.name}: up to date")
+        else:
+            print(f"\n▶️  {stage.name}")
+            args = [source[1] if isinstance(source, tuple) else result_of(source) for source in stage.inputs]
+            result = stage.fn(*args)
+
+            payload = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+            tmp_path = stage.result_path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(payload)
+            os.replace(tmp_path, stage.result_path)
+            results[stage.name] = result
+
+            output_hash = hashlib.sha256(payload).hexdigest()
+            changed = output_hash != previous.get("output_hash")
+            state[stage.name] = {"key": key, "output_hash": output_hash}
+            save_state(state)
+            print(f"✅ {stage.name}: {'updated' if changed else 'output unchanged'}")
+
+            if export and stage.export:
+                export_path = os.path.join(DATA_DIR, stage.export)
+                with open(export_path, "w", encoding="utf-8") as f:
+                    json.dump(result, f, ensure_ascii=False, separators=(",", ":"))
+                print(f"   Exported {export_path}")
+
+        if stage.name == until:
+            break
+
+    return True
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the dataset cleaning stages that are out of date")
+    parser.add_argument("--force", nargs="+", default=[], metavar="STAGE", help="rerun these stages even if unchanged")
+    parser.add_argument("--until", metavar="STAGE", help="stop after this stage")
+    parser.add_argument("--export", action="store_true", help="also write each rerun stage's JSON file to data/")
+    parser.add_argument("--list", action="store_true", help="show stages and whether they are up to date")
+    args = parser.parse_args()
+
+    names = [stage.name for stage in STAGES]
+    for name in args.force + ([args.until] if args.until else []):
+        if name not in names:
+            parser.error(f"unknown stage '{name}' (stages: {', '.join(names)})")
+
+    if args.list:
+        state = load_state()
+        for stage in STAGES:
+            key = stage_key(stage, state)
+            current = key is not None and state.get(stage.name, {}).get("key") == key
+            print(f"  {stage.name:<12} {'up to date' if current else 'needs run'}")
+        return
+
+    sys.exit(0 if run_pipeline(force=set(args.force), until=args.until, export=args.export) else 1)
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,7 @@
 import json
 import re
 import collections
-from difflib import SequenceMatcher
+from near_duplicates import find_similar_pairs
 
 def load_production_file():
     """Load and examine the production companies file"""
@@ -45,45 +45,30 @@ def check_remaining_duplicates(companies):
     # Check for high-similarity companies that might be the same
     high_similarity_pairs = []
     
-    for i, company1 in enumerate(companies):
-        name1 = company1.get('company_name', '')
+    # Only pairs sharing a blocking key are scored (see near_duplicates.py)
+    for pair in find_similar_pairs(companies, min_similarity=0.8):
+        name1, name2 = pair['name1'], pair['name2']
+        similarity = pair['similarity']
+        desc_similarity = pair['desc_similarity']
         
-        for j, company2 in enumerate(companies[i+1:], i+1):
-            name2 = company2.get('company_name', '')
-            
-            if name1 and name2:
-                # Calculate similarity
-                similarity = SequenceMatcher(None, name1.lower(), name2.lower()).ratio()
-                
-                # Flag potential issues
-                if similarity > 0.8:
-                    # Additional checks
-                    same_industry = company1.get('industry', '') == company2.get('industry', '')
-                    same_stage = company1.get('company_stage', '') == company2.get('company_stage', '')
-                    
-                    # Check if descriptions are similar
-                    about1 = company1.get('about', '').lower()
-                    about2 = company2.get('about', '').lower()
-                    desc_similarity = SequenceMatcher(None, about1, about2).ratio()
-                    
-                    confidence_score = similarity
-                    if same_industry:
-                        confidence_score += 0.1
-                    if same_stage:
-                        confidence_score += 0.05
-                    if desc_similarity > 0.7:
-                        confidence_score += 0.15
-                    
-                    if confidence_score > 0.85:
-                        high_similarity_pairs.append({
-                            'name1': name1,
-                            'name2': name2,
-                            'similarity': similarity,
-                            'confidence': confidence_score,
-                            'same_industry': same_industry,
-                            'desc_similarity': desc_similarity
-                        })
-                        issues.append(f"HIGH SIMILARITY: '{name1}' <-> '{name2}' (confidence: {confidence_score:.2f})")
+        confidence_score = similarity
+        if pair['same_industry']:
+            confidence_score += 0.1
+        if pair['same_stage']:
+            confidence_score += 0.05
+        if desc_similarity > 0.7:
+            confidence_score += 0.15
+        
+        if confidence_score > 0.85:
+            high_similarity_pairs.append({
+                'name1': name1,
+                'name2': name2,
+                'similarity': similarity,
+                'confidence': confidence_score,
+                'same_industry': pair['same_industry'],
+                'desc_similarity': desc_similarity
+            })
+            issues.append(f"HIGH SIMILARITY: '{name1}' <-> '{name2}' (confidence: {confidence_score:.2f})")
     
     print(f"High-similarity pairs: {len(high_similarity_pairs)}")
     
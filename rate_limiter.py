@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Adaptive token-bucket rate limiter shared by every script that calls Claude.
+
+Tracks requests per minute and tokens per minute as two token buckets. When the
+API answers with a 429 / overloaded error the effective rate is cut, and after a
+run of clean responses it climbs back toward the configured ceiling.
+"""
+
+import os
+import time
+import random
+import asyncio
+import threading
+
+# Default ceilings, override per account tier via environment
+DEFAULT_RPM = int(os.getenv("ANTHROPIC_RPM", "50"))
+DEFAULT_TPM = int(os.getenv("ANTHROPIC_TPM", "40000"))
+
+def is_rate_limit_error(error):
+    """True for 429 rate limit and 529 / overloaded responses"""
+    status = getattr(error, "status_code", None)
+    if status in (429, 529):
+        return True
+    message = str(error).lower()
+    return "rate_limit" in message or "rate limit" in message or "overloaded" in message
+
+def retry_after_seconds(error):
+    """Read the retry-after header from an API error, if there is one"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+def estimate_tokens(messages, max_tokens=0, system=None):
+    """Rough token estimate for a request (about 4 characters per token)"""
+    chars = len(str(system or ""))
+    for message in messages:
+        content = message.get("content", "")
+        chars += len(content) if isinstance(content, str) else len(str(content))
+    return chars // 4 + max_tokens
+
+class RateLimiter:
+    """Token buckets for requests/minute and tokens/minute with adaptive backoff"""
+
+    def __init__(self, requests_per_minute=DEFAULT_RPM, tokens_per_minute=DEFAULT_TPM,
+                 min_scale=0.1, backoff_factor=0.5, recovery_factor=1.25, recovery_after=10):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.min_scale = min_scale
+        self.backoff_factor = backoff_factor
+        self.recovery_factor = recovery_factor
+        self.recovery_after = recovery_after
+
+        # Fraction of the configured ceiling we currently allow ourselves
+        self.scale = 1.0
+        self.successes_since_error = 0
+        self.blocked_until = 0.0
+
+        self.request_tokens = float(requests_per_minute)
+        self.token_tokens = float(tokens_per_minute)
+        self.last_refill = time.monotonic()
+        self.lock = threading.Lock()
+
+        self.stats = {"requests": 0, "rate_limited": 0, "waited_seconds": 0.0}
+
+    def _refill(self, now):
+        elapsed = now - self.last_refill
+        self.last_refill = now
+        rpm = self.requests_per_minute * self.scale
+        tpm = self.tokens_per_minute * self.scale
+        self.request_tokens = min(rpm, self.request_tokens + elapsed * rpm / 60.0)
+        self.token_tokens = min(tpm, self.token_tokens + elapsed * tpm / 60.0)
+
+    def _reserve(self, tokens):
+        """Take capacity for one request, or return how long to wait before retrying"""
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+
+            if now < self.blocked_until:
+                return self.blocked_until - now
+
+            # A single request larger than the whole bucket still has to go through
+            tokens = min(tokens, self.tokens_per_minute * self.scale)
+            if self.request_tokens >= 1 and self.token_tokens >= tokens:
+                self.request_tokens -= 1
+                self.token_tokens -= tokens
+                self.stats["requests"] += 1
+                return 0.0
+
+            rpm = self.requests_per_minute * self.scale
+            tpm = self.tokens_per_minute * self.scale
+            wait_requests = max(0.0, (1 - self.request_tokens) * 60.0 / rpm)
+            wait_tokens = max(0.0, (tokens - self.token_tokens) * 60.0 / tpm)
+            return max(wait_requests, wait_tokens, 0.01)
+
+    def acquire(self, tokens=1000):
+        """Block until a request of roughly `tokens` tokens may be sent"""
+        while True:
+            wait = self._reserve(tokens)
+            if wait <= 0:
+                return
+            self.stats["waited_seconds"] += wait
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens=1000):
+        """Async counterpart of acquire()"""
+        while True:
+            wait = self._reserve(tokens)
+            if wait <= 0:
+                return
+            self.stats["waited_seconds"] += wait
+            await asyncio.sleep(wait)
+
+    def record_usage(self, estimated_tokens, actual_tokens):
+        """Reconcile the bucket once the real token usage is known"""
+        with self.lock:
+            self.token_tokens += estimated_tokens - actual_tokens
+
+    def record_success(self):
+        with self.lock:
+            self.successes_since_error += 1
+            if self.scale < 1.0 and self.successes_since_error >= self.recovery_after:
+                self.scale = min(1.0, self.scale * self.recovery_factor)
+                self.successes_since_error = 0
+
+    def record_rate_limit(self, error=None):
+        """Slow down after a 429 / overloaded response"""
+        with self.lock:
+            self.stats["rate_limited"] += 1
+            self.successes_since_error = 0
+            self.scale = max(self.min_scale, self.scale * self.backoff_factor)
+            # Drain the buckets so the reduced rate takes effect immediately
+            self.request_tokens = min(self.request_tokens, 0.0)
+            self.token_tokens = min(self.token_tokens, 0.0)
+            pause = retry_after_seconds(error) if error is not None else None
+            if pause:
+                self.blocked_until = max(self.blocked_until, time.monotonic() + pause)
+
+    def _backoff(self, attempt):
+        return min(60.0, 2 ** attempt) + random.uniform(0, 1)
+
+    def create_message(self, client, retries=5, **kwargs):
+        """client.messages.create() throttled by this limiter, retrying on 429s"""
+        estimated = estimate_tokens(kwargs.get("messages", []), kwargs.get("max_tokens", 0), kwargs.get("system"))
+        for attempt in range(retries):
+            self.acquire(estimated)
+            try:
+                response = client.messages.create(**kwargs)
+            except Exception as e:
+                if is_rate_limit_error(e) and attempt < retries - 1:
+                    self.record_rate_limit(e)
+                    print(f"⏳ Rate limited, slowing to {self.scale:.0%} of ceiling")
+                    time.sleep(self._backoff(attempt))
+                    continue
+                raise
+            self._record_response(response, estimated)
+            return response
+
+    async def acreate_message(self, client, retries=5, **kwargs):
+        """Async counterpart of create_message() for the AsyncAnthropic client"""
+        estimated = estimate_tokens(kwargs.get("messages", []), kwargs.get("max_tokens", 0), kwargs.get("system"))
+        for attempt in range(retries):
+            await self.acquire_async(estimated)
+            try:
+                response = await client.messages.create(**kwargs)
+            except Exception as e:
+                if is_rate_limit_error(e) and attempt < retries - 1:
+                    self.record_rate_limit(e)
+                    print(f"⏳ Rate limited, slowing to {self.scale:.0%} of ceiling")
+                    await asyncio.sleep(self._backoff(attempt))
+                    continue
+                raise
+            self._record_response(response, estimated)
+            return response
+
+    def stream_message(self, client, retries=5, **kwargs):
+        """Yield text deltas from client.messages.stream(), throttled like create_message().
+
+        A rate-limited request is retried only if nothing has been yielded yet.
+        The generator returns the final message (usage, stop_reason), so callers
+        can get it with `response = yield from limiter.stream_message(...)`.
+        """
+        estimated = estimate_tokens(kwargs.get("messages", []), kwargs.get("max_tokens", 0), kwargs.get("system"))
+        for attempt in range(retries):
+            self.acquire(estimated)
+            started = False
+            try:
+                with client.messages.stream(**kwargs) as stream:
+                    for text in stream.text_stream:
+                        started = True
+                        yield text
+                    response = stream.get_final_message()
+            except Exception as e:
+                if not started and is_rate_limit_error(e) and attempt < retries - 1:
+                    self.record_rate_limit(e)
+                    print(f"⏳ Rate limited, slowing to {self.scale:.0%} of ceiling")
+                    time.sleep(self._backoff(attempt))
+                    continue
+                raise
+            self._record_response(response, estimated)
+            return response
+
+    def _record_response(self, response, estimated):
+        self.record_success()
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            actual = (getattr(usage, "input_tokens", 0) or 0) + (getattr(usage, "output_tokens", 0) or 0)
+            if actual:
+                self.record_usage(estimated, actual)
+
+# Process-wide limiter used by gpt(), generate_batch(), search_real_domain() and
+# generate_domains_with_ai()
+limiter = RateLimiter()
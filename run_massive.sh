@@ -2,6 +2,8 @@
 
 # Massive Scale Company Generation Script
 # Usage: ./run_massive.sh [num_batches] [industry_groups]
+#        ./run_massive.sh [concurrency] async   # one process, N requests in flight
+#        ./run_massive.sh [num_workers] workers # N processes sharing one work queue
 
 NUM_BATCHES=${1:-8}  # Default to 8 parallel batches
 INDUSTRY_MODE=${2:-"all"}  # Default to all industries
@@ -13,6 +15,13 @@ echo "🏭 Mode: $INDUSTRY_MODE"
 # Create logs directory
 mkdir -p logs
 
+# Async mode replaces the process fan-out with a single asyncio process
+if [ "$INDUSTRY_MODE" == "async" ]; then
+    echo "⚡ Running one async process with $NUM_BATCHES requests in flight"
+    BATCH_NUM=1 python main.py async "$NUM_BATCHES" 2>&1 | tee logs/batch_async.log
+    exit ${PIPESTATUS[0]}
+fi
+
 # Define industry groups for focused processing
 declare -A INDUSTRY_GROUPS
 INDUSTRY_GROUPS[1]="Finance,Investment & Private Markets"
@@ -31,7 +40,10 @@ run_batch() {
     
     echo "🔄 Starting batch $batch_num..."
     
-    if [ "$INDUSTRY_MODE" == "all" ]; then
+    if [ "$INDUSTRY_MODE" == "workers" ]; then
+        # Take sub-industries from the shared lease queue; no unit is generated twice
+        BATCH_NUM=$batch_num python main.py worker > logs/batch_${batch_num}.log 2>&1
+    elif [ "$INDUSTRY_MODE" == "all" ]; then
         # Run all industries for this batch
         BATCH_NUM=$batch_num python main.py > logs/batch_${batch_num}.log 2>&1
     else
@@ -70,15 +82,11 @@ echo ""
 # Function to show progress
 show_progress() {
     echo "📊 Current Progress:"
-    for ((i=1; i<=NUM_BATCHES; i++)); do
-        if [ -f "data/companies_batch${i}.db" ]; then
-            count=$(sqlite3 data/companies_batch${i}.db "SELECT COUNT(*) FROM companies;" 2>/dev/null || echo "0")
-            role_count=$(sqlite3 data/companies_batch${i}.db "SELECT COUNT(*) FROM roles;" 2>/dev/null || echo "0")
-            echo "  Batch $i: $count companies, $role_count roles"
-        else
-            echo "  Batch $i: Starting..."
-        fi
-    done
+    # One process, one query over every batch database (attached read-only)
+    python merge_batch_dbs.py progress "$NUM_BATCHES" 2>/dev/null
+    if [ "$INDUSTRY_MODE" == "workers" ]; then
+        python work_coordinator.py status 2>/dev/null
+    fi
     echo ""
 }
 
@@ -107,22 +115,16 @@ done
 # Final summary
 echo ""
 echo "🎯 Final Results:"
-total_companies=0
-total_roles=0
+python merge_batch_dbs.py progress "$NUM_BATCHES" 2>/dev/null
 
-for ((i=1; i<=NUM_BATCHES; i++)); do
-    if [ -f "data/companies_batch${i}.db" ]; then
-        count=$(sqlite3 data/companies_batch${i}.db "SELECT COUNT(*) FROM companies;" 2>/dev/null || echo "0")
-        role_count=$(sqlite3 data/companies_batch${i}.db "SELECT COUNT(*) FROM roles;" 2>/dev/null || echo "0")
-        echo "  Batch $i: $count companies, $role_count roles"
-        total_companies=$((total_companies + count))
-        total_roles=$((total_roles + role_count))
-    fi
-done
+# Deduplicate every batch into one indexed database
+echo ""
+python merge_batch_dbs.py
+read total_companies total_roles < <(python merge_batch_dbs.py count 2>/dev/null || echo "0 0")
 
 echo ""
-echo "🏆 TOTAL: $total_companies companies, $total_roles roles"
-echo "🗂️  Data stored in: data/companies_batch*.db"
+echo "🏆 TOTAL: $total_companies unique companies, $total_roles roles"
+echo "🗂️  Data stored in: data/companies_batch*.db (merged: data/companies_merged.db)"
 echo "🔍 Pinecone namespaces: dense-companies-claude-v8-batch*"
 echo ""
 
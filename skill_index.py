@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Interned skills / tags dictionaries and junction tables for the SQLite store.
+
+roles.required_skills, roles.nice_to_have_skills, companies.culture_tags and
+companies.tech_stack stay JSON text for compatibility, but every value is
+also interned once in a `skills` or `tags` dictionary (keyed by its
+lowercased, single-spaced form) and linked through:
+
+    role_skills(skill_id, kind, role_id)       kind: required | nice
+    company_tags(tag_id, kind, company_id)     kind: culture | tech
+
+Both junction tables are WITHOUT ROWID with the dictionary id leading the
+primary key, so they are inverted indexes: all roles requiring Python are
+one contiguous range of the b-tree. SqliteBatchWriter fills them in the
+same transaction as the rows; migrate() adds the tables to an existing
+database and backfills them from the JSON columns.
+
+Usage:
+    python skill_index.py migrate [db]
+    python skill_index.py query [db] [--skill S]... [--nice] [--tag T]... [--tech T]... [--limit N]
+    python skill_index.py top [db] [N]
+"""
+
+import os
+import sys
+import time
+
+SCHEMA_VERSION = 1
+DEFAULT_DB = os.path.join("data", "companies_merged.db")
+
+ROLE_SKILL_KINDS = {"required": "required_skills", "nice": "nice_to_have_skills"}
+COMPANY_TAG_KINDS = {"culture": "culture_tags", "tech": "tech_stack"}
+
+def tag_key(name):
+    """Dictionary key: case- and whitespace-insensitive"""
+    return " ".join(name.lower().split()) if isinstance(name, str) else ""
+
+def tag_names(value):
+    """Names from a list field; tolerates comma-separated strings from the model"""
+    if isinstance(value, str):
+        value = value.split(",")
+    if not isinstance(value, (list, tuple)):
+        return []
+    return [item.strip() for item in value if isinstance(item, str) and tag_key(item)]
+
+def create_tables(conn):
+    conn.create_function("tag_key", 1, tag_key, deterministic=True)
+    conn.executescript("""
+    CREATE TABLE IF NOT EXISTS skills (
+      id INTEGER PRIMARY KEY,
+      key TEXT UNIQUE,
+      name TEXT
+    );
+    CREATE TABLE IF NOT EXISTS tags (
+      id INTEGER PRIMARY KEY,
+      key TEXT UNIQUE,
+      name TEXT
+    );
+    CREATE TABLE IF NOT EXISTS role_skills (
+      skill_id INTEGER,
+      kind TEXT,
+      role_id TEXT,
+      PRIMARY KEY (skill_id, kind, role_id)
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS company_tags (
+      tag_id INTEGER,
+      kind TEXT,
+      company_id TEXT,
+      PRIMARY KEY (tag_id, kind, company_id)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS idx_role_skills_role_id ON role_skills(role_id);
+    CREATE INDEX IF NOT EXISTS idx_company_tags_company_id ON company_tags(company_id);
+    CREATE INDEX IF NOT EXISTS idx_roles_company_id ON roles(company_id);
+    """)
+
+def json_array(column):
+    # Rows written before validation can hold anything; json_each needs an array
+    return f"CASE WHEN json_valid({column}) AND json_type({column}) = 'array' THEN {column} ELSE '[]' END"
+
+def backfill(conn):
+    """Index every row's JSON columns; idempotent, so safe after bulk loads"""
+    conn.create_function("tag_key", 1, tag_key, deterministic=True)
+    specs = [("skills", "role_skills", "skill_id", "roles", "role_id", kind, column)
+             for kind, column in ROLE_SKILL_KINDS.items()]
+    specs += [("tags", "company_tags", "tag_id", "companies", "company_id", kind, column)
+              for kind, column in COMPANY_TAG_KINDS.items()]
+    with conn:
+        for dictionary, junction, dictionary_id, table, row_id, kind, column in specs:
+            source = f"{table} r, json_each({json_array('r.' + column)}) j"
+            where = "j.type = 'text' AND tag_key(j.value) != ''"
+            conn.execute(f"""
+            INSERT OR IGNORE INTO {dictionary} (key, name)
+            SELECT tag_key(j.value), trim(j.value) FROM {source} WHERE {where} ORDER BY r.rowid
+            """)
+            conn.execute(f"""
+            INSERT OR IGNORE INTO {junction} ({dictionary_id}, kind, {row_id})
+            SELECT d.id, '{kind}', r.id FROM {source} JOIN {dictionary} d ON d.key = tag_key(j.value)
+            WHERE {where}
+            """)
+
+def migrate(conn):
+    """Add the dictionary / junction tables and backfill them once"""
+    create_tables(conn)
+    if conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+        backfill(conn)
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+class TagIndexer:
+    """Interns names and writes junction rows; call write() inside the rows' transaction"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.ids = {"skills": {}, "tags": {}}
+
+    def intern(self, dictionary, names):
+        """{key: id} for names, inserting the keys that are not in the dictionary yet"""
+        cache = self.ids[dictionary]
+        missing = {}
+        for name in names:
+            key = tag_key(name)
+            if key not in cache:
+                missing.setdefault(key, name)
+        if missing:
+            self.conn.executemany(
+                f"INSERT OR IGNORE INTO {dictionary} (key, name) VALUES (?, ?)", missing.items()
+            )
+            keys = list(missing)
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ", ".join("?" * len(chunk))
+                cache.update(self.conn.execute(
+                    f"SELECT key, id FROM {dictionary} WHERE key IN ({placeholders})", chunk
+                ))
+        return cache
+
+    def write(self, role_skills, company_tags):
+        """role_skills: (role_id, kind, name); company_tags: (company_id, kind, name)"""
+        if role_skills:
+            ids = self.intern("skills", [name for _, _, name in role_skills])
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO role_skills (skill_id, kind, role_id) VALUES (?, ?, ?)",
+                [(ids[tag_key(name)], kind, role_id) for role_id, kind, name in role_skills]
+            )
+        if company_tags:
+            ids = self.intern("tags", [name for _, _, name in company_tags])
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO company_tags (tag_id, kind, company_id) VALUES (?, ?, ?)",
+                [(ids[tag_key(name)], kind, company_id) for company_id, kind, name in company_tags]
+            )
+
+    def forget(self):
+        """Drop cached ids after a rolled-back transaction (they may no longer exist)"""
+        self.ids = {"skills": {}, "tags": {}}
+
+def role_entries(role, role_id):
+    return [(role_id, kind, name) for kind, field in ROLE_SKILL_KINDS.items()
+            for name in tag_names(role.get(field))]
+
+def company_entries(company, company_id):
+    return [(company_id, kind, name) for kind, field in COMPANY_TAG_KINDS.items()
+            for name in tag_names(company.get(field))]
+
+# ---------- Queries ----------
+
+SKILL_ID = "(SELECT id FROM skills WHERE key = ?)"
+TAG_SET = "SELECT company_id FROM company_tags WHERE kind = ? AND tag_id = (SELECT id FROM tags WHERE key = ?)"
+
+def skill_kinds(include_nice):
+    return "('required', 'nice')" if include_nice else "('required')"
+
+def by_frequency(conn, skills, include_nice=False):
+    """Rarest skill first: it drives the query and the others are only probed"""
+    if len(skills) < 2:
+        return list(skills)
+    counts = {
+        skill: conn.execute(
+            f"SELECT COUNT(*) FROM role_skills WHERE skill_id = {SKILL_ID} AND kind IN {skill_kinds(include_nice)}",
+            (tag_key(skill),)
+        ).fetchone()[0]
+        for skill in skills
+    }
+    return sorted(skills, key=counts.get)
+
+def role_filter_sql(skills=(), tags=(), tech_stack=(), include_nice=False):
+    """`FROM ... WHERE ...` selecting roles r that match every filter, plus its params"""
+    kinds = skill_kinds(include_nice)
+    tag_params = [p for tag in tags for p in ("culture", tag_key(tag))]
+    tag_params += [p for tech in tech_stack for p in ("tech", tag_key(tech))]
+    company_filter = " INTERSECT ".join([TAG_SET] * (len(tags) + len(tech_stack)))
+
+    if skills:
+        # One inverted-index range for the first skill, primary-key probes for the rest
+        distinct = "DISTINCT " if include_nice else ""
+        sql = (f"(SELECT {distinct}role_id FROM role_skills WHERE skill_id = {SKILL_ID} AND kind IN {kinds}) m "
+               "JOIN roles r ON r.id = m.role_id WHERE 1")
+        params = [tag_key(skills[0])]
+        for skill in skills[1:]:
+            sql += (f" AND EXISTS (SELECT 1 FROM role_skills x WHERE x.skill_id = {SKILL_ID} "
+                    f"AND x.kind IN {kinds} AND x.role_id = m.role_id)")
+            params.append(tag_key(skill))
+        if company_filter:
+            sql += f" AND r.company_id IN ({company_filter})"
+            params += tag_params
+    elif company_filter:
+        sql = f"({company_filter}) m JOIN roles r ON r.company_id = m.company_id"
+        params = tag_params
+    else:
+        raise ValueError("At least one skill, tag or tech_stack filter is required")
+    return sql, params
+
+def find_roles(conn, skills=(), tags=(), tech_stack=(), include_nice=False, limit=100):
+    """Roles requiring all `skills` at companies with all `tags` (culture) and `tech_stack`"""
+    skills = by_frequency(conn, skills, include_nice)
+    sql, params = role_filter_sql(skills, tags, tech_stack, include_nice)
+    cursor = conn.execute(
+        f"SELECT r.id, r.title, r.company_name, r.seniority_level, r.location FROM {sql} LIMIT ?",
+        params + [limit]
+    )
+    columns = [column[0] for column in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor]
+
+def count_roles(conn, skills=(), tags=(), tech_stack=(), include_nice=False):
+    skills = by_frequency(conn, skills, include_nice)
+    sql, params = role_filter_sql(skills, tags, tech_stack, include_nice)
+    return conn.execute(f"SELECT COUNT(*) FROM {sql}", params).fetchone()[0]
+
+def top_skills(conn, limit=20, kind="required"):
+    return conn.execute("""
+    SELECT s.name, COUNT(*) AS roles FROM role_skills rs JOIN skills s ON s.id = rs.skill_id
+    WHERE rs.kind = ? GROUP BY rs.skill_id ORDER BY roles DESC LIMIT ?
+    """, (kind, limit)).fetchall()
+
+def option_values(args, flag):
+    return [args[i + 1] for i, arg in enumerate(args[:-1]) if arg == flag]
+
+def main():
+    import sqlite3
+
+    args = sys.argv[1:]
+    command = args[0] if args else "query"
+    db_path = next((arg for arg in args[1:] if arg.endswith(".db")), DEFAULT_DB)
+    conn = sqlite3.connect(db_path)
+
+    if command == "migrate":
+        start = time.time()
+        migrate(conn)
+        skills, tags = (conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t in ("skills", "tags"))
+        print(f"✅ {db_path}: {skills:,} skills, {tags:,} tags indexed ({time.time() - start:.1f}s)")
+    elif command == "top":
+        limit = int(args[-1]) if args[-1].isdigit() else 20
+        for name, count in top_skills(conn, limit):
+            print(f"  {count:>8,}  {name}")
+    elif command == "query":
+        limit = int(option_values(args, "--limit")[0]) if "--limit" in args else 20
+        filters = dict(
+            skills=option_values(args, "--skill"),
+            tags=option_values(args, "--tag"),
+            tech_stack=option_values(args, "--tech"),
+            include_nice="--nice" in args,
+        )
+        start = time.time()
+        total = count_roles(conn, **filters)
+        roles = find_roles(conn, limit=limit, **filters)
+        print(f"🔎 {total:,} matching roles ({(time.time() - start) * 1000:.1f} ms)")
+        for role in roles:
+            print(f"  {role['title']} @ {role['company_name']} ({role['seniority_level']}, {role['location']})")
+    else:
+        print(__doc__)
+    conn.close()
+
+if __name__ == "__main__":
+    main()
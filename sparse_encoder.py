@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Deterministic BM25 sparse encoder for the sparse / hybrid vector indexes.
+
+Every token maps to a stable 32-bit index (blake2b of the token, the same
+in every process and run, unlike the salted built-in hash()), which fits
+Pinecone's uint32 sparse indices with negligible collisions. The encoder is
+fitted on the corpus: document count, total length and a document-frequency
+table keyed by index, persisted as JSON so all workers and batches share it.
+Each sparse namespace keeps its own table (vocab_path(namespace)), tagged
+with a digest of the corpus it was fitted on; fit_if_changed() refits when
+an upsert runs over a different corpus, so document weights and query idf
+always come from the namespace's own statistics.
+
+Weights follow BM25 split across the two sides of the dot product:
+documents carry the saturated, length-normalized term frequency
+tf * (k1 + 1) / (tf + k1 * (1 - b + b * len / avg_len)), and queries carry
+the idf of each term, so a query . document score is the BM25 score.
+
+Usage:
+    python sparse_encoder.py fit <companies.json|.jsonl> ... (--namespace NS | --output path)
+    python sparse_encoder.py encode "query text" (--namespace NS | --output path) [--document]
+
+--namespace NS reads / writes vocab_path(NS), the table the upsert scripts
+use for that sparse namespace. A CLI fit records its corpus digest like
+fit_if_changed(); an upsert keeps the table only if its own role texts are
+identical, and refits it otherwise.
+"""
+
+import os
+import re
+import sys
+import json
+import math
+import hashlib
+from collections import Counter
+
+SPARSE_VOCAB_DIR = os.path.join("data", "sparse_vocab")
+K1 = 1.2
+B = 0.75
+# Pinecone accepts at most 1000 non-zero values per sparse vector
+MAX_TERMS = 1000
+
+TOKEN = re.compile(r"\b\w+\b")
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or that the their this to was were will with
+""".split())
+
+def tokenize(text):
+    return [token for token in TOKEN.findall(text.lower()) if token not in STOPWORDS]
+
+def stable_index(token):
+    """Process-independent 32-bit index of a token"""
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=4).digest(), "big")
+
+def vocab_path(namespace):
+    """Where the statistics of one sparse namespace are kept"""
+    return os.path.join(SPARSE_VOCAB_DIR, re.sub(r"[^\w.-]", "_", namespace) + ".json")
+
+def corpus_digest(texts):
+    digest = hashlib.blake2b(digest_size=16)
+    for text in texts:
+        digest.update(text.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+class SparseEncoder:
+    """BM25 document / query encoder over a persisted document-frequency table"""
+
+    def __init__(self, k1=K1, b=B, max_terms=MAX_TERMS):
+        self.k1 = k1
+        self.b = b
+        self.max_terms = max_terms
+        self.documents = 0
+        self.total_length = 0
+        self.df = Counter()
+        self.corpus = None
+        self._indices = {}
+        self._idf = None
+        self._idf_unseen = 0.0
+
+    @property
+    def fitted(self):
+        return self.documents > 0
+
+    @property
+    def average_length(self):
+        return self.total_length / self.documents if self.documents else 0.0
+
+    def term_counts(self, text):
+        """{index: term frequency}, token -> index lookups memoized"""
+        counts = Counter()
+        indices = self._indices
+        for token in tokenize(text):
+            index = indices.get(token)
+            if index is None:
+                index = indices[token] = stable_index(token)
+            counts[index] += 1
+        return counts
+
+    def fit(self, texts):
+        """Add a corpus to the statistics; can be called repeatedly (streaming)"""
+        for text in texts:
+            counts = self.term_counts(text)
+            self.documents += 1
+            self.total_length += sum(counts.values())
+            self.df.update(counts.keys())
+        self._idf = None
+        return self
+
+    def fit_if_changed(self, texts, path):
+        """Refit on `texts` and save to `path` unless already fitted on this exact corpus"""
+        texts = list(texts)
+        corpus = corpus_digest(texts)
+        if self.fitted and self.corpus == corpus:
+            return False
+        self.documents = 0
+        self.total_length = 0
+        self.df = Counter()
+        self.fit(texts)
+        self.corpus = corpus
+        self.save(path)
+        return True
+
+    def idf(self, index):
+        if self._idf is None:
+            # Precomputed once per fitted table; unseen terms get the maximum idf
+            n = self.documents
+            self._idf = {term: math.log(1 + (n - df + 0.5) / (df + 0.5)) for term, df in self.df.items()}
+            self._idf_unseen = math.log(1 + (n + 0.5) / 0.5)
+        return self._idf.get(index, self._idf_unseen)
+
+    def top(self, weights):
+        if len(weights) > self.max_terms:
+            weights = dict(sorted(weights.items(), key=lambda item: -item[1])[:self.max_terms])
+        indices = sorted(weights)
+        return {"indices": indices, "values": [weights[index] for index in indices]}
+
+    def encode_documents(self, texts):
+        """Sparse vectors ({"indices", "values"}) for many documents at once"""
+        k1, b = self.k1, self.b
+        average = self.average_length
+        vectors = []
+        for text in texts:
+            counts = self.term_counts(text)
+            length = sum(counts.values())
+            # Unfitted encoder: treat every document as average length
+            norm = k1 * (1 - b + b * length / average) if average else k1
+            vectors.append(self.top({index: tf * (k1 + 1) / (tf + norm) for index, tf in counts.items()}))
+        return vectors
+
+    def encode_queries(self, texts):
+        """Sparse vectors weighted by idf, normalized to sum to 1"""
+        vectors = []
+        for text in texts:
+            weights = {index: self.idf(index) for index in self.term_counts(text)}
+            total = sum(weights.values()) or 1.0
+            vectors.append(self.top({index: weight / total for index, weight in weights.items()}))
+        return vectors
+
+    def encode_document(self, text):
+        return self.encode_documents([text])[0]
+
+    def encode_query(self, text):
+        return self.encode_queries([text])[0]
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        state = {
+            "k1": self.k1,
+            "b": self.b,
+            "documents": self.documents,
+            "total_length": self.total_length,
+            "df": {str(index): count for index, count in self.df.items()},
+            "corpus": self.corpus,
+        }
+        temp_path = path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Fitted encoder from `path`, or an empty one if it does not exist yet"""
+        if not os.path.exists(path):
+            return cls()
+        with open(path) as f:
+            state = json.load(f)
+        encoder = cls(k1=state["k1"], b=state["b"])
+        encoder.documents = state["documents"]
+        encoder.total_length = state["total_length"]
+        encoder.df = Counter({int(index): count for index, count in state["df"].items()})
+        encoder.corpus = state.get("corpus")
+        return encoder
+
+def role_text(company, role):
+    """Same layout as build_embed_text in the upsert scripts, so fitted lengths match"""
+    fields = (
+        ("Company", company.get("company_name")), ("About", company.get("about")),
+        ("Title", role.get("title")), ("Department", role.get("department")),
+        ("Description", role.get("description")), ("Location", role.get("location")),
+        ("Industry", company.get("industry")), ("Size", company.get("size")),
+    )
+    return "\n".join(f"{label}: {value or ''}" for label, value in fields)
+
+def corpus_texts(companies, build_text=role_text):
+    """One text per role, skipping malformed companies (reported where they are processed)"""
+    for company in companies:
+        try:
+            yield from [build_text(company, role) for role in company["roles"]]
+        except (KeyError, TypeError):
+            continue
+
+def main():
+    args = sys.argv[1:]
+    command = args[0] if args else ""
+    options = ("--output", "--namespace")
+    if "--namespace" in args[:-1]:
+        output = vocab_path(args[args.index("--namespace") + 1])
+    elif "--output" in args[:-1]:
+        output = args[args.index("--output") + 1]
+    else:
+        output = None
+    values = [arg for i, arg in enumerate(args[1:], 1) if not arg.startswith("--") and args[i - 1] not in options]
+
+    if command == "fit" and values and output:
+        from export_columnar import iter_companies
+        texts = [
+            role_text(company, role)
+            for path in values
+            for company in iter_companies(path) if isinstance(company, dict)
+            for role in company.get("roles") or [] if isinstance(role, dict)
+        ]
+        encoder = SparseEncoder.load(output)
+        if not encoder.fit_if_changed(texts, output):
+            print(f"⏭️  {output} is already fitted on this corpus")
+        print(f"✅ {output}: {encoder.documents:,} documents, {len(encoder.df):,} terms, "
+              f"average length {encoder.average_length:.1f}")
+    elif command == "encode" and values and output:
+        encoder = SparseEncoder.load(output)
+        text = " ".join(values)
+        vector = encoder.encode_document(text) if "--document" in args else encoder.encode_query(text)
+        print(json.dumps(vector))
+    else:
+        print(__doc__)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Buffered SQLite writer for generated companies and roles.
+
+Rows are collected in memory and written with executemany inside a single
+transaction per sub-industry. Past `max_rows` buffered rows they are written
+into the still-open transaction to bound memory, but only commit() ends it
+and discard() rolls all of it back, so a unit is stored whole or not at all.
+The progress checkpoint for a unit is written in the same transaction as its
+rows, so the database can never claim a unit is done while its rows are
+missing. Skills and tags are interned into the skill_index junction tables
+in that same transaction, and fts_search triggers index the text as rows
+land.
+"""
+
+import json
+from datetime import datetime
+
+import fts_search
+from skill_index import TagIndexer, migrate, role_entries, company_entries
+
+COMPANY_COLUMNS = (
+    "id", "company_name", "about", "industry", "sub_industry", "company_stage", "size",
+    "culture_tags", "tech_stack", "source", "fetched_at"
+)
+
+ROLE_COLUMNS = (
+    "id", "company_id", "company_name", "title", "department", "seniority_level", "industry",
+    "sub_industry", "location", "description", "required_skills", "nice_to_have_skills",
+    "salary_min", "salary_max", "visa_sponsorship", "min_experience_years", "source", "fetched_at"
+)
+
+def insert_sql(table, columns):
+    placeholders = ", ".join("?" * len(columns))
+    return f"INSERT OR IGNORE INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+
+def configure_connection(conn):
+    """WAL journal + NORMAL sync: one fsync per checkpoint instead of per commit"""
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS progress (
+      key TEXT PRIMARY KEY,
+      status TEXT,
+      updated_at TEXT
+    )
+    """)
+    conn.commit()
+    # skills / tags dictionaries + junction tables (backfilled once for old rows)
+    migrate(conn)
+    # Full-text index kept in sync by triggers
+    fts_search.migrate(conn)
+
+def company_row(company, company_id, source="gpt"):
+    return (
+        company_id,
+        company["company_name"],
+        company["about"],
+        company["industry"],
+        company["sub_industry"],
+        company.get("company_stage", ""),
+        company.get("size", ""),
+        json.dumps(company.get("culture_tags", [])),
+        json.dumps(company.get("tech_stack", [])),
+        source,
+        datetime.utcnow().isoformat()
+    )
+
+def role_row(company, role, company_id, role_id, source="gpt"):
+    return (
+        role_id,
+        company_id,
+        company["company_name"],
+        role["title"],
+        role.get("department", ""),
+        role.get("seniority_level", ""),
+        company["industry"],
+        company["sub_industry"],
+        role["location"],
+        role["description"],
+        json.dumps(role["required_skills"]),
+        json.dumps(role["nice_to_have_skills"]),
+        role["salary_range"][0] if role["salary_range"] else 0,
+        role["salary_range"][1] if role["salary_range"] else 0,
+        role["visa_sponsorship"],
+        role["min_experience_years"],
+        source,
+        datetime.utcnow().isoformat()
+    )
+
+class SqliteBatchWriter:
+    """Collects company and role rows and writes them in one transaction"""
+
+    def __init__(self, conn, max_rows=5000):
+        self.conn = conn
+        self.max_rows = max_rows
+        self.companies = []
+        self.roles = []
+        self.role_skills = []
+        self.company_tags = []
+        self.company_ids = set()
+        self.written = {"companies": 0, "roles": 0}
+        self.stats = {"companies": 0, "roles": 0, "transactions": 0}
+        configure_connection(conn)
+        self.indexer = TagIndexer(conn)
+
+    def add(self, company, role, company_id, role_id):
+        """Buffer one role, and its company the first time the company is seen"""
+        if company_id not in self.company_ids:
+            self.company_ids.add(company_id)
+            self.companies.append(company_row(company, company_id))
+            self.company_tags.extend(company_entries(company, company_id))
+        self.roles.append(role_row(company, role, company_id, role_id))
+        self.role_skills.extend(role_entries(role, role_id))
+        if len(self.companies) + len(self.roles) >= self.max_rows:
+            # Into the open transaction; committed or rolled back with the rest of the unit
+            try:
+                self.write()
+            except BaseException:
+                self.discard()
+                raise
+
+    def write(self):
+        """Insert buffered rows without committing (sqlite3 opens the transaction)"""
+        if self.companies:
+            self.conn.executemany(insert_sql("companies", COMPANY_COLUMNS), self.companies)
+        if self.roles:
+            self.conn.executemany(insert_sql("roles", ROLE_COLUMNS), self.roles)
+        self.indexer.write(self.role_skills, self.company_tags)
+        self.written["companies"] += len(self.companies)
+        self.written["roles"] += len(self.roles)
+        self.companies = []
+        self.roles = []
+        self.role_skills = []
+        self.company_tags = []
+
+    def commit(self, progress_key=None, status="done"):
+        """Write buffered rows, and optionally a progress checkpoint, atomically"""
+        try:
+            with self.conn:
+                self.write()
+                if progress_key is not None:
+                    self.conn.execute(
+                        "INSERT OR REPLACE INTO progress (key, status, updated_at) VALUES (?, ?, ?)",
+                        (progress_key, status, datetime.utcnow().isoformat())
+                    )
+        except BaseException:
+            # The whole unit was rolled back, including rows written before max_rows
+            self.discard()
+            raise
+        self.stats["companies"] += self.written["companies"]
+        self.stats["roles"] += self.written["roles"]
+        self.stats["transactions"] += 1
+        self.reset()
+
+    def discard(self):
+        """Drop the unit's rows, buffered or written but uncommitted (e.g. a failed unit)"""
+        if self.conn.in_transaction:
+            self.conn.rollback()
+        # Dictionary ids interned in the rolled-back transaction are gone
+        self.indexer.forget()
+        self.reset()
+
+    def reset(self):
+        self.companies = []
+        self.roles = []
+        self.role_skills = []
+        self.company_tags = []
+        self.company_ids = set()
+        self.written = {"companies": 0, "roles": 0}
+
+    def load_progress(self):
+        rows = self.conn.execute("SELECT key, status FROM progress").fetchall()
+        return {key: status for key, status in rows}
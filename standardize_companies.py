@@ -1,61 +1,130 @@
+import os
 import json
 import re
 from collections import defaultdict
 from difflib import SequenceMatcher
+from functools import lru_cache
+
+DATA_DIR = "data"
 
 def load_companies(file_path):
     """Load companies from JSON file"""
     with open(file_path, 'r') as f:
         return json.load(f)
 
+# === Normalization tables, compiled once at import ===
+
+# Stage categories in priority order: the first category with a keyword anywhere in the value wins
+STAGE_KEYWORDS = [
+    ('Public', ['public', 'nyse', 'nasdaq', 'listed', 'traded']),
+    ('Private', ['private', 'subsidiary', 'division', 'owned']),
+    ('Startup', ['startup', 'early', 'seed', 'series']),
+    ('Non-Profit', ['non-profit', 'nonprofit', 'foundation', 'ngo']),
+    ('Government', ['government', 'agency', 'state-owned', 'crown']),
+    ('Established', ['established', 'mature']),
+    ('Growth', ['growth', 'growing']),
+]
+
+SIZE_KEYWORDS = [
+    ('Small (1-49)', ['small', 'startup']),
+    ('Medium (50-199)', ['medium']),
+    ('Large (200-999)', ['large']),
+    ('Enterprise (5,000+)', ['very large', 'enterprise']),
+]
+
+# (upper bound, bucket) for sizes that contain a number
+SIZE_BUCKETS = [
+    (50, 'Small (1-49)'),
+    (200, 'Medium (50-199)'),
+    (1000, 'Large (200-999)'),
+    (5000, 'Very Large (1,000-4,999)'),
+]
+
+LOCATION_MAPPINGS = {
+    'various locations': 'Multiple Locations',
+    'various global locations': 'Multiple Locations',
+    'multiple locations': 'Multiple Locations',
+    'multiple global locations': 'Multiple Locations',
+    'global': 'Multiple Locations',
+    'worldwide': 'Multiple Locations',
+    'remote': 'Remote',
+    'work from home': 'Remote',
+    'telecommute': 'Remote'
+}
+
+US_STATES = {
+    'ca': 'CA', 'california': 'CA',
+    'ny': 'NY', 'new york': 'NY',
+    'tx': 'TX', 'texas': 'TX',
+    'fl': 'FL', 'florida': 'FL',
+    'wa': 'WA', 'washington': 'WA',
+    'il': 'IL', 'illinois': 'IL',
+    'ma': 'MA', 'massachusetts': 'MA',
+    'pa': 'PA', 'pennsylvania': 'PA',
+    'oh': 'OH', 'ohio': 'OH',
+    'ga': 'GA', 'georgia': 'GA',
+    'nc': 'NC', 'north carolina': 'NC',
+    'va': 'VA', 'virginia': 'VA',
+    'co': 'CO', 'colorado': 'CO',
+    'az': 'AZ', 'arizona': 'AZ',
+    'or': 'OR', 'oregon': 'OR',
+    'ct': 'CT', 'connecticut': 'CT',
+    'nj': 'NJ', 'new jersey': 'NJ',
+    'md': 'MD', 'maryland': 'MD',
+    'mn': 'MN', 'minnesota': 'MN',
+    'wi': 'WI', 'wisconsin': 'WI',
+    'mo': 'MO', 'missouri': 'MO',
+    'tn': 'TN', 'tennessee': 'TN',
+    'in': 'IN', 'indiana': 'IN',
+    'mi': 'MI', 'michigan': 'MI',
+    'al': 'AL', 'alabama': 'AL',
+    'ar': 'AR', 'arkansas': 'AR'
+}
+US_STATE_CODES = set(US_STATES.values())
+
+COUNTRY_MAPPINGS = {
+    'Usa': 'USA',
+    'United States': 'USA',
+    'Us': 'USA',
+    'Uk': 'UK',
+    'United Kingdom': 'UK'
+}
+
+def compile_keywords(table):
+    """One regex finding every keyword of a (category, keywords) table, with each keyword's rank.
+
+    The match sits in a lookahead so overlapping keywords are all seen
+    ('state-owned' yields both 'state-owned' and 'owned').
+    """
+    rank = {}
+    for position, (category, keywords) in enumerate(table):
+        for keyword in keywords:
+            rank.setdefault(keyword, position)
+    alternatives = sorted(rank, key=lambda keyword: (rank[keyword], -len(keyword)))
+    pattern = re.compile('(?=(%s))' % '|'.join(re.escape(keyword) for keyword in alternatives))
+    return pattern, rank
+
+STAGE_PATTERN, STAGE_RANK = compile_keywords(STAGE_KEYWORDS)
+SIZE_PATTERN, SIZE_RANK = compile_keywords(SIZE_KEYWORDS)
+SIZE_NUMBER = re.compile(r'\d[\d,]*')
+
+def best_category(pattern, rank, text):
+    """Rank of the highest-priority category with a keyword in text, or None"""
+    ranks = [rank[match.group(1)] for match in pattern.finditer(text)]
+    return min(ranks) if ranks else None
+
+@lru_cache(maxsize=1 << 16)
 def standardize_company_stage(stage):
     """Standardize company stage to consistent values"""
     if not stage or stage.strip() == '':
         return 'Unknown'
     
-    stage_lower = stage.lower().strip()
-    
-    # Public companies (any mention of public, NYSE, NASDAQ, etc.)
-    if any(keyword in stage_lower for keyword in ['public', 'nyse', 'nasdaq', 'listed', 'traded']):
-        return 'Public'
-    
-    # Private companies
-    if any(keyword in stage_lower for keyword in ['private', 'subsidiary', 'division', 'owned']):
-        return 'Private'
-    
-    # Startups and early stage
-    if any(keyword in stage_lower for keyword in ['startup', 'early', 'seed', 'series']):
-        return 'Startup'
-    
-    # Non-profit organizations
-    if any(keyword in stage_lower for keyword in ['non-profit', 'nonprofit', 'foundation', 'ngo']):
-        return 'Non-Profit'
-    
-    # Government and agencies
-    if any(keyword in stage_lower for keyword in ['government', 'agency', 'state-owned', 'crown']):
-        return 'Government'
-    
-    # Established/Mature companies
-    if any(keyword in stage_lower for keyword in ['established', 'mature']):
-        return 'Established'
-    
-    # Growth stage
-    if any(keyword in stage_lower for keyword in ['growth', 'growing']):
-        return 'Growth'
-    
-    # Default based on common values
-    common_mappings = {
-        'public': 'Public',
-        'private': 'Private',
-        'startup': 'Startup',
-        'mature': 'Established',
-        'established': 'Established',
-        'growth': 'Growth',
-        'growing': 'Growth'
-    }
-    
-    return common_mappings.get(stage_lower, 'Private')
+    position = best_category(STAGE_PATTERN, STAGE_RANK, stage.lower().strip())
+    if position is not None:
+        return STAGE_KEYWORDS[position][0]
+    return 'Private'
 
+@lru_cache(maxsize=1 << 16)
 def standardize_company_size(size):
     """Standardize company size to consistent ranges"""
     if not size or size.strip() == '':
@@ -63,37 +132,25 @@ def standardize_company_size(size):
     
     size_str = size.lower().strip()
     
-    # Extract numbers from size string
-    numbers = re.findall(r'[\d,]+', size_str)
+    # Categorize by the largest number in the size string
+    numbers = SIZE_NUMBER.findall(size_str)
     if numbers:
-        # Convert to integers, handling commas
-        nums = [int(n.replace(',', '')) for n in numbers]
-        max_size = max(nums)
-        
-        # Categorize by size
-        if max_size < 50:
-            return 'Small (1-49)'
-        elif max_size < 200:
-            return 'Medium (50-199)'
-        elif max_size < 1000:
-            return 'Large (200-999)'
-        elif max_size < 5000:
-            return 'Very Large (1,000-4,999)'
-        else:
-            return 'Enterprise (5,000+)'
-    
-    # Handle text-based sizes
-    if any(keyword in size_str for keyword in ['small', 'startup']):
-        return 'Small (1-49)'
-    elif any(keyword in size_str for keyword in ['medium']):
-        return 'Medium (50-199)'
-    elif any(keyword in size_str for keyword in ['large']) and 'very' not in size_str:
-        return 'Large (200-999)'
-    elif any(keyword in size_str for keyword in ['very large', 'enterprise']):
+        max_size = max(int(n.replace(',', '')) for n in numbers)
+        for upper, bucket in SIZE_BUCKETS:
+            if max_size < upper:
+                return bucket
         return 'Enterprise (5,000+)'
     
+    # Handle text-based sizes; plain "large" does not count when "very" is present
+    ranks = {SIZE_RANK[match.group(1)] for match in SIZE_PATTERN.finditer(size_str)}
+    if 'very' in size_str:
+        ranks.discard(SIZE_RANK['large'])
+    if ranks:
+        return SIZE_KEYWORDS[min(ranks)][0]
+    
     return 'Unknown'
 
+@lru_cache(maxsize=1 << 18)
 def standardize_location(location):
     """Standardize location to consistent format"""
     if not location or location.strip() == '':
@@ -102,51 +159,9 @@ def standardize_location(location):
     location = location.strip()
     
     # Handle common variations
-    location_mappings = {
-        'various locations': 'Multiple Locations',
-        'various global locations': 'Multiple Locations',
-        'multiple locations': 'Multiple Locations',
-        'multiple global locations': 'Multiple Locations',
-        'global': 'Multiple Locations',
-        'worldwide': 'Multiple Locations',
-        'remote': 'Remote',
-        'work from home': 'Remote',
-        'telecommute': 'Remote'
-    }
-    
     location_lower = location.lower()
-    if location_lower in location_mappings:
-        return location_mappings[location_lower]
-    
-    # Standardize US state abbreviations
-    us_states = {
-        'ca': 'CA', 'california': 'CA',
-        'ny': 'NY', 'new york': 'NY',
-        'tx': 'TX', 'texas': 'TX',
-        'fl': 'FL', 'florida': 'FL',
-        'wa': 'WA', 'washington': 'WA',
-        'il': 'IL', 'illinois': 'IL',
-        'ma': 'MA', 'massachusetts': 'MA',
-        'pa': 'PA', 'pennsylvania': 'PA',
-        'oh': 'OH', 'ohio': 'OH',
-        'ga': 'GA', 'georgia': 'GA',
-        'nc': 'NC', 'north carolina': 'NC',
-        'va': 'VA', 'virginia': 'VA',
-        'co': 'CO', 'colorado': 'CO',
-        'az': 'AZ', 'arizona': 'AZ',
-        'or': 'OR', 'oregon': 'OR',
-        'ct': 'CT', 'connecticut': 'CT',
-        'nj': 'NJ', 'new jersey': 'NJ',
-        'md': 'MD', 'maryland': 'MD',
-        'mn': 'MN', 'minnesota': 'MN',
-        'wi': 'WI', 'wisconsin': 'WI',
-        'mo': 'MO', 'missouri': 'MO',
-        'tn': 'TN', 'tennessee': 'TN',
-        'in': 'IN', 'indiana': 'IN',
-        'mi': 'MI', 'michigan': 'MI',
-        'al': 'AL', 'alabama': 'AL',
-        'ar': 'AR', 'arkansas': 'AR'
-    }
+    if location_lower in LOCATION_MAPPINGS:
+        return LOCATION_MAPPINGS[location_lower]
     
     # Format: City, State or City, Country
     parts = [part.strip() for part in location.split(',')]
@@ -155,27 +170,34 @@ def standardize_location(location):
         state_or_country = parts[1].strip().lower()
         
         # Check if it's a US state
-        if state_or_country in us_states:
-            return f"{city}, {us_states[state_or_country]}"
-        elif len(state_or_country) == 2 and state_or_country.upper() in us_states.values():
+        if state_or_country in US_STATES:
+            return f"{city}, {US_STATES[state_or_country]}"
+        elif len(state_or_country) == 2 and state_or_country.upper() in US_STATE_CODES:
             return f"{city}, {state_or_country.upper()}"
         else:
-            # Capitalize country name
+            # Capitalize country name and handle common country variations
             country = state_or_country.title()
-            # Handle common country variations
-            country_mappings = {
-                'Usa': 'USA',
-                'United States': 'USA', 
-                'Us': 'USA',
-                'Uk': 'UK',
-                'United Kingdom': 'UK'
-            }
-            country = country_mappings.get(country, country)
+            country = COUNTRY_MAPPINGS.get(country, country)
             return f"{city}, {country}"
     
     # Single location (country or city)
     return location.title()
 
+def standardize_column(normalize, values):
+    """Apply a normalizer to a whole column, computing each distinct value once"""
+    values = list(values)
+    mapping = {value: normalize(value) for value in dict.fromkeys(values)}
+    return [mapping[value] for value in values]
+
+def standardize_stages(values):
+    return standardize_column(standardize_company_stage, values)
+
+def standardize_sizes(values):
+    return standardize_column(standardize_company_size, values)
+
+def standardize_locations(values):
+    return standardize_column(standardize_location, values)
+
 def fix_salary_range(salary_range):
     """Fix and validate salary ranges"""
     if not salary_range or not isinstance(salary_range, list) or len(salary_range) != 2:
@@ -299,18 +321,27 @@ def standardize_companies(companies):
         'culture_tags_added': 0
     }
     
-    for company in companies:
+    # Normalize whole columns up front; each distinct raw value is classified once
+    stages = standardize_stages(company.get('company_stage', '') for company in companies)
+    sizes = standardize_sizes(company.get('size', '') for company in companies)
+    locations = iter(standardize_locations(
+        role.get('location', '')
+        for company in companies if isinstance(company.get('roles'), list)
+        for role in company['roles']
+    ))
+    
+    for company, stage, size in zip(companies, stages, sizes):
         std_company = company.copy()
         
         # Standardize company stage
         original_stage = std_company.get('company_stage', '')
-        std_company['company_stage'] = standardize_company_stage(original_stage)
+        std_company['company_stage'] = stage
         if original_stage != std_company['company_stage']:
             fixes_applied['stages_fixed'] += 1
         
         # Standardize company size
         original_size = std_company.get('size', '')
-        std_company['size'] = standardize_company_size(original_size)
+        std_company['size'] = size
         if original_size != std_company['size']:
             fixes_applied['sizes_fixed'] += 1
         
@@ -344,7 +375,7 @@ def standardize_companies(companies):
             for role in std_company['roles']:
                 # Standardize location
                 original_location = role.get('location', '')
-                role['location'] = standardize_location(original_location)
+                role['location'] = next(locations)
                 if original_location != role['location']:
                     fixes_applied['locations_fixed'] += 1
                 
@@ -365,9 +396,19 @@ def standardize_companies(companies):
     
     return standardized, fixes_applied
 
+def standardize(companies):
+    """Resolve duplicates and standardize fields; returns the standardized list"""
+    companies = resolve_potential_duplicates(companies)
+    print(f"After duplicate resolution: {len(companies)} companies")
+    
+    standardized, fixes = standardize_companies(companies)
+    for fix_type, count in fixes.items():
+        print(f"  {fix_type.replace('_', ' ').title()}: {count}")
+    return standardized
+
 def main():
-    input_file = '/Users/georgemccain/Desktop/untitled folder 2/data/cleaned_companies.json'
-    output_file = '/Users/georgemccain/Desktop/untitled folder 2/data/standardized_companies.json'
+    input_file = os.path.join(DATA_DIR, 'cleaned_companies.json')
+    output_file = os.path.join(DATA_DIR, 'standardized_companies.json')
     
     print("=== COMPREHENSIVE DATA STANDARDIZATION ===")
     
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Bounded-memory combining of companies_batch_*.json files.
+
+Batch files are read one company at a time (legacy_json's streaming reader
+handles plain arrays as well as the older concatenated-array files; .jsonl
+inputs are read line by line). Duplicates are dropped against a set of
+64-bit name hashes, and every kept company is written to the output as soon
+as it is read, so memory depends on the number of distinct names rather
+than on the number or size of the batch files.
+
+With workers > 1, files are parsed in worker processes, a small window of
+files at a time and consumed in file order, so the output is identical to a
+sequential run.
+
+Usage:
+    python stream_combine.py companies_combined.jsonl "companies_batch_*.json" [--workers 4] [--keep-duplicates]
+"""
+
+import sys
+import glob
+import json
+import hashlib
+import argparse
+from itertools import islice
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+
+from jsonl_io import open_text, iter_jsonl, is_jsonl
+from legacy_json import iter_legacy_companies
+
+def name_hash(name):
+    """64-bit hash of a company name; a set of these is far smaller than a set of names"""
+    return int.from_bytes(hashlib.blake2b(name.encode("utf-8"), digest_size=8).digest(), "big")
+
+def iter_batch_file(path, errors=None):
+    """Yield the companies of one batch file (.json array or .jsonl)"""
+    if is_jsonl(path):
+        return iter_jsonl(path)
+    return iter_legacy_companies(path, errors)
+
+def read_batch_file(path):
+    """(companies, errors) of one file; runs in a worker process"""
+    errors = []
+    return list(iter_batch_file(path, errors)), errors
+
+def iter_batch_files(paths, workers=1, errors=None):
+    """Yield (file_number, path, company) for every company, in file order"""
+    if workers <= 1:
+        for number, path in enumerate(paths, 1):
+            file_errors = []
+            for company in iter_batch_file(path, file_errors):
+                yield number, path, company
+            if errors is not None:
+                errors.extend({"file": path, **error} for error in file_errors)
+        return
+
+    files = enumerate(paths, 1)
+    with ProcessPoolExecutor(workers) as pool:
+        # Only a couple of parsed files per worker are held at once
+        window = deque((number, path, pool.submit(read_batch_file, path))
+                       for number, path in islice(files, workers * 2))
+        while window:
+            number, path, future = window.popleft()
+            for next_number, next_path in islice(files, 1):
+                window.append((next_number, next_path, pool.submit(read_batch_file, next_path)))
+            companies, file_errors = future.result()
+            for company in companies:
+                yield number, path, company
+            if errors is not None:
+                errors.extend({"file": path, **error} for error in file_errors)
+
+class CompanyWriter:
+    """Writes companies one at a time: JSONL for .jsonl[.gz|.zst], otherwise a JSON array"""
+
+    def __init__(self, path):
+        self.path = path
+        self.array = not is_jsonl(path)
+        self.f = open_text(path, "w")
+        self.count = 0
+        if self.array:
+            self.f.write("[")
+
+    def write(self, company):
+        text = json.dumps(company, ensure_ascii=False)
+        if self.array:
+            # One company per line keeps the file valid JSON for json.load() readers
+            self.f.write(",\n" if self.count else "\n")
+            self.f.write(text)
+        else:
+            self.f.write(text + "\n")
+        self.count += 1
+
+    def close(self):
+        if self.array:
+            self.f.write("\n]\n")
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def combine_batches(paths, output_path, dedupe=True, tag_batch=False, workers=1, on_file=None):
+    """Stream every company of `paths` into output_path; returns summary statistics.
+
+    dedupe keeps the first company per stripped name (companies without a
+    name are dropped); tag_batch adds batch_file / batch_number to each
+    company. on_file(number, path) is called when a file is reached.
+    """
+    seen = set()
+    duplicates = Counter()
+    industries, stages, sizes = set(), set(), Counter()
+    errors = []
+    stats = {"files": len(paths), "read": 0, "written": 0, "duplicates": 0, "roles": 0}
+    current = None
+
+    with CompanyWriter(output_path) as writer:
+        for number, path, company in iter_batch_files(paths, workers, errors):
+            if number != current:
+                current = number
+                if on_file:
+                    on_file(number, path)
+            if not isinstance(company, dict):
+                continue
+            stats["read"] += 1
+
+            if dedupe:
+                name = (company.get("company_name") or "").strip()
+                key = name_hash(name)
+                if not name or key in seen:
+                    duplicates[name] += 1
+                    stats["duplicates"] += 1
+                    continue
+                seen.add(key)
+
+            if tag_batch:
+                company["batch_file"] = path
+                company["batch_number"] = number
+            writer.write(company)
+            stats["written"] += 1
+            stats["roles"] += len(company.get("roles") or [])
+            if company.get("industry"):
+                industries.add(company["industry"])
+            stages.add(company.get("company_stage", "Unknown"))
+            sizes[company.get("size", "Unknown")] += 1
+
+    stats.update({
+        "industries": sorted(industries),
+        "company_stages": sorted(stages, key=str),
+        "size_distribution": dict(sizes),
+        "top_duplicates": duplicates.most_common(10),
+        "errors": errors,
+    })
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Combine batch files with bounded memory")
+    parser.add_argument("output", help="Output file (.jsonl, .jsonl.gz, .jsonl.zst or .json)")
+    parser.add_argument("patterns", nargs="*", default=["companies_batch_*.json"], help="Batch file globs")
+    parser.add_argument("--workers", type=int, default=1, help="Parse files in this many processes")
+    parser.add_argument("--keep-duplicates", action="store_true", help="Do not deduplicate by name")
+    args = parser.parse_args()
+
+    paths = sorted({path for pattern in args.patterns for path in glob.glob(pattern)})
+    if not paths:
+        print("❌ No batch files found!")
+        sys.exit(1)
+
+    stats = combine_batches(paths, args.output, dedupe=not args.keep_duplicates, workers=args.workers,
+                            on_file=lambda number, path: print(f"📂 {path} ({number}/{len(paths)})"))
+    print(f"✅ {stats['written']:,} of {stats['read']:,} companies written to {args.output} "
+          f"({stats['duplicates']:,} duplicates, {stats['roles']:,} roles, {len(stats['errors'])} parse errors)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Incremental parser for a JSON array of objects arriving in pieces.
+
+Feed it the text of a streamed Claude response as it comes in; every element
+object of the first array is returned as soon as its closing brace arrives.
+Leading prose and ```json fences are skipped, and an array wrapped in an
+object ({"companies": [...]}, or any `wrapper_key`) is handled the same
+way; the wrapper's own fields before the array are available from wrapper().
+Only the text of the element currently being read is kept in memory. If the
+stream stops early, the elements completed before the cut have already been
+handed out and `complete` stays False.
+"""
+
+import re
+import json
+
+class JsonArrayStreamParser:
+    """Yields each element object of a streamed JSON array once it is complete"""
+
+    def __init__(self, wrapper_key="companies"):
+        self.wrapper_key = wrapper_key
+        self.wrapper_pattern = re.compile(r',?\s*"%s"\s*:\s*$' % re.escape(wrapper_key))
+        self.wrapper_text = None  # wrapper object text up to its array
+        self.stack = []          # open containers: '[' or '{'
+        self.array_depth = None  # stack depth of the first array once it opens
+        self.in_string = False
+        self.escaped = False
+        self.buffer = ""         # text of the element (or top-level object) being read
+        self.capturing = False
+        self.complete = False
+        self.elements = 0
+        self.errors = []
+
+    def feed(self, text):
+        """Consume more response text; returns the elements completed by it"""
+        completed = []
+        if self.complete:
+            return completed
+
+        start = 0 if self.capturing else None
+        for i, char in enumerate(text):
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+                continue
+
+            if not self.stack and char not in "[{":
+                continue  # prose or code fence before the JSON starts
+
+            if char == '"':
+                self.in_string = True
+            elif char in "[{":
+                self.stack.append(char)
+                if char == "[" and self.array_depth is None and self._is_element_array(text, start, i):
+                    self.array_depth = len(self.stack)
+                    # Inside a wrapper object: stop capturing the wrapper itself
+                    self.buffer, self.capturing, start = "", False, None
+                elif char == "{" and (len(self.stack) - 1 == self.array_depth or len(self.stack) == 1):
+                    # An array element, or the top-level object before any array opened
+                    self.capturing = True
+                    start = i
+            elif char in "]}":
+                if not self.stack:
+                    continue
+                self.stack.pop()
+                if self.capturing and char == "}" and (len(self.stack) == self.array_depth or not self.stack):
+                    self.buffer += text[start:i + 1]
+                    self._emit(completed)
+                    start = None
+                if char == "]" and self.array_depth is not None and len(self.stack) == self.array_depth - 1:
+                    self.complete = True
+                    break
+                if not self.stack:
+                    self.complete = True
+                    break
+
+        if self.capturing and start is not None:
+            self.buffer += text[start:]
+        return completed
+
+    def _is_element_array(self, text, start, i):
+        """The top-level array, or the `wrapper_key` array of a top-level object"""
+        if len(self.stack) == 1:
+            return True
+        if len(self.stack) != 2 or not self.capturing:
+            return False
+        prefix = self.buffer + text[start:i]
+        if self.wrapper_pattern.search(prefix) is None:
+            return False
+        self.wrapper_text = prefix
+        return True
+
+    def wrapper(self):
+        """Fields of the wrapper object that came before its array ({} if none)"""
+        if not self.wrapper_text:
+            return {}
+        try:
+            return json.loads(self.wrapper_pattern.sub("", self.wrapper_text) + "}")
+        except json.JSONDecodeError:
+            return {}
+
+    def _emit(self, completed):
+        text, self.buffer, self.capturing = self.buffer, "", False
+        try:
+            obj = json.loads(text)
+        except json.JSONDecodeError as e:
+            self.errors.append(f"{e.msg} in element {self.elements + 1}")
+            return
+        if self.array_depth is None and isinstance(obj, dict) and "company_name" not in obj:
+            self.errors.append(f"Top-level object without companies: {list(obj)[:5]}")
+            return
+        self.elements += 1
+        completed.append(obj)
+
+    def close(self):
+        """Finish the stream; returns True if the array was closed properly"""
+        if not self.complete:
+            self.errors.append(f"Stream ended after {self.elements} complete elements")
+        self.buffer, self.capturing = "", False
+        return self.complete
+
+def salvage_array(text, wrapper_key="companies"):
+    """Parse a complete or truncated response in one go.
+
+    Returns (elements, complete, wrapper): every element object that was fully
+    received, whether the array was closed, and the wrapper object's leading
+    fields (see JsonArrayStreamParser.wrapper).
+    """
+    parser = JsonArrayStreamParser(wrapper_key)
+    elements = parser.feed(text)
+    complete = parser.close()
+    return elements, complete, parser.wrapper()
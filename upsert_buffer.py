@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Buffered, batched upserts for Pinecone-style index clients.
+
+Vectors are collected per namespace and sent as multi-vector upserts once a
+chunk reaches the vector-count or byte-size limit, with a bounded number of
+flushes in flight. Anything left in the buffer is sent on flush()/close(), and
+close() is registered with atexit so a normal shutdown never drops vectors.
+
+FakeIndex records every upsert call locally; `python upsert_buffer.py check`
+runs the count / byte chunking, parallel flushes, final flush and error
+reporting against it.
+"""
+
+import os
+import sys
+import json
+import time
+import atexit
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+# Pinecone accepts up to 1000 vectors / 2MB per upsert request
+DEFAULT_BATCH_SIZE = int(os.getenv("UPSERT_BATCH_SIZE", "100"))
+DEFAULT_MAX_BYTES = int(os.getenv("UPSERT_MAX_BYTES", str(2 * 1024 * 1024 - 64 * 1024)))
+DEFAULT_PARALLEL = int(os.getenv("UPSERT_PARALLEL", "4"))
+
+def vector_size(vector):
+    """Approximate request payload size of a single vector in bytes"""
+    return len(json.dumps(vector, separators=(",", ":"), default=str))
+
+class UpsertBuffer:
+    """Collects vectors per namespace and flushes them in sized chunks"""
+
+    def __init__(self, index, batch_size=DEFAULT_BATCH_SIZE, max_bytes=DEFAULT_MAX_BYTES,
+                 max_parallel=DEFAULT_PARALLEL):
+        self.index = index
+        self.batch_size = batch_size
+        self.max_bytes = max_bytes
+        self.max_parallel = max_parallel
+
+        self.pending = defaultdict(list)
+        self.pending_bytes = defaultdict(int)
+        self.lock = threading.Lock()
+        self.stats_lock = threading.Lock()
+
+        self.executor = ThreadPoolExecutor(max_workers=max_parallel) if max_parallel > 1 else None
+        self.slots = threading.BoundedSemaphore(max_parallel)
+        self.futures = []
+        self.errors = []
+        self.closed = False
+
+        self.stats = {"vectors": 0, "requests": 0, "bytes": 0}
+        atexit.register(self.close)
+
+    def add(self, vector, namespace=""):
+        """Queue one vector; sends a chunk as soon as a limit is reached"""
+        size = vector_size(vector)
+        ready = []
+        with self.lock:
+            # Adding this vector would overflow the byte budget: ship what we have first
+            if self.pending[namespace] and self.pending_bytes[namespace] + size > self.max_bytes:
+                ready.append(self._take(namespace))
+            self.pending[namespace].append(vector)
+            self.pending_bytes[namespace] += size
+            if len(self.pending[namespace]) >= self.batch_size:
+                ready.append(self._take(namespace))
+        # Waiting for a free upsert slot must not block other add() callers
+        for chunk, size in ready:
+            self._dispatch(chunk, namespace, size)
+
+    def _take(self, namespace):
+        # Called with self.lock held
+        return self.pending.pop(namespace, []), self.pending_bytes.pop(namespace, 0)
+
+    def _dispatch(self, chunk, namespace, size):
+        if not chunk:
+            return
+        if self.executor is None:
+            try:
+                self._send(chunk, namespace, size)
+            except Exception:
+                pass  # recorded in self.errors, raised from flush()
+            return
+        self.slots.acquire()
+        future = self.executor.submit(self._send, chunk, namespace, size)
+        future.add_done_callback(lambda _: self.slots.release())
+        with self.lock:
+            self.futures.append(future)
+
+    def _send(self, chunk, namespace, size):
+        try:
+            self.index.upsert(vectors=chunk, namespace=namespace)
+        except Exception as e:
+            self.errors.append((namespace, len(chunk), e))
+            raise
+        with self.stats_lock:
+            self.stats["vectors"] += len(chunk)
+            self.stats["requests"] += 1
+            self.stats["bytes"] += size
+
+    def flush(self):
+        """Send every buffered vector and wait for in-flight upserts to finish"""
+        with self.lock:
+            ready = [(namespace, self._take(namespace)) for namespace in list(self.pending)]
+        for namespace, (chunk, size) in ready:
+            self._dispatch(chunk, namespace, size)
+        with self.lock:
+            futures, self.futures = self.futures, []
+        for future in futures:
+            future.exception()
+        if self.errors:
+            errors, self.errors = self.errors, []
+            namespace, count, error = errors[0]
+            raise RuntimeError(f"{len(errors)} upsert batch(es) failed, first in '{namespace}' ({count} vectors): {error}")
+
+    def close(self):
+        """Final flush on shutdown"""
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self.flush()
+        finally:
+            if self.executor is not None:
+                self.executor.shutdown(wait=True)
+            atexit.unregister(self.close)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+class FakeIndex:
+    """Local stand-in for a Pinecone index that records every upsert call"""
+
+    def __init__(self, fail_namespaces=(), latency=0.0):
+        self.calls = []
+        self.vectors = defaultdict(dict)
+        self.fail_namespaces = set(fail_namespaces)
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def upsert(self, vectors, namespace=""):
+        if namespace in self.fail_namespaces:
+            raise ConnectionError(f"upsert to {namespace} failed")
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.latency)
+        with self.lock:
+            self.in_flight -= 1
+            self.calls.append((namespace, len(vectors), sum(vector_size(vector) for vector in vectors)))
+            for vector in vectors:
+                self.vectors[namespace][vector["id"]] = vector
+        return {"upserted_count": len(vectors)}
+
+def check():
+    """Exercise UpsertBuffer against FakeIndex; raises AssertionError on a regression"""
+    def vectors(count, values=8, prefix="v"):
+        return [{"id": f"{prefix}{i:04d}", "values": [0.5] * values} for i in range(count)]
+
+    # Count limit: full chunks go out as they fill, the remainder on close()
+    index = FakeIndex()
+    with UpsertBuffer(index, batch_size=10, max_parallel=1) as buffer:
+        for vector in vectors(25):
+            buffer.add(vector, namespace="a")
+        assert [count for _, count, _ in index.calls] == [10, 10], index.calls
+    assert [count for _, count, _ in index.calls] == [10, 10, 5], index.calls
+    assert buffer.stats == {"vectors": 25, "requests": 3, "bytes": sum(size for _, _, size in index.calls)}
+
+    # Byte limit: no request exceeds max_bytes, and nothing is lost
+    index = FakeIndex()
+    size = vector_size(vectors(1, values=100)[0])
+    with UpsertBuffer(index, batch_size=1000, max_bytes=5 * size, max_parallel=1) as buffer:
+        for vector in vectors(23, values=100):
+            buffer.add(vector, namespace="b")
+    assert all(chunk_bytes <= 5 * size for _, _, chunk_bytes in index.calls), index.calls
+    assert [count for _, count, _ in index.calls] == [5, 5, 5, 5, 3], index.calls
+
+    # Parallel flushes: bounded concurrency, namespaces kept apart, flush() waits for all
+    index = FakeIndex(latency=0.02)
+    buffer = UpsertBuffer(index, batch_size=4, max_parallel=3)
+    for namespace in ("x", "y"):
+        for vector in vectors(30, prefix=namespace):
+            buffer.add(vector, namespace=namespace)
+    buffer.flush()
+    assert 1 < index.max_in_flight <= 3, index.max_in_flight
+    assert {namespace: len(stored) for namespace, stored in index.vectors.items()} == {"x": 30, "y": 30}
+    buffer.close()
+
+    # A failed chunk is reported by flush(), other namespaces still arrive
+    index = FakeIndex(fail_namespaces={"bad"})
+    buffer = UpsertBuffer(index, batch_size=5, max_parallel=2)
+    for namespace in ("bad", "good"):
+        for vector in vectors(7, prefix=namespace):
+            buffer.add(vector, namespace=namespace)
+    try:
+        buffer.close()
+    except RuntimeError as e:
+        assert "'bad'" in str(e), e
+    else:
+        raise AssertionError("close() did not report the failed upserts")
+    assert len(index.vectors["good"]) == 7
+    print("✅ UpsertBuffer: count and byte chunking, parallel flushes, final flush and errors behave")
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["check"]:
+        check()
+    else:
+        print(__doc__)
@@ -8,61 +8,35 @@ import requests
 from datetime import datetime
 from dotenv import load_dotenv
 from anthropic import Anthropic
-from pinecone import Pinecone
+from vector_store import open_index
+from upsert_buffer import UpsertBuffer
+from embedder import BatchEmbedder
+from sparse_encoder import SparseEncoder, corpus_texts, vocab_path
 
 load_dotenv()
 
 # Initialize clients
 client = Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
-pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
-dense_index = pc.Index("dense-milo-companies")
-sparse_index = pc.Index("sparse-milo-companies")
+# Hosted Pinecone, or the local index when VECTOR_BACKEND=local
+dense_index = open_index("dense-milo-companies")
+sparse_index = open_index("sparse-milo-companies")
+dense_buffer = UpsertBuffer(dense_index)
+sparse_buffer = UpsertBuffer(sparse_index)
+embedder = BatchEmbedder()
 
 # Namespaces
 DENSE_NAMESPACE = "dense-companies-claude-v9-simple"
 SPARSE_NAMESPACE = "sparse-companies-claude-v9-simple"
+# BM25 statistics of the sparse namespace; refitted when the corpus changes
+SPARSE_VOCAB = vocab_path(SPARSE_NAMESPACE)
+sparse_encoder = SparseEncoder.load(SPARSE_VOCAB)
 
-def get_dense_embedding(text: str):
-    """Get dense embedding using OpenAI with dimension reduction"""
-    import openai
-    openai.api_key = os.getenv('OPENAI_API_KEY')
-    
-    response = openai.embeddings.create(
-        input=text,
-        model="text-embedding-3-small",
-        dimensions=1024  # Match Pinecone index dimension
-    )
-    return response.data[0].embedding
-
-def get_sparse_embedding(text: str):
-    """Create simple sparse embedding from text tokens"""
-    # Simple sparse embedding: use word frequency as sparse values
-    import re
-    from collections import Counter
-    
-    # Basic tokenization and frequency counting
-    words = re.findall(r'\b\w+\b', text.lower())
-    word_counts = Counter(words)
-    
-    # Create simple sparse representation with top 20 most frequent words
-    top_words = word_counts.most_common(20)
-    indices = [hash(word) % 10000 for word, _ in top_words]  # Simple hash to indices
-    values = [count / len(words) for _, count in top_words]  # Normalize frequencies
-    
-    return {
-        "indices": indices,
-        "values": values
-    }
+# Companies whose roles are embedded together in one prefetch
+EMBED_CHUNK_COMPANIES = 200
 
-def upsert_company_roles(company):
-    """Upsert all roles for a company to both dense and sparse indexes"""
-    company_id = hashlib.md5(company["company_name"].encode()).hexdigest()
-    
-    for role in company["roles"]:
-        role_id = f"{company_id}_{hashlib.md5(role['title'].encode()).hexdigest()}"
-        
-        # Create embedding text
-        embed_text = f"""
+def build_embed_text(company, role):
+    """Text that gets embedded for a single role"""
+    embed_text = f"""
 Company: {company['company_name']}
 About: {company['about']}
 Title: {role['title']}
@@ -72,10 +46,19 @@ Location: {role['location']}
 Industry: {company['industry']}
 Size: {company['size']}
 """
-        
-        # Get embeddings
-        dense_embedding = get_dense_embedding(embed_text.strip())
-        sparse_embedding = get_sparse_embedding(embed_text.strip())
+    return embed_text.strip()
+
+def upsert_company_roles(company):
+    """Upsert all roles for a company to both dense and sparse indexes"""
+    company_id = hashlib.md5(company["company_name"].encode()).hexdigest()
+    
+    # Embed every role of the company in one request
+    embed_texts = [build_embed_text(company, role) for role in company["roles"]]
+    dense_embeddings = embedder.embed_many(embed_texts)
+    sparse_embeddings = sparse_encoder.encode_documents(embed_texts)
+    
+    for role, dense_embedding, sparse_embedding in zip(company["roles"], dense_embeddings, sparse_embeddings):
+        role_id = f"{company_id}_{hashlib.md5(role['title'].encode()).hexdigest()}"
         
         # Shared metadata
         metadata = {
@@ -101,7 +84,7 @@ Size: {company['size']}
             "metadata": metadata
         }
         
-        dense_index.upsert(vectors=[dense_vector], namespace=DENSE_NAMESPACE)
+        dense_buffer.add(dense_vector, namespace=DENSE_NAMESPACE)
         
         # Upsert to sparse index
         sparse_vector = {
@@ -110,9 +93,25 @@ Size: {company['size']}
             "metadata": metadata
         }
         
-        sparse_index.upsert(vectors=[sparse_vector], namespace=SPARSE_NAMESPACE)
+        sparse_buffer.add(sparse_vector, namespace=SPARSE_NAMESPACE)
         
-        print(f"✅ Upserted {role['title']} at {company['company_name']}")
+        print(f"✅ Queued {role['title']} at {company['company_name']}")
+
+def prefetch_embeddings(companies):
+    """Embed the roles of many companies at once so per-company lookups hit the cache"""
+    texts = []
+    for company in companies:
+        try:
+            texts.extend(build_embed_text(company, role) for role in company["roles"])
+        except (KeyError, TypeError):
+            continue  # reported when the company itself is processed
+    if not texts:
+        return
+    try:
+        embedder.prefetch(texts)
+    except Exception as e:
+        # Fall back to per-company embedding requests
+        print(f"⚠️  Embedding prefetch failed: {e}")
 
 def main():
     """Load companies and upsert all roles to Pinecone"""
@@ -122,9 +121,15 @@ def main():
     print(f"🚀 Starting upsert of {len(companies)} companies to Pinecone")
     print(f"📍 Dense namespace: {DENSE_NAMESPACE}")
     print(f"📍 Sparse namespace: {SPARSE_NAMESPACE}")
+    if sparse_encoder.fit_if_changed(corpus_texts(companies, build_embed_text), SPARSE_VOCAB):
+        print(f"🔤 Sparse vocabulary: {len(sparse_encoder.df):,} terms from {sparse_encoder.documents:,} roles")
     
     total_roles = 0
     for i, company in enumerate(companies, 1):
+        # Warm the embedding cache for the next chunk of companies in large batches
+        if (i - 1) % EMBED_CHUNK_COMPANIES == 0:
+            prefetch_embeddings(companies[i - 1:i - 1 + EMBED_CHUNK_COMPANIES])
+        
         print(f"\n🏢 Processing company {i}/{len(companies)}: {company['company_name']}")
         print(f"   Found {len(company['roles'])} roles")
         
@@ -135,6 +140,15 @@ def main():
             print(f"❌ Error processing {company['company_name']}: {e}")
             continue
     
+    # Final flush of anything still buffered; a failed dense batch must not strand the sparse tail
+    try:
+        dense_buffer.close()
+    finally:
+        sparse_buffer.close()
+    print(f"📦 Dense: {dense_buffer.stats['vectors']} vectors in {dense_buffer.stats['requests']} requests")
+    print(f"📦 Sparse: {sparse_buffer.stats['vectors']} vectors in {sparse_buffer.stats['requests']} requests")
+    print(f"🧠 Embeddings: {embedder.stats()}")
+    
     print(f"\n🎉 Completed! Upserted {total_roles} roles from {len(companies)} companies")
 
 if __name__ == "__main__":
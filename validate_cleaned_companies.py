@@ -2,6 +2,7 @@ import json
 import collections
 import re
 from urllib.parse import urlparse
+from near_duplicates import find_similar_pairs
 
 def load_and_examine_file(file_path):
     """Load and do basic examination of the cleaned companies file"""
@@ -49,15 +50,12 @@ def check_duplicates(companies):
             print(f"  '{name}': {count} occurrences")
     
     # Check for similar names (potential duplicates)
-    company_names = [company.get('company_name', '').lower().strip() for company in companies]
     similar_names = []
     
-    for i, name1 in enumerate(company_names):
-        for j, name2 in enumerate(company_names[i+1:], i+1):
-            if name1 and name2:
-                # Check for similar names (substring, common words)
-                if (name1 in name2 or name2 in name1) and name1 != name2:
-                    similar_names.append((companies[i]['company_name'], companies[j]['company_name']))
+    # Substring matches are found through a word-level index, not all pairs
+    for pair in find_similar_pairs(companies, min_similarity=None, include_substrings=True, score_descriptions=False):
+        if pair['name1'].lower().strip() != pair['name2'].lower().strip():
+            similar_names.append((pair['name1'], pair['name2']))
     
     print(f"Similar company names (potential duplicates): {len(similar_names)}")
     for name1, name2 in similar_names[:10]:  # Show first 10
@@ -0,0 +1,814 @@
+#!/usr/bin/env python3
+"""
+Vector store backends: the hosted Pinecone indexes or a local in-process index.
+
+open_index(name) returns an object with the Pinecone index calls this repo
+uses (upsert / query / delete / fetch / describe_index_stats), so
+UpsertBuffer and the upsert scripts work unchanged. VECTOR_BACKEND picks
+the backend: "pinecone" (default) or "local".
+
+The local backend keeps every namespace of an index under
+data/vectors/<index>/<namespace>/:
+
+    dense.f32 / norms.f32   float32 rows, appended and read through np.memmap
+    records.db              ids, metadata and sparse vectors (SQLite)
+    ivf.npz                 IVF centroids and the list of every dense row
+
+Dense queries are exact until a namespace holds IVF_MIN_ROWS vectors; then
+k-means centroids are trained and a query only scores the rows of the
+`nprobe` nearest lists. nprobe is calibrated on every build: the exact
+neighbours of sample rows show how many lists a query must probe to find
+IVF_TARGET_RECALL of its top 10, so well-clustered embeddings probe a few
+lists and unclustered data probes most of them (IVF_NPROBE overrides it). Sparse vectors go into an inverted index
+(term -> rows, weights). A query with both vectors is scored like a
+Pinecone hybrid query (dense score + sparse dot product). Metadata filters
+use Pinecone's operators. Rows are append-only: re-upserting an id
+tombstones its old row, and compact() rewrites a namespace without them.
+
+Usage:
+    VECTOR_BACKEND=local python main.py ...
+    python vector_store.py stats <index>
+    python vector_store.py build <index> [namespace]
+    python vector_store.py compact <index> [namespace]
+    python vector_store.py bench <index> [namespace] [--queries N] [--top-k K] [--nprobe P]
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import sqlite3
+import threading
+from collections import defaultdict
+
+import numpy as np
+
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "pinecone")
+VECTOR_DIR = os.path.join("data", "vectors")
+DEFAULT_METRIC = os.getenv("VECTOR_METRIC", "cosine")
+IVF_MIN_ROWS = int(os.getenv("IVF_MIN_ROWS", "20000"))
+# 0: use the nprobe calibrated when the lists were trained
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", "0"))
+IVF_TARGET_RECALL = float(os.getenv("IVF_TARGET_RECALL", "0.95"))
+IVF_CALIBRATION_QUERIES = 200
+IVF_SAMPLE = 50_000
+IVF_ITERATIONS = 10
+# Rows scored per matrix product, so exact search never loads the whole file
+SCORE_CHUNK = 65_536
+# Sparse postings appended since the last merge into the sorted arrays
+MAX_SPARSE_DELTA = 200_000
+
+_pinecone = None
+
+def open_index(name, backend=None):
+    """Pinecone index `name`, or its local stand-in under data/vectors/<name>"""
+    backend = backend or VECTOR_BACKEND
+    if backend == "local":
+        return LocalIndex(os.path.join(VECTOR_DIR, name))
+    if backend == "pinecone":
+        global _pinecone
+        if _pinecone is None:
+            from pinecone import Pinecone
+            _pinecone = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
+        return _pinecone.Index(name)
+    raise ValueError(f"Unknown VECTOR_BACKEND: {backend}")
+
+# ---------- Metadata filters (Pinecone operators) ----------
+
+def _listed(value):
+    return value if isinstance(value, list) else [value]
+
+def _compare(compare):
+    def check(value, operand):
+        if value is None or isinstance(value, (list, bool)):
+            return False
+        try:
+            return compare(value, operand)
+        except TypeError:
+            return False
+    return check
+
+FILTER_OPERATORS = {
+    "$eq": lambda value, operand: operand in _listed(value),
+    "$ne": lambda value, operand: operand not in _listed(value),
+    "$in": lambda value, operand: any(item in operand for item in _listed(value)),
+    "$nin": lambda value, operand: not any(item in operand for item in _listed(value)),
+    "$exists": lambda value, operand: (value is not None) == bool(operand),
+    "$gt": _compare(lambda value, operand: value > operand),
+    "$gte": _compare(lambda value, operand: value >= operand),
+    "$lt": _compare(lambda value, operand: value < operand),
+    "$lte": _compare(lambda value, operand: value <= operand),
+}
+
+def compile_filter(filter):
+    """Pinecone metadata filter -> predicate(metadata), or None for no filter"""
+    if not filter:
+        return None
+    checks = []
+    for field, condition in filter.items():
+        if field in ("$and", "$or"):
+            parts = [compile_filter(part) or (lambda metadata: True) for part in condition]
+            combine = all if field == "$and" else any
+            checks.append(lambda metadata, parts=parts, combine=combine: combine(part(metadata) for part in parts))
+            continue
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        for operator, operand in condition.items():
+            if operator not in FILTER_OPERATORS:
+                raise ValueError(f"Unsupported filter operator: {operator}")
+            test = FILTER_OPERATORS[operator]
+            checks.append(lambda metadata, field=field, test=test, operand=operand: test(metadata.get(field), operand))
+    return lambda metadata: all(check(metadata) for check in checks)
+
+# ---------- Storage helpers ----------
+
+class Column:
+    """Append-only numpy column with amortized growth"""
+
+    def __init__(self, dtype, fill=0):
+        self.data = np.full(1024, fill, dtype=dtype)
+        self.fill = fill
+        self.size = 0
+
+    def append(self, value):
+        if self.size == len(self.data):
+            grown = np.full(len(self.data) * 2, self.fill, dtype=self.data.dtype)
+            grown[:self.size] = self.data[:self.size]
+            self.data = grown
+        self.data[self.size] = value
+        self.size += 1
+
+    def extend(self, values):
+        values = np.asarray(values, dtype=self.data.dtype)
+        needed = self.size + len(values)
+        if needed > len(self.data):
+            grown = np.full(max(needed, len(self.data) * 2), self.fill, dtype=self.data.dtype)
+            grown[:self.size] = self.data[:self.size]
+            self.data = grown
+        self.data[self.size:needed] = values
+        self.size = needed
+
+    def view(self):
+        return self.data[:self.size]
+
+def as_record(vector):
+    """Pinecone accepts dicts and (id, values[, metadata]) tuples"""
+    if isinstance(vector, dict):
+        return vector
+    record = {"id": vector[0], "values": vector[1]}
+    if len(vector) > 2:
+        record["metadata"] = vector[2]
+    return record
+
+def safe_name(namespace):
+    return re.sub(r"[^\w.-]", "_", namespace) if namespace else "__default__"
+
+class Namespace:
+    """One namespace of a local index: rows, dense matrix, IVF lists, sparse postings"""
+
+    def __init__(self, path, metric):
+        self.path = path
+        self.metric = metric
+        os.makedirs(path, exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(path, "records.db"), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+        CREATE TABLE IF NOT EXISTS rows (
+          row INTEGER PRIMARY KEY,
+          id TEXT,
+          metadata TEXT,
+          dense_row INTEGER,
+          sparse_indices BLOB,
+          sparse_values BLOB
+        );
+        CREATE TABLE IF NOT EXISTS live (id TEXT PRIMARY KEY, row INTEGER);
+        CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT);
+        """)
+        settings = dict(self.conn.execute("SELECT key, value FROM settings"))
+        self.dimension = int(settings["dimension"]) if "dimension" in settings else None
+
+        self.dense_path = os.path.join(path, "dense.f32")
+        self.norms_path = os.path.join(path, "norms.f32")
+        self.ivf_path = os.path.join(path, "ivf.npz")
+        self.ids = []
+        self.metadata = []
+        self.live = {}
+        self.alive = Column(np.bool_, False)
+        self.row_dense = Column(np.int64, -1)
+        self.dense_owner = Column(np.int64, -1)
+        self.norms = Column(np.float32)
+        self.assign = Column(np.int32, -1)
+        self.centroids = None
+        self.trained_rows = 0
+        self.nprobe = 0
+        self._matrix = None
+        self._lists = None
+        self._sparse = None
+        self.delta = defaultdict(lambda: ([], []))
+        self.delta_size = 0
+        self.dense_file = open(self.dense_path, "ab")
+        self.norms_file = open(self.norms_path, "ab")
+        self._load()
+
+    # ----- loading -----
+
+    def _load(self):
+        self.live = dict(self.conn.execute("SELECT id, row FROM live"))
+        dense_rows = 0
+        if self.dimension and os.path.exists(self.dense_path):
+            # A crash between the file append and the SQLite commit leaves unreferenced tail rows
+            dense_rows = os.path.getsize(self.dense_path) // (4 * self.dimension)
+            self.norms.extend(np.fromfile(self.norms_path, dtype=np.float32)[:dense_rows])
+            self.dense_owner.extend(np.full(dense_rows, -1))
+        terms, rows, weights = [], [], []
+        live_rows = set(self.live.values())
+        for row, record_id, metadata, dense_row, indices, values in self.conn.execute(
+            "SELECT row, id, metadata, dense_row, sparse_indices, sparse_values FROM rows ORDER BY row"
+        ):
+            self.ids.append(record_id)
+            self.metadata.append(json.loads(metadata) if metadata else {})
+            self.alive.append(row in live_rows)
+            self.row_dense.append(-1 if dense_row is None else dense_row)
+            if dense_row is not None and dense_row < dense_rows:
+                self.dense_owner.data[dense_row] = row
+            if indices and row in live_rows:
+                indices = np.frombuffer(indices, dtype=np.int64)
+                terms.append(indices)
+                rows.append(np.full(len(indices), row, dtype=np.int64))
+                weights.append(np.frombuffer(values, dtype=np.float32))
+        self._set_sparse(terms, rows, weights)
+        self.assign.extend(np.full(self.dense_owner.size, -1))
+        if os.path.exists(self.ivf_path) and self.dense_owner.size:
+            saved = np.load(self.ivf_path)
+            self.centroids = saved["centroids"]
+            self.trained_rows = int(saved["trained_rows"])
+            assigned = saved["assign"][:self.dense_owner.size]
+            self.assign.data[:len(assigned)] = assigned
+            if len(assigned) < self.dense_owner.size:
+                # Rows upserted after the last save
+                missing = np.arange(len(assigned), self.dense_owner.size)
+                self.assign.data[missing] = self._nearest_lists(missing)
+            # Lists saved before nprobe was calibrated
+            self.nprobe = int(saved["nprobe"]) if "nprobe" in saved.files else self.calibrate()
+
+    # ----- dense -----
+
+    def matrix(self):
+        rows = self.dense_owner.size
+        if not rows:
+            return np.zeros((0, self.dimension or 0), dtype=np.float32)
+        if self._matrix is None or len(self._matrix) != rows:
+            self.dense_file.flush()
+            self._matrix = np.memmap(self.dense_path, dtype=np.float32, mode="r", shape=(rows, self.dimension))
+        return self._matrix
+
+    def _normalized(self, vectors, norms):
+        if self.metric != "cosine":
+            return vectors
+        return vectors / np.where(norms > 0, norms, 1)[:, None]
+
+    def _score(self, dense_rows, query):
+        """Scores of `dense_rows` (sorted) against an already prepared query, in chunks"""
+        matrix = self.matrix()
+        norms = self.norms.view()
+        scores = np.empty(len(dense_rows), dtype=np.float32)
+        for start in range(0, len(dense_rows), SCORE_CHUNK):
+            chunk = dense_rows[start:start + SCORE_CHUNK]
+            scores[start:start + len(chunk)] = matrix[chunk] @ query
+            if self.metric == "cosine":
+                scores[start:start + len(chunk)] /= np.where(norms[chunk] > 0, norms[chunk], 1)
+        return scores
+
+    def _nearest_lists(self, dense_rows):
+        matrix = self.matrix()
+        norms = self.norms.view()
+        lists = np.empty(len(dense_rows), dtype=np.int32)
+        for start in range(0, len(dense_rows), SCORE_CHUNK):
+            chunk = dense_rows[start:start + SCORE_CHUNK]
+            vectors = self._normalized(np.asarray(matrix[chunk]), norms[chunk])
+            lists[start:start + len(chunk)] = np.argmax(vectors @ self.centroids.T, axis=1)
+        return lists
+
+    def live_dense_rows(self):
+        owners = self.dense_owner.view()
+        rows = np.flatnonzero(owners >= 0)
+        return rows[self.alive.view()[owners[rows]]]
+
+    def build(self, nlist=None, seed=0):
+        """Train IVF centroids (spherical k-means for cosine) and assign every dense row"""
+        live = self.live_dense_rows()
+        if not len(live):
+            return 0
+        nlist = min(nlist or max(1, int(np.sqrt(len(live)))), len(live))
+        rng = np.random.default_rng(seed)
+        sample = np.sort(rng.choice(live, min(len(live), max(IVF_SAMPLE, 40 * nlist)), replace=False))
+        vectors = self._normalized(np.asarray(self.matrix()[sample]), self.norms.view()[sample])
+        centroids = vectors[rng.choice(len(vectors), nlist, replace=False)].copy()
+        for _ in range(IVF_ITERATIONS):
+            labels = np.concatenate([
+                np.argmax(vectors[start:start + SCORE_CHUNK] @ centroids.T, axis=1)
+                for start in range(0, len(vectors), SCORE_CHUNK)
+            ])
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, vectors)
+            counts = np.bincount(labels, minlength=nlist)
+            empty = counts == 0
+            # Re-seed empty lists with random sample points
+            sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()))]
+            counts[empty] = 1
+            centroids = sums / counts[:, None]
+            if self.metric == "cosine":
+                centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+        self.centroids = centroids.astype(np.float32)
+        self.assign.data[:self.dense_owner.size] = self._nearest_lists(np.arange(self.dense_owner.size))
+        self.trained_rows = len(live)
+        self._lists = None
+        self.nprobe = self.calibrate()
+        self.save_ivf()
+        return nlist
+
+    def calibrate(self, top_k=10, queries=IVF_CALIBRATION_QUERIES, target=IVF_TARGET_RECALL, seed=0):
+        """Smallest nprobe whose IVF search finds `target` of the exact top_k of sample rows"""
+        live = self.live_dense_rows()
+        top_k = min(top_k, len(live) - 1)
+        if self.centroids is None or top_k < 1:
+            return len(self.centroids) if self.centroids is not None else 0
+        rng = np.random.default_rng(seed)
+        samples = np.sort(rng.choice(live, min(queries, len(live)), replace=False))
+        matrix, norms = self.matrix(), self.norms.view()
+        sample_vectors = self._normalized(np.asarray(matrix[samples]), norms[samples])
+
+        # Exact neighbours of every sample (itself excluded) in one pass over the live rows
+        best_scores = np.full((len(samples), top_k), -np.inf, dtype=np.float32)
+        best_rows = np.zeros((len(samples), top_k), dtype=np.int64)
+        for start in range(0, len(live), SCORE_CHUNK):
+            chunk = live[start:start + SCORE_CHUNK]
+            scores = (sample_vectors @ np.asarray(matrix[chunk]).T).astype(np.float32)
+            if self.metric == "cosine":
+                scores /= np.where(norms[chunk] > 0, norms[chunk], 1)
+            scores[samples[:, None] == chunk[None, :]] = -np.inf
+            merged_scores = np.concatenate([best_scores, scores], axis=1)
+            merged_rows = np.concatenate([best_rows, np.broadcast_to(chunk, scores.shape)], axis=1)
+            top = np.argpartition(-merged_scores, top_k - 1, axis=1)[:, :top_k]
+            best_scores = np.take_along_axis(merged_scores, top, axis=1)
+            best_rows = np.take_along_axis(merged_rows, top, axis=1)
+
+        # A neighbour is found iff its list is among the probed ones: rank its list per query
+        list_order = np.argsort(-(sample_vectors @ self.centroids.T), axis=1)
+        list_rank = np.argsort(list_order, axis=1)
+        assigned = self.assign.view()[best_rows]
+        # Unassigned rows are always scored
+        ranks = np.where(assigned >= 0, np.take_along_axis(list_rank, np.maximum(assigned, 0), axis=1), 0)
+        ranks = np.sort(ranks[np.isfinite(best_scores)])
+        if not len(ranks):
+            return len(self.centroids)
+        return int(ranks[max(int(np.ceil(target * len(ranks))) - 1, 0)]) + 1
+
+    def save_ivf(self):
+        if self.centroids is None:
+            return
+        temp_path = self.ivf_path + ".tmp.npz"
+        np.savez(temp_path, centroids=self.centroids, assign=self.assign.view(), trained_rows=self.trained_rows,
+                 nprobe=self.nprobe)
+        os.replace(temp_path, self.ivf_path)
+
+    def maybe_build(self):
+        live = len(self.live_dense_rows()) if self.dense_owner.size >= IVF_MIN_ROWS else 0
+        if live >= IVF_MIN_ROWS and (self.centroids is None or live > 4 * self.trained_rows):
+            self.build()
+
+    def ivf_lists(self):
+        """(row order grouped by list, list offsets), rebuilt after assignments change"""
+        if self._lists is None:
+            assign = self.assign.view()
+            order = np.argsort(assign, kind="stable")
+            offsets = np.searchsorted(assign[order], np.arange(len(self.centroids) + 1))
+            self._lists = (order, offsets)
+        return self._lists
+
+    def dense_candidates(self, query, nprobe):
+        """Dense rows to score: every row, or the rows of the nprobe nearest lists"""
+        if self.centroids is None or nprobe >= len(self.centroids):
+            return np.arange(self.dense_owner.size)
+        order, offsets = self.ivf_lists()
+        nearest = np.argsort(-(self.centroids @ query))[:nprobe]
+        rows = np.concatenate([order[offsets[i]:offsets[i + 1]] for i in nearest])
+        # Unassigned rows (-1) sort first; they are scored exactly
+        unassigned = order[:offsets[0]]
+        return np.sort(np.concatenate([rows, unassigned]))
+
+    def dense_query(self, vector, nprobe):
+        query = np.asarray(vector, dtype=np.float32)
+        if self.metric == "cosine":
+            query = query / (np.linalg.norm(query) or 1)
+        dense_rows = self.dense_candidates(query, nprobe)
+        owners = self.dense_owner.view()[dense_rows]
+        keep = owners >= 0
+        dense_rows, owners = dense_rows[keep], owners[keep]
+        return owners, self._score(dense_rows, query)
+
+    # ----- sparse -----
+
+    def _set_sparse(self, terms, rows, weights):
+        if terms:
+            terms, rows, weights = np.concatenate(terms), np.concatenate(rows), np.concatenate(weights)
+        else:
+            terms, rows, weights = (np.zeros(0, np.int64), np.zeros(0, np.int64), np.zeros(0, np.float32))
+        order = np.argsort(terms, kind="stable")
+        terms, rows, weights = terms[order], rows[order], weights[order]
+        unique, starts = np.unique(terms, return_index=True)
+        self._sparse = (unique, np.append(starts, len(terms)), rows, weights)
+
+    def merge_delta(self):
+        unique, offsets, rows, weights = self._sparse
+        terms = [np.repeat(unique, np.diff(offsets))]
+        all_rows, all_weights = [rows], [weights]
+        for term, (term_rows, term_weights) in self.delta.items():
+            terms.append(np.full(len(term_rows), term, dtype=np.int64))
+            all_rows.append(np.asarray(term_rows, dtype=np.int64))
+            all_weights.append(np.asarray(term_weights, dtype=np.float32))
+        self._set_sparse(terms, all_rows, all_weights)
+        self.delta = defaultdict(lambda: ([], []))
+        self.delta_size = 0
+
+    def sparse_query(self, sparse_vector):
+        unique, offsets, rows, weights = self._sparse
+        hit_rows, hit_scores = [], []
+        for term, value in zip(sparse_vector["indices"], sparse_vector["values"]):
+            position = np.searchsorted(unique, term)
+            if position < len(unique) and unique[position] == term:
+                start, end = offsets[position], offsets[position + 1]
+                hit_rows.append(rows[start:end])
+                hit_scores.append(weights[start:end] * value)
+            if term in self.delta:
+                term_rows, term_weights = self.delta[term]
+                hit_rows.append(np.asarray(term_rows, dtype=np.int64))
+                hit_scores.append(np.asarray(term_weights, dtype=np.float32) * value)
+        if not hit_rows:
+            return np.zeros(0, np.int64), np.zeros(0, np.float32)
+        return combine(np.concatenate(hit_rows), np.concatenate(hit_scores))
+
+    # ----- writes -----
+
+    def upsert(self, records):
+        """Append records; returns how many were written"""
+        dense, sparse, rows = [], [], []
+        start_row, start_dense = len(self.ids), self.dense_owner.size
+        for record in records:
+            values = record.get("values")
+            sparse_values = record.get("sparse_values")
+            dense_row = None
+            if values is not None and len(values):
+                vector = np.asarray(values, dtype=np.float32)
+                if self.dimension is None:
+                    self.dimension = len(vector)
+                    self.conn.execute("INSERT OR REPLACE INTO settings VALUES ('dimension', ?)", (str(self.dimension),))
+                if len(vector) != self.dimension:
+                    raise ValueError(f"Vector dimension {len(vector)} does not match the index dimension {self.dimension}")
+                dense_row = start_dense + len(dense)
+                dense.append(vector)
+            indices = weights = None
+            if sparse_values and len(sparse_values.get("indices", [])):
+                indices = np.asarray(sparse_values["indices"], dtype=np.int64)
+                weights = np.asarray(sparse_values["values"], dtype=np.float32)
+                sparse.append((start_row + len(rows), indices, weights))
+            rows.append((
+                start_row + len(rows), str(record["id"]), json.dumps(record.get("metadata") or {}, default=str),
+                dense_row, None if indices is None else indices.tobytes(),
+                None if weights is None else weights.tobytes()
+            ))
+        try:
+            if dense:
+                matrix = np.vstack(dense)
+                norms = np.linalg.norm(matrix, axis=1).astype(np.float32)
+                self.dense_file.write(matrix.tobytes())
+                self.norms_file.write(norms.tobytes())
+                self.dense_file.flush()
+                self.norms_file.flush()
+            with self.conn:
+                self.conn.executemany("INSERT INTO rows VALUES (?, ?, ?, ?, ?, ?)", rows)
+                self.conn.executemany("INSERT OR REPLACE INTO live VALUES (?, ?)", [(row[1], row[0]) for row in rows])
+        except BaseException:
+            if dense:
+                self._drop_dense_tail(start_dense)
+            raise
+
+        # Committed: mirror in memory
+        for row, record_id, metadata, dense_row, _, _ in rows:
+            previous = self.live.get(record_id)
+            if previous is not None:
+                self.alive.data[previous] = False
+            self.live[record_id] = row
+            self.ids.append(record_id)
+            self.metadata.append(json.loads(metadata))
+            self.alive.append(True)
+            self.row_dense.append(-1 if dense_row is None else dense_row)
+            if dense_row is not None:
+                self.dense_owner.append(row)
+        if dense:
+            self.norms.extend(norms)
+            new_rows = np.arange(start_dense, self.dense_owner.size)
+            self.assign.extend(self._nearest_lists(new_rows) if self.centroids is not None else np.full(len(dense), -1))
+            self._lists = None
+        for row, indices, weights in sparse:
+            for term, weight in zip(indices.tolist(), weights.tolist()):
+                self.delta[term][0].append(row)
+                self.delta[term][1].append(weight)
+            self.delta_size += len(indices)
+        if self.delta_size > MAX_SPARSE_DELTA:
+            self.merge_delta()
+        return len(rows)
+
+    def _drop_dense_tail(self, dense_rows):
+        """Cut dense.f32 / norms.f32 back to `dense_rows` rows after a failed upsert
+
+        The next upsert numbers its dense rows from dense_owner.size, so the
+        files must not keep rows that no committed record owns. If they cannot
+        be truncated, the rows are kept as unowned (-1), as _load() does.
+        """
+        try:
+            self.dense_file.flush()
+            self.norms_file.flush()
+            os.truncate(self.dense_path, dense_rows * 4 * self.dimension)
+            os.truncate(self.norms_path, dense_rows * 4)
+        except OSError:
+            written = os.path.getsize(self.dense_path) // (4 * self.dimension)
+            extra = written - self.dense_owner.size
+            if extra > 0:
+                tail = np.fromfile(self.norms_path, dtype=np.float32)[self.norms.size:written]
+                self.norms.extend(np.concatenate([tail, np.zeros(extra - len(tail), dtype=np.float32)]))
+                self.dense_owner.extend(np.full(extra, -1))
+                self.assign.extend(np.full(extra, -1))
+        self._matrix = None
+
+    def delete(self, ids):
+        rows = [self.live.pop(str(record_id)) for record_id in ids if str(record_id) in self.live]
+        with self.conn:
+            self.conn.executemany("DELETE FROM live WHERE id = ?", [(self.ids[row],) for row in rows])
+        for row in rows:
+            self.alive.data[row] = False
+        return len(rows)
+
+    def record(self, row, include_values=True):
+        record = {"id": self.ids[row], "metadata": self.metadata[row]}
+        if include_values:
+            dense_row = self.row_dense.data[row]
+            record["values"] = self.matrix()[dense_row].tolist() if dense_row >= 0 else []
+            sparse = self.conn.execute(
+                "SELECT sparse_indices, sparse_values FROM rows WHERE row = ?", (int(row),)
+            ).fetchone()
+            if sparse and sparse[0]:
+                record["sparse_values"] = {
+                    "indices": np.frombuffer(sparse[0], dtype=np.int64).tolist(),
+                    "values": np.frombuffer(sparse[1], dtype=np.float32).tolist(),
+                }
+        return record
+
+    def close(self):
+        self.save_ivf()
+        self.dense_file.close()
+        self.norms_file.close()
+        self._matrix = None
+        self.conn.close()
+
+def combine(rows, scores):
+    """Sum scores of repeated rows"""
+    unique, inverse = np.unique(rows, return_inverse=True)
+    return unique, np.bincount(inverse, weights=scores).astype(np.float32)
+
+class LocalIndex:
+    """In-process stand-in for a Pinecone index (dense, sparse or hybrid)"""
+
+    def __init__(self, path, metric=None):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        settings_path = os.path.join(path, "index.json")
+        if os.path.exists(settings_path):
+            with open(settings_path) as f:
+                settings = json.load(f)
+        else:
+            settings = {"metric": metric or DEFAULT_METRIC}
+            with open(settings_path, "w") as f:
+                json.dump(settings, f)
+        if settings["metric"] not in ("cosine", "dotproduct"):
+            raise ValueError(f"Local index supports cosine and dotproduct metrics, not {settings['metric']}")
+        self.metric = settings["metric"]
+        self.namespaces = {}
+        self.lock = threading.RLock()
+
+    def _namespace(self, namespace, create=True):
+        name = safe_name(namespace)
+        if name not in self.namespaces:
+            path = os.path.join(self.path, name)
+            if not create and not os.path.exists(path):
+                return None
+            self.namespaces[name] = Namespace(path, self.metric)
+        return self.namespaces[name]
+
+    def upsert(self, vectors, namespace=""):
+        with self.lock:
+            count = self._namespace(namespace).upsert([as_record(vector) for vector in vectors])
+        return {"upserted_count": count}
+
+    def query(self, vector=None, sparse_vector=None, top_k=10, namespace="", filter=None,
+              include_values=False, include_metadata=False, id=None, nprobe=None):
+        """Top-k matches by dense, sparse or hybrid score; `nprobe` is local-only"""
+        with self.lock:
+            space = self._namespace(namespace, create=False)
+            if space is None:
+                return {"matches": [], "namespace": namespace}
+            if id is not None:
+                row = space.live.get(str(id))
+                if row is None:
+                    return {"matches": [], "namespace": namespace}
+                stored = space.record(row)
+                vector, sparse_vector = stored["values"] or None, stored.get("sparse_values")
+            if vector is None and sparse_vector is None:
+                raise ValueError("query needs a vector, a sparse_vector or an id")
+            space.maybe_build()
+            nprobe = nprobe or IVF_NPROBE or space.nprobe
+            matches = self._search(space, vector, sparse_vector, top_k, compile_filter(filter), nprobe)
+            if filter and len(matches) < top_k and space.centroids is not None and nprobe < len(space.centroids):
+                # A selective filter can empty the probed lists; fall back to exact search
+                matches = self._search(space, vector, sparse_vector, top_k, compile_filter(filter), len(space.centroids))
+            results = []
+            for row, score in matches:
+                match = {"id": space.ids[row], "score": float(score)}
+                if include_metadata:
+                    match["metadata"] = space.metadata[row]
+                if include_values:
+                    stored = space.record(row)
+                    match["values"] = stored["values"]
+                    if "sparse_values" in stored:
+                        match["sparse_values"] = stored["sparse_values"]
+                results.append(match)
+        return {"matches": results, "namespace": namespace}
+
+    def _search(self, space, vector, sparse_vector, top_k, predicate, nprobe):
+        parts = []
+        if vector is not None and space.dense_owner.size:
+            parts.append(space.dense_query(vector, nprobe))
+        if sparse_vector is not None:
+            parts.append(space.sparse_query(sparse_vector))
+        if not parts:
+            return []
+        rows, scores = parts[0] if len(parts) == 1 else combine(
+            np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts])
+        )
+        keep = space.alive.view()[rows]
+        rows, scores = rows[keep], scores[keep]
+        if predicate is None and len(rows) > top_k:
+            top = np.argpartition(-scores, top_k)[:top_k]
+            rows, scores = rows[top], scores[top]
+        order = np.argsort(-scores, kind="stable")
+        matches = []
+        for i in order:
+            row = rows[i]
+            if predicate is not None and not predicate(space.metadata[row]):
+                continue
+            matches.append((int(row), scores[i]))
+            if len(matches) == top_k:
+                break
+        return matches
+
+    def delete(self, ids=None, delete_all=False, namespace="", filter=None):
+        with self.lock:
+            space = self._namespace(namespace, create=False)
+            if space is None:
+                return {}
+            if delete_all:
+                space.close()
+                del self.namespaces[safe_name(namespace)]
+                shutil.rmtree(space.path)
+                return {}
+            if filter:
+                predicate = compile_filter(filter)
+                ids = [record_id for record_id, row in space.live.items() if predicate(space.metadata[row])]
+            space.delete(ids or [])
+        return {}
+
+    def fetch(self, ids, namespace=""):
+        with self.lock:
+            space = self._namespace(namespace, create=False)
+            vectors = {}
+            for record_id in ids if space else []:
+                row = space.live.get(str(record_id))
+                if row is not None:
+                    vectors[str(record_id)] = space.record(row)
+        return {"vectors": vectors, "namespace": namespace}
+
+    def list_namespaces(self):
+        return sorted(name for name in os.listdir(self.path) if os.path.isdir(os.path.join(self.path, name)))
+
+    def describe_index_stats(self):
+        with self.lock:
+            namespaces = {}
+            dimension = None
+            for name in self.list_namespaces():
+                space = self._namespace("" if name == "__default__" else name)
+                namespaces["" if name == "__default__" else name] = {"vector_count": len(space.live)}
+                dimension = dimension or space.dimension
+        return {
+            "dimension": dimension,
+            "metric": self.metric,
+            "namespaces": namespaces,
+            "total_vector_count": sum(stats["vector_count"] for stats in namespaces.values()),
+        }
+
+    def build(self, namespace="", nlist=None):
+        """(Re)train the IVF lists of a namespace now instead of on first query"""
+        with self.lock:
+            return self._namespace(namespace).build(nlist)
+
+    def compact(self, namespace=""):
+        """Rewrite a namespace without tombstoned rows; returns the rows dropped"""
+        with self.lock:
+            space = self._namespace(namespace, create=False)
+            if space is None:
+                return 0
+            dropped = len(space.ids) - len(space.live)
+            records = [space.record(row) for row in sorted(space.live.values())]
+            trained = space.centroids is not None
+            space.close()
+            del self.namespaces[safe_name(namespace)]
+            old_path = space.path + ".old"
+            os.replace(space.path, old_path)
+            fresh = self._namespace(namespace)
+            for start in range(0, len(records), 1000):
+                fresh.upsert(records[start:start + 1000])
+            if trained:
+                fresh.build()
+            shutil.rmtree(old_path)
+        return dropped
+
+    def close(self):
+        with self.lock:
+            for space in self.namespaces.values():
+                space.close()
+            self.namespaces = {}
+
+# ---------- Recall / latency benchmark ----------
+
+def benchmark(index, namespace="", queries=100, top_k=10, nprobe=None, seed=0):
+    """Recall@k of the IVF search against exact search, using stored vectors as queries"""
+    space = index._namespace(namespace, create=False)
+    if space is None or not space.dense_owner.size:
+        raise ValueError(f"No dense vectors in namespace {namespace!r}")
+    space.maybe_build()
+    rng = np.random.default_rng(seed)
+    live = space.live_dense_rows()
+    samples = rng.choice(live, min(queries, len(live)), replace=False)
+    vectors = [np.asarray(space.matrix()[row]) for row in samples]
+    lists = len(space.centroids) if space.centroids is not None else 0
+
+    def run(probe):
+        start = time.time()
+        results = [index.query(vector=vector, top_k=top_k, namespace=namespace, nprobe=probe) for vector in vectors]
+        return [{match["id"] for match in result["matches"]} for result in results], (time.time() - start) / len(vectors)
+
+    exact, exact_latency = run(max(lists, 1))
+    nprobe = nprobe or IVF_NPROBE or space.nprobe
+    approx, approx_latency = run(nprobe)
+    recall = float(np.mean([len(a & e) / max(len(e), 1) for a, e in zip(approx, exact)]))
+    return {
+        "vectors": int(len(live)),
+        "lists": lists,
+        "nprobe": min(nprobe, lists) if lists else 0,
+        "queries": len(vectors),
+        f"recall@{top_k}": round(recall, 4),
+        "exact_ms": round(exact_latency * 1000, 2),
+        "ivf_ms": round(approx_latency * 1000, 2),
+    }
+
+def option(args, flag, default):
+    return type(default)(args[args.index(flag) + 1]) if flag in args[:-1] else default
+
+def main():
+    args = sys.argv[1:]
+    if len(args) < 2:
+        print(__doc__)
+        return
+    command, name = args[0], args[1]
+    namespace = args[2] if len(args) > 2 and not args[2].startswith("--") else ""
+    index = LocalIndex(os.path.join(VECTOR_DIR, name))
+    if command == "stats":
+        print(json.dumps(index.describe_index_stats(), indent=2))
+    elif command == "build":
+        start = time.time()
+        lists = index.build(namespace)
+        print(f"✅ {name}/{namespace or '(default)'}: {lists} IVF lists ({time.time() - start:.1f}s)")
+    elif command == "compact":
+        print(f"🗜️  Dropped {index.compact(namespace):,} tombstoned rows")
+    elif command == "bench":
+        result = benchmark(index, namespace, queries=option(args, "--queries", 100),
+                           top_k=option(args, "--top-k", 10), nprobe=option(args, "--nprobe", 0) or None)
+        print(json.dumps(result, indent=2))
+    else:
+        print(__doc__)
+    index.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Cross-process work queue for parallel generation workers.
+
+Every industry::sub-industry unit is a row in a shared SQLite database.
+A worker claims a unit by taking a time-limited lease inside an IMMEDIATE
+transaction, so two workers can never hold the same unit. While the unit is
+being processed a background thread renews the lease (heartbeat); if the
+worker crashes the lease runs out and the next claim() hands the unit to
+another worker. Units that keep failing are parked as 'failed' after
+`max_attempts` tries.
+
+Usage:
+    python work_coordinator.py status
+    python work_coordinator.py retry-failed
+"""
+
+import os
+import sys
+import time
+import socket
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+WORK_QUEUE_PATH = os.path.join("data", "work_queue.db")
+LEASE_SECONDS = int(os.getenv("LEASE_SECONDS", "300"))
+MAX_ATTEMPTS = 3
+
+def default_worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+class WorkCoordinator:
+    """Hands out work units to any number of processes through SQLite leases"""
+
+    def __init__(self, path=WORK_QUEUE_PATH, worker_id=None, lease_seconds=LEASE_SECONDS, max_attempts=MAX_ATTEMPTS):
+        self.path = path
+        self.worker_id = worker_id or default_worker_id()
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = self._connect()
+        self.conn.execute("""
+        CREATE TABLE IF NOT EXISTS work_units (
+          key TEXT PRIMARY KEY,
+          industry TEXT,
+          sub_industry TEXT,
+          status TEXT DEFAULT 'pending',
+          worker TEXT,
+          lease_expires REAL,
+          attempts INTEGER DEFAULT 0,
+          last_error TEXT,
+          updated_at TEXT
+        )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_work_units_status ON work_units(status, lease_expires)")
+
+    def _connect(self):
+        # Autocommit mode: transactions are opened explicitly with BEGIN IMMEDIATE
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @contextmanager
+    def _transaction(self, conn=None):
+        conn = conn or self.conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def seed(self, units, done_keys=()):
+        """Register (industry, subindustry, key) units; existing rows keep their state"""
+        now = datetime.utcnow().isoformat()
+        with self._transaction() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO work_units (key, industry, sub_industry, updated_at) VALUES (?, ?, ?, ?)",
+                [(key, industry, subindustry, now) for industry, subindustry, key in units]
+            )
+            # Units finished before the coordinator existed (per-batch progress files)
+            conn.executemany(
+                "UPDATE work_units SET status = 'done', updated_at = ? WHERE key = ? AND status = 'pending'",
+                [(now, key) for key in done_keys]
+            )
+
+    def claim(self, keys=None):
+        """Lease the next pending (or expired) unit; returns (industry, subindustry, key) or None"""
+        now = time.time()
+        with self._transaction() as conn:
+            query = """
+                SELECT key, industry, sub_industry, status, worker FROM work_units
+                WHERE (status = 'pending' OR (status = 'leased' AND lease_expires < ?))
+            """
+            params = [now]
+            if keys is not None:
+                keys = list(keys)
+                if not keys:
+                    return None
+                query += f" AND key IN ({','.join('?' * len(keys))})"
+                params += keys
+            row = conn.execute(query + " ORDER BY rowid LIMIT 1", params).fetchone()
+            if row is None:
+                return None
+            key, industry, subindustry, status, previous_worker = row
+            conn.execute(
+                "UPDATE work_units SET status = 'leased', worker = ?, lease_expires = ?, "
+                "attempts = attempts + 1, updated_at = ? WHERE key = ?",
+                (self.worker_id, now + self.lease_seconds, datetime.utcnow().isoformat(), key)
+            )
+        if status == "leased":
+            print(f"♻️  Reclaimed expired lease on {key} from {previous_worker}")
+        return industry, subindustry, key
+
+    def renew(self, key, conn=None):
+        """Extend our lease; False means it expired and may belong to someone else now"""
+        with self._transaction(conn) as conn:
+            cursor = conn.execute(
+                "UPDATE work_units SET lease_expires = ? WHERE key = ? AND worker = ? AND status = 'leased'",
+                (time.time() + self.lease_seconds, key, self.worker_id)
+            )
+        return cursor.rowcount == 1
+
+    def owns(self, key):
+        row = self.conn.execute(
+            "SELECT 1 FROM work_units WHERE key = ? AND worker = ? AND status = 'leased' AND lease_expires >= ?",
+            (key, self.worker_id, time.time())
+        ).fetchone()
+        return row is not None
+
+    def complete(self, key):
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE work_units SET status = 'done', lease_expires = NULL, updated_at = ? "
+                "WHERE key = ? AND worker = ? AND status = 'leased'",
+                (datetime.utcnow().isoformat(), key, self.worker_id)
+            )
+        return cursor.rowcount == 1
+
+    def release(self, key, error=None):
+        """Give a unit back after a failure; it is parked as 'failed' after max_attempts"""
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE work_units SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "lease_expires = NULL, last_error = ?, updated_at = ? "
+                "WHERE key = ? AND worker = ? AND status = 'leased'",
+                (self.max_attempts, error, datetime.utcnow().isoformat(), key, self.worker_id)
+            )
+
+    @contextmanager
+    def keepalive(self, key):
+        """Renew the lease on `key` in a background thread while the block runs.
+
+        Yields a threading.Event that is set if the lease is lost.
+        """
+        stop = threading.Event()
+        lost = threading.Event()
+
+        def heartbeat():
+            conn = self._connect()
+            try:
+                while not stop.wait(self.lease_seconds / 3):
+                    try:
+                        if not self.renew(key, conn):
+                            print(f"⚠️  Lost lease on {key}")
+                            lost.set()
+                            return
+                    except sqlite3.OperationalError as e:
+                        # Database busy; the lease has slack for the next beat
+                        print(f"⚠️  Heartbeat for {key} failed: {e}")
+            finally:
+                conn.close()
+
+        thread = threading.Thread(target=heartbeat, daemon=True)
+        thread.start()
+        try:
+            yield lost
+        finally:
+            stop.set()
+            thread.join()
+
+    def reset_failed(self):
+        with self._transaction() as conn:
+            cursor = conn.execute("UPDATE work_units SET status = 'pending', attempts = 0 WHERE status = 'failed'")
+        return cursor.rowcount
+
+    def stats(self):
+        counts = dict(self.conn.execute("SELECT status, COUNT(*) FROM work_units GROUP BY status").fetchall())
+        expired = self.conn.execute(
+            "SELECT COUNT(*) FROM work_units WHERE status = 'leased' AND lease_expires < ?", (time.time(),)
+        ).fetchone()[0]
+        return {
+            "pending": counts.get("pending", 0),
+            "leased": counts.get("leased", 0) - expired,
+            "expired": expired,
+            "done": counts.get("done", 0),
+            "failed": counts.get("failed", 0),
+        }
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else "status"
+    coordinator = WorkCoordinator()
+
+    if command == "retry-failed":
+        print(f"🔁 Re-queued {coordinator.reset_failed()} failed units")
+    elif command != "status":
+        print("Usage: python work_coordinator.py [status|retry-failed]")
+        sys.exit(1)
+
+    stats = coordinator.stats()
+    print("📋 Work queue: " + ", ".join(f"{count} {status}" for status, count in stats.items()))
+    for key, worker, expires in coordinator.conn.execute(
+        "SELECT key, worker, lease_expires FROM work_units WHERE status = 'leased' ORDER BY lease_expires"
+    ):
+        print(f"  🔒 {key} — {worker} ({expires - time.time():.0f}s left)")
+
+if __name__ == "__main__":
+    main()